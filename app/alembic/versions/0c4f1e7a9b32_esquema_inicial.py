@@ -0,0 +1,381 @@
+"""esquema inicial: tabelas anteriores às migrations incrementais
+
+Revision ID: 0c4f1e7a9b32
+Revises: b1d7187ea01d
+Create Date: 2025-08-08 15:02:10.481263
+
+A migration inicial (b1d7187ea01d) foi gerada vazia, porque as tabelas eram criadas pelo create_all da aplicação.
+Esta revisão cria o esquema daquela época, para que `alembic upgrade head` monte um banco vazio do zero; em bancos
+criados pelo create_all as tabelas que já existem são mantidas.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c4f1e7a9b32'
+down_revision: Union[str, Sequence[str], None] = 'b1d7187ea01d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "clinicas" not in existing:
+        op.create_table('clinicas',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('endereco', sa.Text(), nullable=False),
+            sa.Column('telefone', sa.String(), nullable=True),
+            sa.Column('num_guiches', sa.Integer(), nullable=True),
+            sa.Column('tempo_minimo_atendimento', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_clinicas_id'), 'clinicas', ['id'], unique=False)
+        op.create_index(op.f('ix_clinicas_nome'), 'clinicas', ['nome'], unique=True)
+    if "perfis" not in existing:
+        op.create_table('perfis',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('nome')
+        )
+        op.create_index(op.f('ix_perfis_id'), 'perfis', ['id'], unique=False)
+    if "permissoes" not in existing:
+        op.create_table('permissoes',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('descricao', sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('nome')
+        )
+        op.create_index(op.f('ix_permissoes_id'), 'permissoes', ['id'], unique=False)
+    if "campanhas_marketing" not in existing:
+        op.create_table('campanhas_marketing',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('tipo', sa.String(), nullable=False),
+            sa.Column('data_inicio', sa.Date(), nullable=False),
+            sa.Column('data_fim', sa.Date(), nullable=True),
+            sa.Column('descricao', sa.Text(), nullable=True),
+            sa.Column('clinica_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_campanhas_marketing_id'), 'campanhas_marketing', ['id'], unique=False)
+    if "convenios" not in existing:
+        op.create_table('convenios',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('clinica_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('nome')
+        )
+        op.create_index(op.f('ix_convenios_id'), 'convenios', ['id'], unique=False)
+    if "leads" not in existing:
+        op.create_table('leads',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('email', sa.String(), nullable=True),
+            sa.Column('telefone', sa.String(), nullable=True),
+            sa.Column('origem', sa.String(), nullable=True),
+            sa.Column('status', sa.String(), nullable=True),
+            sa.Column('data_criacao', sa.DateTime(), nullable=True),
+            sa.Column('data_atualizacao', sa.DateTime(), nullable=True),
+            sa.Column('clinica_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_leads_id'), 'leads', ['id'], unique=False)
+    if "pastas_documento" not in existing:
+        op.create_table('pastas_documento',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('clinica_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_pastas_documento_id'), 'pastas_documento', ['id'], unique=False)
+    if "perfil_permissao" not in existing:
+        op.create_table('perfil_permissao',
+            sa.Column('perfil_id', sa.Integer(), nullable=False),
+            sa.Column('permissao_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['perfil_id'], ['perfis.id'], ),
+            sa.ForeignKeyConstraint(['permissao_id'], ['permissoes.id'], ),
+            sa.PrimaryKeyConstraint('perfil_id', 'permissao_id')
+        )
+    if "tipos_tratamento" not in existing:
+        op.create_table('tipos_tratamento',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('clinica_id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('descricao', sa.Text(), nullable=True),
+            sa.Column('tempo_minimo_atendimento', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('clinica_id', 'nome', name='_clinica_nome_uc')
+        )
+        op.create_index(op.f('ix_tipos_tratamento_id'), 'tipos_tratamento', ['id'], unique=False)
+    if "users" not in existing:
+        op.create_table('users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(), nullable=False),
+            sa.Column('email', sa.String(), nullable=True),
+            sa.Column('hashed_password', sa.String(), nullable=False),
+            sa.Column('perfil_id', sa.Integer(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('clinica_id', sa.Integer(), nullable=True),
+            sa.Column('first_name', sa.String(), nullable=True),
+            sa.Column('last_name', sa.String(), nullable=True),
+            sa.Column('date_joined', sa.DateTime(), nullable=True),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+            sa.Column('is_superuser', sa.Boolean(), nullable=True),
+            sa.Column('is_staff', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.ForeignKeyConstraint(['perfil_id'], ['perfis.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+        op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+        op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    if "cupons_desconto" not in existing:
+        op.create_table('cupons_desconto',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('codigo', sa.String(), nullable=False),
+            sa.Column('valor_desconto', sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.Column('data_validade', sa.Date(), nullable=False),
+            sa.Column('ativo', sa.Boolean(), nullable=True),
+            sa.Column('campanha_id', sa.Integer(), nullable=True),
+            sa.Column('clinica_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['campanha_id'], ['campanhas_marketing.id'], ),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('codigo')
+        )
+        op.create_index(op.f('ix_cupons_desconto_id'), 'cupons_desconto', ['id'], unique=False)
+    if "faturas" not in existing:
+        op.create_table('faturas',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('convenio_id', sa.Integer(), nullable=False),
+            sa.Column('mes_referencia', sa.Date(), nullable=False),
+            sa.Column('valor_total', sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.Column('status', sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(['convenio_id'], ['convenios.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_faturas_id'), 'faturas', ['id'], unique=False)
+    if "planos" not in existing:
+        op.create_table('planos',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('convenio_id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.ForeignKeyConstraint(['convenio_id'], ['convenios.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('convenio_id', 'nome', name='_convenio_nome_uc')
+        )
+        op.create_index(op.f('ix_planos_id'), 'planos', ['id'], unique=False)
+    if "profissionais" not in existing:
+        op.create_table('profissionais',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('especialidade', sa.String(), nullable=False),
+            sa.Column('conselho_profissional', sa.String(), nullable=False),
+            sa.Column('numero_conselho', sa.String(), nullable=False),
+            sa.Column('carga_horaria_semanal', sa.Integer(), nullable=True),
+            sa.Column('comissao_percentual', sa.Numeric(precision=5, scale=2), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id')
+        )
+        op.create_index(op.f('ix_profissionais_id'), 'profissionais', ['id'], unique=False)
+    if "pacientes" not in existing:
+        op.create_table('pacientes',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(), nullable=False),
+            sa.Column('cpf', sa.String(), nullable=False),
+            sa.Column('rg', sa.String(), nullable=True),
+            sa.Column('plano_id', sa.Integer(), nullable=True),
+            sa.Column('data_nascimento', sa.Date(), nullable=False),
+            sa.Column('email', sa.String(), nullable=True),
+            sa.Column('telefone', sa.String(), nullable=True),
+            sa.Column('endereco', sa.Text(), nullable=True),
+            sa.Column('responsavel_legal', sa.String(), nullable=True),
+            sa.Column('clinica_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.ForeignKeyConstraint(['plano_id'], ['planos.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_pacientes_cpf'), 'pacientes', ['cpf'], unique=True)
+        op.create_index(op.f('ix_pacientes_email'), 'pacientes', ['email'], unique=True)
+        op.create_index(op.f('ix_pacientes_id'), 'pacientes', ['id'], unique=False)
+    if "tabelas_precos" not in existing:
+        op.create_table('tabelas_precos',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tratamento_id', sa.Integer(), nullable=False),
+            sa.Column('plano_id', sa.Integer(), nullable=True),
+            sa.Column('preco', sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.ForeignKeyConstraint(['plano_id'], ['planos.id'], ),
+            sa.ForeignKeyConstraint(['tratamento_id'], ['tipos_tratamento.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('tratamento_id', 'plano_id', name='_tratamento_plano_uc')
+        )
+        op.create_index(op.f('ix_tabelas_precos_id'), 'tabelas_precos', ['id'], unique=False)
+    if "agendamentos" not in existing:
+        op.create_table('agendamentos',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('paciente_id', sa.Integer(), nullable=False),
+            sa.Column('profissional_id', sa.Integer(), nullable=True),
+            sa.Column('data', sa.DateTime(), nullable=False),
+            sa.Column('status', sa.String(), nullable=True),
+            sa.Column('guiche_numero', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+            sa.ForeignKeyConstraint(['profissional_id'], ['profissionais.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_agendamentos_id'), 'agendamentos', ['id'], unique=False)
+    if "documentos_arquivo" not in existing:
+        op.create_table('documentos_arquivo',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('pasta_id', sa.Integer(), nullable=False),
+            sa.Column('paciente_id', sa.Integer(), nullable=True),
+            sa.Column('arquivo', sa.String(), nullable=False),
+            sa.Column('hash_arquivo', sa.String(), nullable=False),
+            sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+            sa.ForeignKeyConstraint(['pasta_id'], ['pastas_documento.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_documentos_arquivo_id'), 'documentos_arquivo', ['id'], unique=False)
+    if "pesquisas_satisfacao" not in existing:
+        op.create_table('pesquisas_satisfacao',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('paciente_id', sa.Integer(), nullable=False),
+            sa.Column('data_pesquisa', sa.Date(), nullable=True),
+            sa.Column('nota_nps', sa.Integer(), nullable=False),
+            sa.Column('comentarios', sa.Text(), nullable=True),
+            sa.Column('clinica_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['clinica_id'], ['clinicas.id'], ),
+            sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_pesquisas_satisfacao_id'), 'pesquisas_satisfacao', ['id'], unique=False)
+    if "prontuarios" not in existing:
+        op.create_table('prontuarios',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('paciente_id', sa.Integer(), nullable=False),
+            sa.Column('tipo_tratamento_definido_id', sa.Integer(), nullable=True),
+            sa.Column('data_criacao', sa.DateTime(), nullable=True),
+            sa.Column('editavel', sa.Boolean(), nullable=True),
+            sa.Column('is_finalized', sa.Boolean(), nullable=True),
+            sa.Column('queixa_principal', sa.Text(), nullable=True),
+            sa.Column('historia_doenca_atual', sa.Text(), nullable=True),
+            sa.Column('antecedentes_pessoais_familiares', sa.Text(), nullable=True),
+            sa.Column('habitos_vida', sa.Text(), nullable=True),
+            sa.Column('uso_medicamentos', sa.Text(), nullable=True),
+            sa.Column('alergias_conhecidas', sa.Text(), nullable=True),
+            sa.Column('sinais_vitais', sa.Text(), nullable=True),
+            sa.Column('exame_fisico_geral_segmentar', sa.Text(), nullable=True),
+            sa.Column('avaliacoes_especificas', sa.Text(), nullable=True),
+            sa.Column('hipoteses_diagnosticas', sa.Text(), nullable=True),
+            sa.Column('exames_complementares', sa.Text(), nullable=True),
+            sa.Column('conclusao_diagnostica', sa.Text(), nullable=True),
+            sa.Column('prescricoes', sa.Text(), nullable=True),
+            sa.Column('encaminhamentos', sa.Text(), nullable=True),
+            sa.Column('procedimentos_realizados', sa.Text(), nullable=True),
+            sa.Column('orientacoes_paciente', sa.Text(), nullable=True),
+            sa.Column('plano_tratamento_acompanhamento', sa.Text(), nullable=True),
+            sa.Column('evolucao_clinica', sa.Text(), nullable=True),
+            sa.Column('termo_consentimento', sa.String(), nullable=True),
+            sa.Column('fichas_avaliacao_especifica', sa.String(), nullable=True),
+            sa.Column('exames_laboratoriais_imagem', sa.String(), nullable=True),
+            sa.Column('relatorios_outros_profissionais', sa.String(), nullable=True),
+            sa.Column('assinatura_profissional', sa.String(), nullable=True),
+            sa.Column('registro_profissional', sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+            sa.ForeignKeyConstraint(['tipo_tratamento_definido_id'], ['tipos_tratamento.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_prontuarios_id'), 'prontuarios', ['id'], unique=False)
+    if "atendimentos" not in existing:
+        op.create_table('atendimentos',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('agendamento_id', sa.Integer(), nullable=False),
+            sa.Column('observacoes', sa.Text(), nullable=True),
+            sa.Column('data_inicio', sa.DateTime(), nullable=True),
+            sa.Column('data_fim', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.String(), nullable=True),
+            sa.Column('tipo_tratamento_realizado_id', sa.Integer(), nullable=True),
+            sa.Column('prontuario_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['agendamento_id'], ['agendamentos.id'], ),
+            sa.ForeignKeyConstraint(['prontuario_id'], ['prontuarios.id'], ),
+            sa.ForeignKeyConstraint(['tipo_tratamento_realizado_id'], ['tipos_tratamento.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_atendimentos_id'), 'atendimentos', ['id'], unique=False)
+    if "comissoes" not in existing:
+        op.create_table('comissoes',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('profissional_id', sa.Integer(), nullable=False),
+            sa.Column('atendimento_id', sa.Integer(), nullable=False),
+            sa.Column('valor', sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.Column('paga', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['atendimento_id'], ['atendimentos.id'], ),
+            sa.ForeignKeyConstraint(['profissional_id'], ['profissionais.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_comissoes_id'), 'comissoes', ['id'], unique=False)
+    if "fatura_atendimentos" not in existing:
+        op.create_table('fatura_atendimentos',
+            sa.Column('fatura_id', sa.Integer(), nullable=False),
+            sa.Column('atendimento_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['atendimento_id'], ['atendimentos.id'], ),
+            sa.ForeignKeyConstraint(['fatura_id'], ['faturas.id'], ),
+            sa.PrimaryKeyConstraint('fatura_id', 'atendimento_id')
+        )
+    if "lancamentos_financeiros" not in existing:
+        op.create_table('lancamentos_financeiros',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tipo', sa.String(), nullable=False),
+            sa.Column('descricao', sa.String(), nullable=False),
+            sa.Column('valor', sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.Column('data_vencimento', sa.Date(), nullable=False),
+            sa.Column('data_pagamento', sa.Date(), nullable=True),
+            sa.Column('atendimento_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['atendimento_id'], ['atendimentos.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_lancamentos_financeiros_id'), 'lancamentos_financeiros', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("lancamentos_financeiros")
+    op.drop_table("fatura_atendimentos")
+    op.drop_table("comissoes")
+    op.drop_table("atendimentos")
+    op.drop_table("prontuarios")
+    op.drop_table("pesquisas_satisfacao")
+    op.drop_table("documentos_arquivo")
+    op.drop_table("agendamentos")
+    op.drop_table("tabelas_precos")
+    op.drop_table("pacientes")
+    op.drop_table("profissionais")
+    op.drop_table("planos")
+    op.drop_table("faturas")
+    op.drop_table("cupons_desconto")
+    op.drop_table("users")
+    op.drop_table("tipos_tratamento")
+    op.drop_table("perfil_permissao")
+    op.drop_table("pastas_documento")
+    op.drop_table("leads")
+    op.drop_table("convenios")
+    op.drop_table("campanhas_marketing")
+    op.drop_table("permissoes")
+    op.drop_table("perfis")
+    op.drop_table("clinicas")
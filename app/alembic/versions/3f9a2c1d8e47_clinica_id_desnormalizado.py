@@ -0,0 +1,75 @@
+"""clinica_id desnormalizado em agendamentos, atendimentos, lancamentos_financeiros e comissoes
+
+Revision ID: 3f9a2c1d8e47
+Revises: 0c4f1e7a9b32
+Create Date: 2025-08-20 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a2c1d8e47'
+down_revision: Union[str, Sequence[str], None] = '0c4f1e7a9b32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("agendamentos", "atendimentos", "lancamentos_financeiros", "comissoes")
+
+# Ordem importa: cada tabela copia o valor já preenchido da tabela pai
+BACKFILL = (
+    ("agendamentos",
+     """UPDATE agendamentos SET clinica_id = (
+            SELECT pacientes.clinica_id FROM pacientes WHERE pacientes.id = agendamentos.paciente_id)"""),
+    ("atendimentos",
+     """UPDATE atendimentos SET clinica_id = (
+            SELECT agendamentos.clinica_id FROM agendamentos WHERE agendamentos.id = atendimentos.agendamento_id)"""),
+    ("lancamentos_financeiros",
+     """UPDATE lancamentos_financeiros SET clinica_id = (
+            SELECT atendimentos.clinica_id FROM atendimentos WHERE atendimentos.id = lancamentos_financeiros.atendimento_id)
+        WHERE atendimento_id IS NOT NULL"""),
+    ("comissoes",
+     """UPDATE comissoes SET clinica_id = (
+            SELECT users.clinica_id FROM profissionais JOIN users ON users.id = profissionais.user_id
+            WHERE profissionais.id = comissoes.profissional_id)"""),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    for table in TABLES:
+        if table not in existing:
+            continue
+        # Bancos criados pelo create_all da aplicação já podem ter a coluna
+        if "clinica_id" not in {c["name"] for c in inspector.get_columns(table)}:
+            # batch: no SQLite a FK só pode ser criada recriando a tabela; no Postgres vira ALTER TABLE
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.add_column(sa.Column("clinica_id", sa.Integer(), nullable=True))
+                batch_op.create_foreign_key(f"fk_{table}_clinica_id", "clinicas", ["clinica_id"], ["id"])
+        if f"ix_{table}_clinica_id" not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(f"ix_{table}_clinica_id", table, ["clinica_id"])
+    for table, statement in BACKFILL:
+        if table in existing:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    for table in reversed(TABLES):
+        if table not in existing:
+            continue
+        if f"ix_{table}_clinica_id" in {i["name"] for i in inspector.get_indexes(table)}:
+            op.drop_index(f"ix_{table}_clinica_id", table_name=table)
+        # Sem nome quando a coluna veio do create_all (o upgrade não criou a FK)
+        foreign_keys = {fk["name"] for fk in inspector.get_foreign_keys(table)}
+        with op.batch_alter_table(table) as batch_op:
+            if f"fk_{table}_clinica_id" in foreign_keys:
+                batch_op.drop_constraint(f"fk_{table}_clinica_id", type_="foreignkey")
+            batch_op.drop_column("clinica_id")
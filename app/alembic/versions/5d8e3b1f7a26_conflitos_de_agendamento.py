@@ -0,0 +1,73 @@
+"""data_fim em agendamentos, indice de guiche e exclusion constraints opcionais
+
+Revision ID: 5d8e3b1f7a26
+Revises: 9a41d6e2c5b8
+Create Date: 2025-08-27 14:22:05.118340
+
+As exclusion constraints (somente Postgres) são opcionais porque falham se já houver agendamentos sobrepostos:
+
+    alembic -x exclusion_constraints=true upgrade head
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e3b1f7a26'
+down_revision: Union[str, Sequence[str], None] = '9a41d6e2c5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# data + tempo mínimo de atendimento da clínica (30 minutos sem clínica), como em app/models.py
+BACKFILL = {
+    "postgresql": """UPDATE agendamentos SET data_fim = data + make_interval(mins => COALESCE(
+                         (SELECT clinicas.tempo_minimo_atendimento FROM clinicas WHERE clinicas.id = agendamentos.clinica_id), 30))
+                     WHERE data_fim IS NULL""",
+    "sqlite": """UPDATE agendamentos SET data_fim = datetime(data, '+' || COALESCE(
+                     (SELECT clinicas.tempo_minimo_atendimento FROM clinicas WHERE clinicas.id = agendamentos.clinica_id), 30) || ' minutes')
+                 WHERE data_fim IS NULL""",
+}
+
+# Agendamentos cancelados não ocupam o horário
+EXCLUSION_CONSTRAINTS = (
+    ("ex_agendamentos_profissional_horario",
+     "EXCLUDE USING gist (profissional_id WITH =, tsrange(data, data_fim) WITH &&) "
+     "WHERE (status <> 'CANCELADO' AND profissional_id IS NOT NULL)"),
+    ("ex_agendamentos_guiche_horario",
+     "EXCLUDE USING gist (clinica_id WITH =, guiche_numero WITH =, tsrange(data, data_fim) WITH &&) "
+     "WHERE (status <> 'CANCELADO' AND guiche_numero IS NOT NULL)"),
+)
+
+
+def _exclusion_constraints() -> bool:
+    return op.get_bind().dialect.name == "postgresql" and context.get_x_argument(as_dictionary=True).get("exclusion_constraints") == "true"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    # Bancos criados pelo create_all da aplicação já podem ter a coluna
+    if "data_fim" not in {c["name"] for c in inspector.get_columns("agendamentos")}:
+        op.add_column("agendamentos", sa.Column("data_fim", sa.DateTime(), nullable=True))
+    backfill = BACKFILL.get(op.get_bind().dialect.name)
+    if backfill is not None:
+        op.execute(backfill)
+    if _exclusion_constraints():
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        for name, definition in EXCLUSION_CONSTRAINTS:
+            op.execute(f"ALTER TABLE agendamentos ADD CONSTRAINT {name} {definition}")
+    with op.get_context().autocommit_block():
+        op.create_index("ix_agendamentos_clinica_id_guiche_numero_data", "agendamentos", ["clinica_id", "guiche_numero", "data"], if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_agendamentos_clinica_id_guiche_numero_data", table_name="agendamentos", if_exists=True, postgresql_concurrently=True)
+    if op.get_bind().dialect.name == "postgresql":
+        for name, _ in EXCLUSION_CONSTRAINTS:
+            op.execute(f"ALTER TABLE agendamentos DROP CONSTRAINT IF EXISTS {name}")
+    op.drop_column("agendamentos", "data_fim")
@@ -0,0 +1,68 @@
+"""indices compostos e de chave estrangeira para os padroes de acesso da API
+
+Revision ID: 7c2e5b9a4d13
+Revises: 3f9a2c1d8e47
+Create Date: 2025-08-22 16:03:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e5b9a4d13'
+down_revision: Union[str, Sequence[str], None] = '3f9a2c1d8e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nome, tabela, colunas) - espelha os Index/index=True declarados em app/models.py
+INDEXES = (
+    # listagens por clínica paginadas por (data, id) / (data_vencimento, id)
+    ("ix_agendamentos_clinica_id_data", "agendamentos", ["clinica_id", "data", "id"]),
+    ("ix_lancamentos_financeiros_clinica_id_data_vencimento", "lancamentos_financeiros", ["clinica_id", "data_vencimento", "id"]),
+    # agenda do profissional e histórico do paciente
+    ("ix_agendamentos_profissional_id_data", "agendamentos", ["profissional_id", "data"]),
+    ("ix_agendamentos_paciente_id_data", "agendamentos", ["paciente_id", "data"]),
+    ("ix_leads_clinica_id_status", "leads", ["clinica_id", "status"]),
+    # chaves estrangeiras usadas em joins e filtros
+    ("ix_atendimentos_agendamento_id", "atendimentos", ["agendamento_id"]),
+    ("ix_lancamentos_financeiros_atendimento_id", "lancamentos_financeiros", ["atendimento_id"]),
+    ("ix_comissoes_profissional_id", "comissoes", ["profissional_id"]),
+    ("ix_comissoes_atendimento_id", "comissoes", ["atendimento_id"]),
+    ("ix_prontuarios_paciente_id", "prontuarios", ["paciente_id"]),
+    ("ix_pesquisas_satisfacao_paciente_id", "pesquisas_satisfacao", ["paciente_id"]),
+    ("ix_documentos_arquivo_pasta_id", "documentos_arquivo", ["pasta_id"]),
+    ("ix_faturas_convenio_id", "faturas", ["convenio_id"]),
+    ("ix_users_clinica_id", "users", ["clinica_id"]),
+    ("ix_pacientes_clinica_id", "pacientes", ["clinica_id"]),
+    ("ix_convenios_clinica_id", "convenios", ["clinica_id"]),
+    ("ix_pastas_documento_clinica_id", "pastas_documento", ["clinica_id"]),
+    ("ix_campanhas_marketing_clinica_id", "campanhas_marketing", ["clinica_id"]),
+    ("ix_cupons_desconto_clinica_id", "cupons_desconto", ["clinica_id"]),
+)
+
+# Cobertos pelos compostos que começam por clinica_id
+SUPERSEDED = (
+    ("ix_agendamentos_clinica_id", "agendamentos", ["clinica_id"]),
+    ("ix_lancamentos_financeiros_clinica_id", "lancamentos_financeiros", ["clinica_id"]),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação e não bloqueia escritas nas tabelas grandes
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+        for name, table, _ in SUPERSEDED:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in SUPERSEDED:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,29 @@
+"""indice em agendamentos.data para o filtro por periodo
+
+Revision ID: 9a41d6e2c5b8
+Revises: 7c2e5b9a4d13
+Create Date: 2025-08-25 09:41:12.560731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a41d6e2c5b8'
+down_revision: Union[str, Sequence[str], None] = '7c2e5b9a4d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index("ix_agendamentos_data", "agendamentos", ["data", "id"], if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_agendamentos_data", table_name="agendamentos", if_exists=True, postgresql_concurrently=True)
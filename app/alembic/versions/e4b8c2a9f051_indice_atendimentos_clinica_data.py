@@ -0,0 +1,29 @@
+"""indice em atendimentos (clinica_id, data_inicio) para a exportacao por periodo
+
+Revision ID: e4b8c2a9f051
+Revises: 5d8e3b1f7a26
+Create Date: 2025-09-08 10:12:44.207815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8c2a9f051'
+down_revision: Union[str, Sequence[str], None] = '5d8e3b1f7a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index("ix_atendimentos_clinica_id_data_inicio", "atendimentos", ["clinica_id", "data_inicio", "id"], if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_atendimentos_clinica_id_data_inicio", table_name="atendimentos", if_exists=True, postgresql_concurrently=True)
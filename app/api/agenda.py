@@ -0,0 +1,457 @@
+"""
+Appointment conflict detection, guichê allocation and free-slot search.
+
+This file checks whether a booking overlaps another active booking of the same professional or of the same guichê.
+Each check is a range query over the (profissional_id, data) and (clinica_id, guiche_numero, data) indexes; on
+Postgres the optional exclusion constraints (migration 5d8e3b1f7a26) close the race between the check and the commit.
+It also assigns guichês to bookings and computes the free start times of a clinic's professionals with a sweep over
+the bookings of the window.
+"""
+import bisect
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+
+# Agendamentos cancelados liberam o horário
+STATUS_SEM_CONFLITO = schemas.AgendamentoStatusEnum.CANCELADO.value
+
+# SQLSTATE de violação de exclusion constraint no Postgres
+EXCLUSION_VIOLATION = "23P01"
+
+Intervalo = Tuple[datetime, datetime]
+
+FORA_DO_CALENDARIO = "Data fora do intervalo suportado"
+
+def somar(data: datetime, delta: timedelta) -> datetime:
+    """`data + delta`; perto de datetime.min/max levanta 400 em vez do OverflowError."""
+    try:
+        return data + delta
+    except OverflowError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=FORA_DO_CALENDARIO)
+
+def _desde(inicio: datetime) -> datetime:
+    # Início do trecho que pode conter agendamentos sobrepostos a `inicio`; nada começa antes de datetime.min
+    if inicio - datetime.min < models.DURACAO_MAXIMA_AGENDAMENTO:
+        return datetime.min
+    return inicio - models.DURACAO_MAXIMA_AGENDAMENTO
+
+def parametros_das_clinicas(db: Session, clinica_ids: Iterable[Optional[int]]) -> Dict[Optional[int], Tuple[timedelta, int]]:
+    """Duração reservada para novos agendamentos e número de guichês de cada clínica, em uma consulta."""
+    ids = {clinica_id for clinica_id in clinica_ids if clinica_id is not None}
+    rows = db.execute(
+        select(models.Clinica.id, models.Clinica.tempo_minimo_atendimento, models.Clinica.num_guiches).where(models.Clinica.id.in_(ids))
+    ).all() if ids else []
+    parametros = {row.id: (models.duracao_agendamento(row.tempo_minimo_atendimento), max(row.num_guiches or 1, 1)) for row in rows}
+    return {clinica_id: parametros.get(clinica_id, (models.duracao_agendamento(None), 1)) for clinica_id in [*ids, None]}
+
+def parametros_da_clinica(db: Session, clinica_id: Optional[int]) -> Tuple[timedelta, int]:
+    """Duração reservada para novos agendamentos e número de guichês da clínica."""
+    return parametros_das_clinicas(db, [clinica_id])[clinica_id]
+
+def find_conflicts(
+    db: Session,
+    inicio: datetime,
+    fim: datetime,
+    profissional_id: Optional[int] = None,
+    guiche_numero: Optional[int] = None,
+    clinica_id: Optional[int] = None,
+    ignorar_id: Optional[int] = None,
+) -> List[schemas.AgendamentoConflito]:
+    """
+    Agendamentos ativos que se sobrepõem a [inicio, fim) no profissional ou no guichê informados.
+
+    Como nenhuma reserva passa de DURACAO_MAXIMA_AGENDAMENTO, só os agendamentos que começam em
+    (inicio - DURACAO_MAXIMA_AGENDAMENTO, fim) podem se sobrepor: a consulta percorre apenas esse trecho dos índices.
+    """
+    criterios = []
+    if profissional_id is not None:
+        criterios.append(models.Agendamento.profissional_id == profissional_id)
+    if guiche_numero is not None:
+        criterios.append(and_(models.Agendamento.clinica_id == clinica_id, models.Agendamento.guiche_numero == guiche_numero))
+    if not criterios:
+        return []
+
+    query = select(models.Agendamento).where(
+        or_(*criterios),
+        models.Agendamento.data > _desde(inicio),
+        models.Agendamento.data < fim,
+        models.Agendamento.data_fim > inicio,
+        models.Agendamento.status != STATUS_SEM_CONFLITO,
+    ).order_by(models.Agendamento.data, models.Agendamento.id)
+    if ignorar_id is not None:
+        query = query.where(models.Agendamento.id != ignorar_id)
+
+    # O agendamento em edição ainda não foi gravado; não deve ser enviado ao banco pela consulta
+    with db.no_autoflush:
+        rows = db.scalars(query).all()
+
+    return [_conflito(row, profissional_id, guiche_numero, clinica_id) for row in rows]
+
+def _motivos(row, profissional_id: Optional[int], guiche_numero: Optional[int], clinica_id: Optional[int]) -> List[str]:
+    motivos = []
+    if profissional_id is not None and row.profissional_id == profissional_id:
+        motivos.append("profissional")
+    if guiche_numero is not None and row.guiche_numero == guiche_numero and row.clinica_id == clinica_id:
+        motivos.append("guiche")
+    return motivos
+
+def _conflito(row: models.Agendamento, profissional_id: Optional[int], guiche_numero: Optional[int], clinica_id: Optional[int]) -> schemas.AgendamentoConflito:
+    return schemas.AgendamentoConflito(
+        id=row.id, data=row.data, data_fim=row.data_fim, profissional_id=row.profissional_id, guiche_numero=row.guiche_numero,
+        motivos=_motivos(row, profissional_id, guiche_numero, clinica_id),
+    )
+
+def _conflict_error(conflitos: List[schemas.AgendamentoConflito]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": "Horário indisponível: conflito com outros agendamentos", "conflitos": jsonable_encoder(conflitos)},
+    )
+
+def _slot(agendamento: models.Agendamento) -> dict:
+    return {
+        "inicio": agendamento.data,
+        "fim": agendamento.data_fim,
+        "profissional_id": agendamento.profissional_id,
+        "guiche_numero": agendamento.guiche_numero,
+        "clinica_id": agendamento.clinica_id,
+        "ignorar_id": agendamento.id,
+    }
+
+@dataclass
+class Reserva:
+    """
+    Pedido de horário para `verificar_reservas`: um agendamento novo ou a remarcação de `agendamento_id`.
+
+    `guiche_numero` vazio é preenchido pelo alocador (`preferido` se estiver livre); `erro` recebe o 400/409 do pedido
+    recusado.
+    """
+    inicio: datetime
+    fim: datetime
+    clinica_id: Optional[int]
+    num_guiches: int
+    profissional_id: Optional[int] = None
+    guiche_numero: Optional[int] = None
+    agendamento_id: Optional[int] = None
+    preferido: Optional[int] = None
+    erro: Optional[HTTPException] = None
+
+class _Ocupacao(NamedTuple):
+    id: Optional[int]
+    data: datetime
+    data_fim: datetime
+    profissional_id: Optional[int]
+    guiche_numero: Optional[int]
+    clinica_id: Optional[int]
+
+def _janelas(reservas: Sequence[Reserva]) -> List[Intervalo]:
+    # Trechos do índice por data que podem conter agendamentos sobrepostos, unidos quando se cruzam
+    return _unir(sorted((_desde(r.inicio), r.fim) for r in reservas))
+
+def verificar_reservas(db: Session, reservas: Sequence[Reserva], manter_guiche: bool = False) -> None:
+    """
+    Verifica conflitos e aloca guichês para vários pedidos com uma única consulta.
+
+    A consulta traz os agendamentos ativos dos profissionais e das clínicas envolvidos na vizinhança de cada pedido
+    (um trecho dos índices por data); sobreposição e guichês são resolvidos em memória, na ordem dos pedidos. Cada
+    pedido aceito passa a ocupar o horário para os seguintes; o recusado fica com `erro` preenchido. Com
+    `manter_guiche`, cada pedido prefere o guichê alocado ao anterior (séries).
+    """
+    if not reservas:
+        return
+    criterios = [models.Agendamento.clinica_id.in_({r.clinica_id for r in reservas})]
+    profissionais = {r.profissional_id for r in reservas if r.profissional_id is not None}
+    if profissionais:
+        criterios.append(models.Agendamento.profissional_id.in_(profissionais))
+    janelas = [and_(models.Agendamento.data > inicio, models.Agendamento.data < fim) for inicio, fim in _janelas(reservas)]
+    query = (
+        select(
+            models.Agendamento.id, models.Agendamento.data, models.Agendamento.data_fim, models.Agendamento.profissional_id,
+            models.Agendamento.guiche_numero, models.Agendamento.clinica_id,
+        )
+        .where(or_(*criterios), or_(*janelas), models.Agendamento.data_fim.is_not(None), models.Agendamento.status != STATUS_SEM_CONFLITO)
+        .order_by(models.Agendamento.data, models.Agendamento.id)
+    )
+    with db.no_autoflush:
+        existentes = db.execute(query).all()
+    inicios = [row.data for row in existentes]
+    aceitas: List[_Ocupacao] = []
+    # Remarcações aceitas: a posição antiga deixa de ocupar o horário para os pedidos seguintes
+    movidos = set()
+
+    for reserva in reservas:
+        if manter_guiche and aceitas and reserva.preferido is None:
+            reserva.preferido = aceitas[-1].guiche_numero
+        if reserva.guiche_numero is not None and not 1 <= reserva.guiche_numero <= reserva.num_guiches:
+            reserva.erro = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Guichê inválido: a clínica tem {reserva.num_guiches} guichê(s)")
+            continue
+        vizinhos = existentes[bisect.bisect_right(inicios, _desde(reserva.inicio)):bisect.bisect_left(inicios, reserva.fim)]
+        sobrepostos = [row for row in vizinhos if row.data_fim > reserva.inicio and row.id != reserva.agendamento_id and row.id not in movidos]
+        do_lote = [o for o in aceitas if o.data < reserva.fim and o.data_fim > reserva.inicio]
+
+        conflitos = [c for c in (_conflito(row, reserva.profissional_id, reserva.guiche_numero, reserva.clinica_id) for row in sobrepostos) if c.motivos]
+        if conflitos:
+            reserva.erro = _conflict_error(conflitos)
+            continue
+        if any(_motivos(o, reserva.profissional_id, reserva.guiche_numero, reserva.clinica_id) for o in do_lote if o.id is None or o.id != reserva.agendamento_id):
+            reserva.erro = HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": "Horário indisponível: conflito com outro item do lote", "conflitos": []})
+            continue
+        if reserva.guiche_numero is None:
+            ocupados = {o.guiche_numero for o in [*sobrepostos, *do_lote] if o.clinica_id == reserva.clinica_id}
+            livres = [g for g in range(1, reserva.num_guiches + 1) if g not in ocupados]
+            if not livres:
+                reserva.erro = HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": "Horário indisponível: todos os guichês estão ocupados", "conflitos": []})
+                continue
+            reserva.guiche_numero = reserva.preferido if reserva.preferido in livres else livres[0]
+        aceitas.append(_Ocupacao(reserva.agendamento_id, reserva.inicio, reserva.fim, reserva.profissional_id, reserva.guiche_numero, reserva.clinica_id))
+        if reserva.agendamento_id is not None:
+            movidos.add(reserva.agendamento_id)
+
+def reservar(db: Session, agendamento: models.Agendamento, num_guiches: int, preferido: Optional[int] = None) -> None:
+    """
+    Verifica o horário de um agendamento (`data_fim` já preenchido) e aloca o guichê se não foi informado.
+
+    Levanta 400 para guichê inexistente e 409 com os horários conflitantes; nesses casos as alterações pendentes da
+    sessão são descartadas, como no rollback de `commit_agendamento`.
+    """
+    if agendamento.status == STATUS_SEM_CONFLITO:
+        return
+    reserva = Reserva(
+        agendamento.data, agendamento.data_fim, agendamento.clinica_id, num_guiches,
+        profissional_id=agendamento.profissional_id, guiche_numero=agendamento.guiche_numero, agendamento_id=agendamento.id, preferido=preferido,
+    )
+    verificar_reservas(db, [reserva])
+    if reserva.erro is not None:
+        db.rollback()
+        raise reserva.erro
+    agendamento.guiche_numero = reserva.guiche_numero
+
+# Séries de agendamentos (terapias semanais etc.)
+RECORRENCIA_MAXIMA = schemas.RECORRENCIA_MAXIMA
+
+def datas_da_serie(serie: schemas.AgendamentoRecorrenteCreate) -> List[datetime]:
+    """Datas de início das ocorrências: a partir de `data`, a cada `intervalo` dias/semanas, até `ocorrencias` e/ou `ate`."""
+    if serie.ocorrencias is None and serie.ate is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Informe ocorrencias ou ate para a recorrência")
+    passo = timedelta(days=serie.intervalo) if serie.frequencia == schemas.RecorrenciaFrequenciaEnum.DIARIA else timedelta(weeks=serie.intervalo)
+    # Uma ocorrência além do máximo basta para recusar uma série limitada só por `ate`
+    limite = min(serie.ocorrencias or RECORRENCIA_MAXIMA + 1, RECORRENCIA_MAXIMA + 1)
+    datas = [serie.data]
+    while len(datas) < limite:
+        try:
+            data = datas[-1] + passo
+        except OverflowError:
+            # Depois do fim do calendário: já passou de `ate`; sem `ate`, as ocorrências pedidas não cabem
+            if serie.ate is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=FORA_DO_CALENDARIO)
+            break
+        if serie.ate is not None and data.date() > serie.ate:
+            break
+        datas.append(data)
+    if (serie.ate is not None and serie.data.date() > serie.ate) or len(datas) > RECORRENCIA_MAXIMA:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"A recorrência deve gerar entre 1 e {RECORRENCIA_MAXIMA} ocorrências")
+    return datas
+
+def reservar_serie(
+    db: Session,
+    datas: Sequence[datetime],
+    duracao: timedelta,
+    clinica_id: Optional[int],
+    num_guiches: int,
+    profissional_id: Optional[int] = None,
+    guiche_numero: Optional[int] = None,
+) -> List[Reserva]:
+    """
+    Verifica a série inteira com `verificar_reservas` (uma consulta). A série fica no mesmo guichê sempre que possível.
+
+    Levanta 409 com todos os conflitos da série, ou o erro da primeira ocorrência recusada por outro motivo.
+    """
+    reservas = [
+        Reserva(inicio, somar(inicio, duracao), clinica_id, num_guiches, profissional_id=profissional_id, guiche_numero=guiche_numero)
+        for inicio in datas
+    ]
+    verificar_reservas(db, reservas, manter_guiche=True)
+
+    conflitos = {}
+    for reserva in reservas:
+        if reserva.erro is not None:
+            for conflito in reserva.erro.detail["conflitos"] if isinstance(reserva.erro.detail, dict) else []:
+                conflitos[conflito["id"]] = conflito
+    recusadas = [r for r in reservas if r.erro is not None]
+    if conflitos:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": "Horário indisponível: conflito com outros agendamentos", "conflitos": sorted(conflitos.values(), key=lambda c: (c["data"], c["id"]))})
+    if recusadas:
+        raise recusadas[0].erro
+    return reservas
+
+def particionar_guiches(agendamentos: Sequence[Tuple[int, datetime, datetime]], num_guiches: int) -> Tuple[dict, List[int]]:
+    """
+    Distribui os agendamentos (id, inicio, fim), ordenados pelo início, entre os guichês 1..num_guiches.
+
+    Particionamento de intervalos guloso: um heap com os guichês livres e outro com os ocupados, por horário de
+    liberação. Cada agendamento recebe o menor guichê livre no seu início, o que usa o mínimo possível de guichês
+    (o pico de atendimentos simultâneos). Quando o pico passa de `num_guiches`, os excedentes ficam sem guichê.
+    Retorna {id: guichê} e a lista de ids sem guichê.
+    """
+    livres = list(range(1, num_guiches + 1))
+    em_uso: List[Tuple[datetime, int]] = []
+    alocacao = {}
+    sem_guiche = []
+    for agendamento_id, inicio, fim in agendamentos:
+        while em_uso and em_uso[0][0] <= inicio:
+            heapq.heappush(livres, heapq.heappop(em_uso)[1])
+        if not livres:
+            sem_guiche.append(agendamento_id)
+            continue
+        guiche = heapq.heappop(livres)
+        alocacao[agendamento_id] = guiche
+        heapq.heappush(em_uso, (fim, guiche))
+    return alocacao, sem_guiche
+
+def _violacao_de_exclusao(exc: IntegrityError) -> bool:
+    codigo = getattr(exc.orig, "sqlstate", None) or getattr(exc.orig, "pgcode", None)
+    return codigo == EXCLUSION_VIOLATION
+
+def commit_agendamento(db: Session, *agendamentos) -> None:
+    """
+    Grava os agendamentos já verificados por `reservar`/`verificar_reservas`, como objetos ou linhas do RETURNING.
+
+    Com as exclusion constraints instaladas, uma reserva concorrente que passou pela mesma verificação é rejeitada pelo
+    banco; a violação vira o mesmo 409 da verificação em Python.
+    """
+    slots = [_slot(agendamento) for agendamento in agendamentos]
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if not _violacao_de_exclusao(exc):
+            raise
+        conflitos = {}
+        for slot in slots:
+            # Os agendamentos da transação desfeita não existem mais no banco
+            slot["ignorar_id"] = None
+            conflitos.update((c.id, c) for c in find_conflicts(db, **slot))
+        raise _conflict_error(list(conflitos.values())) from exc
+
+def commit_guiches(db: Session, alteracoes: Sequence[dict]) -> None:
+    """
+    Grava novos guichês (`{"id", "guiche_numero"}`) e faz o commit.
+
+    A exclusion constraint de guichê é verificada linha a linha: numa troca entre dois agendamentos sobrepostos o
+    estado intermediário a violaria. Por isso os guichês alterados são liberados (NULL fica fora da constraint) antes
+    de receberem os novos valores. Uma violação restante vem de uma reserva concorrente e vira 409.
+    """
+    try:
+        if alteracoes:
+            db.execute(update(models.Agendamento).where(models.Agendamento.id.in_([a["id"] for a in alteracoes])).values(guiche_numero=None))
+            alocados = [a for a in alteracoes if a["guiche_numero"] is not None]
+            if alocados:
+                db.execute(update(models.Agendamento), alocados)
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if not _violacao_de_exclusao(exc):
+            raise
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Os guichês do dia foram alterados por outra reserva; tente novamente") from exc
+
+
+# Expediente: Profissional só tem a carga horária semanal, distribuída igualmente entre os dias úteis a partir da
+# abertura da clínica
+EXPEDIENTE_INICIO = time(8, 0)
+DIAS_UTEIS = 5  # segunda a sexta
+
+def _guiches_lotados(ocupacoes: Iterable[Intervalo], num_guiches: int) -> List[Intervalo]:
+    """Trechos em que todos os guichês estão ocupados, por varredura dos inícios e fins em ordem."""
+    eventos = []
+    for inicio, fim in ocupacoes:
+        # No mesmo instante o fim vem antes do início: intervalos semiabertos encostados não se sobrepõem
+        eventos.append((inicio, 1))
+        eventos.append((fim, -1))
+    eventos.sort()
+
+    lotados = []
+    ocupados = 0
+    lotado_desde = None
+    for instante, delta in eventos:
+        ocupados += delta
+        if lotado_desde is None and ocupados >= num_guiches:
+            lotado_desde = instante
+        elif lotado_desde is not None and ocupados < num_guiches:
+            if instante > lotado_desde:
+                lotados.append((lotado_desde, instante))
+            lotado_desde = None
+    return lotados
+
+def _unir(intervalos: Iterable[Intervalo]) -> List[Intervalo]:
+    """Une intervalos já ordenados pelo início que se sobrepõem ou se tocam."""
+    unidos = []
+    for inicio, fim in intervalos:
+        if unidos and inicio <= unidos[-1][1]:
+            if fim > unidos[-1][1]:
+                unidos[-1] = (unidos[-1][0], fim)
+        else:
+            unidos.append((inicio, fim))
+    return unidos
+
+def _expedientes(inicio: datetime, fim: datetime, carga_horaria_semanal: Optional[int]) -> Iterable[Intervalo]:
+    horas_por_dia = min((carga_horaria_semanal or 0) / DIAS_UTEIS, 24)
+    if horas_por_dia <= 0:
+        return
+    dia = inicio.date()
+    while datetime.combine(dia, EXPEDIENTE_INICIO) < fim:
+        if dia.weekday() < DIAS_UTEIS:
+            abertura = datetime.combine(dia, EXPEDIENTE_INICIO)
+            yield abertura, abertura + timedelta(hours=horas_por_dia)
+        dia += timedelta(days=1)
+
+# Período aceito pela busca de horários livres: a consulta recua a duração máxima antes do início e o último
+# expediente pode terminar até um dia depois do fim
+HORARIOS_LIVRES_PERIODO = (datetime.min + models.DURACAO_MAXIMA_AGENDAMENTO, datetime.max - timedelta(days=1))
+
+def horarios_livres(
+    agendamentos: Sequence[Tuple[datetime, datetime, Optional[int]]],
+    profissionais: Sequence[Tuple[int, Optional[int]]],
+    inicio: datetime,
+    fim: datetime,
+    duracao: timedelta,
+    passo: timedelta,
+    num_guiches: int,
+) -> List[dict]:
+    """
+    Horários de início livres em [inicio, fim) para cada profissional.
+
+    `agendamentos` são os agendamentos ativos da clínica no período, como (data, data_fim, profissional_id) ordenados
+    por data; `profissionais` são pares (id, carga_horaria_semanal). Os candidatos seguem a grade de `passo` a partir
+    da abertura; um candidato é livre se [t, t + duracao) cabe no expediente, não cruza agendamentos do profissional e
+    há guichê livre durante todo o atendimento. Candidatos e intervalos ocupados são percorridos juntos, em ordem, sem
+    nenhuma consulta por horário.
+    """
+    lotados = _guiches_lotados(((a[0], a[1]) for a in agendamentos), max(num_guiches or 1, 1))
+    por_profissional = {profissional_id: [] for profissional_id, _ in profissionais}
+    for data, data_fim, profissional_id in agendamentos:
+        if profissional_id in por_profissional:
+            por_profissional[profissional_id].append((data, data_fim))
+
+    livres = []
+    for profissional_id, carga_horaria_semanal in profissionais:
+        ocupado = _unir(heapq.merge(por_profissional[profissional_id], lotados))
+        j = 0
+        for abertura, encerramento in _expedientes(inicio, fim, carga_horaria_semanal):
+            t = abertura
+            while t + duracao <= encerramento and t < fim:
+                if t >= inicio:
+                    while j < len(ocupado) and ocupado[j][1] <= t:
+                        j += 1
+                    if j == len(ocupado) or ocupado[j][0] >= t + duracao:
+                        livres.append({"profissional_id": profissional_id, "inicio": t, "fim": t + duracao})
+                t += passo
+    livres.sort(key=lambda h: (h["inicio"], h["profissional_id"]))
+    return livres
@@ -0,0 +1,122 @@
+"""
+Batch create/update helpers.
+
+This file holds what the `/{resource}/batch` endpoints share: every id referenced by the batch is checked with one IN
+query per model, new rows go to the database in a single multi-row INSERT ... RETURNING, the request is committed
+once, and failures are reported per item instead of rejecting the whole batch.
+"""
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, inspect, select
+from sqlalchemy.orm import Session
+
+from .tenancy import get_owned_many, ownership_error, owners_of
+
+BATCH_MAXIMO = 500
+
+class Lote:
+    """Itens de uma requisição em lote, com o erro e o registro gravado de cada um, por índice."""
+
+    def __init__(self, itens: list):
+        if not itens or len(itens) > BATCH_MAXIMO:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"O lote deve ter entre 1 e {BATCH_MAXIMO} itens")
+        self.itens = itens
+        self.erros: Dict[int, HTTPException] = {}
+        self.registros: Dict[int, Any] = {}
+
+    def falhar(self, indice: int, erro: HTTPException) -> None:
+        self.erros.setdefault(indice, erro)
+
+    def pendentes(self) -> List[tuple]:
+        """(índice, item) dos itens que ainda não falharam."""
+        return [(i, item) for i, item in enumerate(self.itens) if i not in self.erros]
+
+    def check_parents(self, db: Session, current_user, model, ids: Dict[int, Optional[int]], not_found_detail: str, forbidden_detail: str) -> Dict[int, Optional[int]]:
+        """
+        Valida o registro referenciado por cada item (índice -> id; None quando não informado) com uma consulta IN.
+
+        Retorna índice -> clinica_id do registro, para os itens válidos que o informaram.
+        """
+        referenciados = {i: obj_id for i, obj_id in ids.items() if obj_id is not None and i not in self.erros}
+        owners = owners_of(db, model, referenciados.values()) if referenciados else {}
+        clinicas = {}
+        for i, obj_id in referenciados.items():
+            erro = ownership_error(owners, obj_id, current_user, not_found_detail, forbidden_detail)
+            if erro is not None:
+                self.falhar(i, erro)
+            else:
+                clinicas[i] = owners[obj_id]
+        return clinicas
+
+    def get_owned(self, db: Session, current_user, model, not_found_detail: str, forbidden_detail: str) -> Dict[int, Any]:
+        """Carrega os registros a atualizar (campo `id` de cada item) com uma consulta IN: índice -> registro."""
+        owned = get_owned_many(db, model, [item.id for item in self.itens])
+        owners = {obj_id: clinica_id for obj_id, (_, clinica_id) in owned.items()}
+        registros = {}
+        vistos = set()
+        for i, item in self.pendentes():
+            erro = ownership_error(owners, item.id, current_user, not_found_detail, forbidden_detail)
+            if erro is None and item.id in vistos:
+                erro = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Registro repetido no lote")
+            if erro is not None:
+                self.falhar(i, erro)
+                continue
+            vistos.add(item.id)
+            registros[i] = owned[item.id][0]
+        return registros
+
+    def check_clinica(self, current_user, clinicas: Dict[int, Optional[int]], forbidden_detail: str) -> None:
+        """Mesma regra dos endpoints individuais: fora do superusuário, só a clínica do próprio usuário."""
+        if current_user.is_superuser:
+            return
+        for i, clinica_id in clinicas.items():
+            if clinica_id != current_user.clinica_id:
+                self.falhar(i, HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden_detail))
+
+    def check_unique(self, db: Session, column, valores: Dict[int, Any], detail: str, ids: Optional[Dict[int, int]] = None) -> None:
+        """409 para valores de uma coluna única que já pertencem a outro registro ou se repetem no lote (uma consulta IN)."""
+        pendentes = {i: valor for i, valor in valores.items() if valor is not None and i not in self.erros}
+        if not pendentes:
+            return
+        donos = dict(db.execute(select(column, column.class_.id).where(column.in_(set(pendentes.values())))).all())
+        vistos = set()
+        for i, valor in pendentes.items():
+            dono = donos.get(valor)
+            if (dono is not None and dono != (ids or {}).get(i)) or valor in vistos:
+                self.falhar(i, HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail))
+            else:
+                vistos.add(valor)
+
+    def aplicar(self, registros: Dict[int, Any]) -> Dict[int, dict]:
+        """Aplica os campos enviados de cada item pendente ao registro carregado; retorna índice -> alterações."""
+        alteracoes = {}
+        for i, item in self.pendentes():
+            alteracoes[i] = item.dict(exclude_unset=True, exclude={"id"})
+            for key, value in alteracoes[i].items():
+                setattr(registros[i], key, value)
+        return alteracoes
+
+    def resultado(self) -> dict:
+        return {
+            "itens": [{"indice": i, "registro": registro} for i, registro in sorted(self.registros.items())],
+            "erros": [{"indice": i, "status_code": erro.status_code, "detail": erro.detail} for i, erro in sorted(self.erros.items())],
+        }
+
+def insert_many(db: Session, model, linhas: Dict[int, dict]) -> Dict[int, Any]:
+    """Um único INSERT de várias linhas com RETURNING na ordem dos parâmetros: índice -> linha gravada."""
+    if not linhas:
+        return {}
+    table = model.__table__
+    # O insert em massa do ORM omite as chaves None (para aplicar os defaults) e divide o lote por conjunto de chaves;
+    # com os defaults já preenchidos todas as linhas têm as mesmas colunas e vão em uma execução só
+    defaults = {c.key: c.default.arg for c in table.c if c.default is not None and c.default.is_scalar}
+    params = [{key: defaults[key] if value is None and key in defaults else value for key, value in linha.items()} for linha in linhas.values()]
+    rows = db.execute(insert(table).returning(*table.c, sort_by_parameter_order=True), params).all()
+    return dict(zip(linhas.keys(), rows))
+
+def as_dict(obj) -> dict:
+    """Colunas de um registro já enviado ao banco (flush), para montar a resposta antes do commit expirá-lo."""
+    if hasattr(obj, "_asdict"):
+        return obj._asdict()
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
@@ -0,0 +1,30 @@
+"""
+HTTP caching helpers.
+
+This file implements ETag / If-None-Match revalidation for JSON responses, so clients that poll an endpoint get a
+304 without a body while the data hasn't changed.
+"""
+import hashlib
+
+from fastapi import Request, Response, status
+
+from ..core.responses import dumps
+
+def etag_for(body: bytes) -> str:
+    return 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Compara ignorando o prefixo W/ (comparação fraca, RFC 9110)
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def json_response_with_etag(request: Request, payload) -> Response:
+    """Serializa `payload` e responde 304 se o cliente já tem essa versão (If-None-Match)."""
+    body = dumps(payload)
+    etag = etag_for(body)
+    # no-cache: o cliente pode guardar a resposta, mas deve revalidar a cada uso
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -3,23 +3,35 @@ API endpoints for the application.
 
 This file defines the API routes for all resources in the application.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, undefer_group
 from typing import List, Optional
+from datetime import date, datetime, time, timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 
 from .. import models, schemas
-from ..core.database import get_db
-from ..core.security import get_password_hash, verify_password, create_access_token
-from ..core.auth import get_current_user, get_current_active_user, get_current_admin_user, get_current_profissional_user, get_current_paciente_user, has_permission
+from ..core import database
+from ..core.database import get_db, get_async_db, get_pool_status
+from .pagination import MAX_LIMIT, paginate, paginate_async
+from .tenancy import check_changed_parents, check_parents, get_owned_or_404, resolve_clinica_id
+from .fieldsets import Fieldset, sparse_fieldset
+from .caching import json_response_with_etag
+from . import agenda, batch
+from ..core.security import get_password_hash, verify_password_async, create_access_token
+from ..core.auth import get_current_user, get_current_active_user, get_current_admin_user, get_current_profissional_user, has_permission, principal_cache
+from ..core.cache import Principal
 
 router = APIRouter()
 
 # Endpoint de Login para obter o token JWT
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(form_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # A consulta roda no threadpool e o bcrypt no pool limitado de hashing, sem bloquear o event loop
+    user = await run_in_threadpool(db.query(models.User).filter(models.User.username == form_data.username).first)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -28,44 +40,47 @@ async def login_for_access_token(form_data: schemas.LoginRequest, db: Session =
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
+# Endpoint de diagnóstico: estado dos pools de conexão deste worker
+@router.get("/db/pool")
+def read_db_pool_status(current_user: Principal = Depends(get_current_admin_user)):
+    return {"sync": get_pool_status(database.engine), "async": get_pool_status(database.async_engine)}
+
 # Helper para obter o clinic_id do usuário logado
 def get_clinic_id_from_current_user(current_user: models.User = Depends(get_current_user)):
     return current_user.clinica_id
 
 # Endpoints para Clinica
 @router.post("/clinicas/", response_model=schemas.ClinicaInDBBase, status_code=status.HTTP_201_CREATED)
-def create_clinica(clinica: schemas.ClinicaCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_clinicas"))):
+def create_clinica(clinica: schemas.ClinicaCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_clinicas"))):
     db_clinica = models.Clinica(**clinica.dict())
     db.add(db_clinica)
     db.commit()
-    db.refresh(db_clinica)
     return db_clinica
 
 @router.get("/clinicas/", response_model=List[schemas.ClinicaInDBBase])
-def read_clinicas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_clinicas"))):
-    clinicas = db.query(models.Clinica).offset(skip).limit(limit).all()
-    return clinicas
+def read_clinicas(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_clinicas"))):
+    query = db.query(models.Clinica)
+    return paginate(query, [models.Clinica.id], skip, limit, cursor, response)
 
 @router.get("/clinicas/{clinica_id}", response_model=schemas.ClinicaInDBBase)
-def read_clinica(clinica_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_clinicas"))):
+def read_clinica(clinica_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_clinicas"))):
     clinica = db.query(models.Clinica).filter(models.Clinica.id == clinica_id).first()
     if clinica is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Clinica not found")
     return clinica
 
 @router.put("/clinicas/{clinica_id}", response_model=schemas.ClinicaInDBBase)
-def update_clinica(clinica_id: int, clinica: schemas.ClinicaUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_clinicas"))):
+def update_clinica(clinica_id: int, clinica: schemas.ClinicaUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_clinicas"))):
     db_clinica = db.query(models.Clinica).filter(models.Clinica.id == clinica_id).first()
     if db_clinica is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Clinica not found")
     for key, value in clinica.dict(exclude_unset=True).items():
         setattr(db_clinica, key, value)
     db.commit()
-    db.refresh(db_clinica)
     return db_clinica
 
 @router.delete("/clinicas/{clinica_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_clinica(clinica_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_clinicas"))):
+def delete_clinica(clinica_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_clinicas"))):
     db_clinica = db.query(models.Clinica).filter(models.Clinica.id == clinica_id).first()
     if db_clinica is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Clinica not found")
@@ -75,34 +90,33 @@ def delete_clinica(clinica_id: int, db: Session = Depends(get_db), current_user:
 
 # Endpoint público para listar clínicas
 @router.get("/clinicas-public/", response_model=List[schemas.ClinicaInDBBase])
-def read_clinicas_public(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    clinicas = db.query(models.Clinica).offset(skip).limit(limit).all()
-    return clinicas
+def read_clinicas_public(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    query = db.query(models.Clinica)
+    return paginate(query, [models.Clinica.id], skip, limit, cursor, response)
 
 
 # Endpoints para Perfil
 @router.post("/perfis/", response_model=schemas.PerfilInDBBase, status_code=status.HTTP_201_CREATED)
-def create_perfil(perfil: schemas.PerfilCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_perfis"))):
+def create_perfil(perfil: schemas.PerfilCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_perfis"))):
     db_perfil = models.Perfil(nome=perfil.nome)
     db.add(db_perfil)
     db.commit()
-    db.refresh(db_perfil)
     return db_perfil
 
 @router.get("/perfis/", response_model=List[schemas.PerfilInDBBase])
-def read_perfis(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_perfis"))):
-    perfis = db.query(models.Perfil).offset(skip).limit(limit).all()
-    return perfis
+def read_perfis(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_perfis"))):
+    query = db.query(models.Perfil)
+    return paginate(query, [models.Perfil.id], skip, limit, cursor, response)
 
 @router.get("/perfis/{perfil_id}", response_model=schemas.PerfilInDBBase)
-def read_perfil(perfil_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_perfis"))):
+def read_perfil(perfil_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_perfis"))):
     perfil = db.query(models.Perfil).filter(models.Perfil.id == perfil_id).first()
     if perfil is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil not found")
     return perfil
 
 @router.put("/perfis/{perfil_id}", response_model=schemas.PerfilInDBBase)
-def update_perfil(perfil_id: int, perfil_update: schemas.PerfilUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_perfis"))):
+def update_perfil(perfil_id: int, perfil_update: schemas.PerfilUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_perfis"))):
     db_perfil = db.query(models.Perfil).filter(models.Perfil.id == perfil_id).first()
     if db_perfil is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil not found")
@@ -122,67 +136,68 @@ def update_perfil(perfil_id: int, perfil_update: schemas.PerfilUpdate, db: Sessi
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Permissão com ID {perm_id} não encontrada.")
 
     db.commit()
-    db.refresh(db_perfil)
+    principal_cache.invalidate_perfil(perfil_id)
     return db_perfil
 
 @router.delete("/perfis/{perfil_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_perfil(perfil_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_perfis"))):
+def delete_perfil(perfil_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_perfis"))):
     db_perfil = db.query(models.Perfil).filter(models.Perfil.id == perfil_id).first()
     if db_perfil is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil not found")
     db.delete(db_perfil)
     db.commit()
+    principal_cache.invalidate_perfil(perfil_id)
     return {"message": "Perfil deleted successfully"}
 
 # Endpoints para Permissao
 @router.post("/permissoes/", response_model=schemas.PermissaoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_permissao(permissao: schemas.PermissaoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_permissoes"))):
+def create_permissao(permissao: schemas.PermissaoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_permissoes"))):
     db_permissao = models.Permissao(**permissao.dict())
     db.add(db_permissao)
     db.commit()
-    db.refresh(db_permissao)
     return db_permissao
 
 @router.get("/permissoes/", response_model=List[schemas.PermissaoInDBBase])
-def read_permissoes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_permissoes"))):
-    permissoes = db.query(models.Permissao).offset(skip).limit(limit).all()
-    return permissoes
+def read_permissoes(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_permissoes"))):
+    query = db.query(models.Permissao)
+    return paginate(query, [models.Permissao.id], skip, limit, cursor, response)
 
 @router.get("/permissoes/{permissao_id}", response_model=schemas.PermissaoInDBBase)
-def read_permissao(permissao_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_permissoes"))):
+def read_permissao(permissao_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_permissoes"))):
     permissao = db.query(models.Permissao).filter(models.Permissao.id == permissao_id).first()
     if permissao is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permissao not found")
     return permissao
 
 @router.put("/permissoes/{permissao_id}", response_model=schemas.PermissaoInDBBase)
-def update_permissao(permissao_id: int, permissao: schemas.PermissaoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_permissoes"))):
+def update_permissao(permissao_id: int, permissao: schemas.PermissaoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_permissoes"))):
     db_permissao = db.query(models.Permissao).filter(models.Permissao.id == permissao_id).first()
     if db_permissao is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permissao not found")
     for key, value in permissao.dict(exclude_unset=True).items():
         setattr(db_permissao, key, value)
     db.commit()
-    db.refresh(db_permissao)
+    # O nome da permissão pode estar em cache em qualquer perfil
+    principal_cache.clear()
     return db_permissao
 
 @router.delete("/permissoes/{permissao_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_permissao(permissao_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_permissoes"))):
+def delete_permissao(permissao_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_permissoes"))):
     db_permissao = db.query(models.Permissao).filter(models.Permissao.id == permissao_id).first()
     if db_permissao is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permissao not found")
     db.delete(db_permissao)
     db.commit()
+    principal_cache.clear()
     return {"message": "Permissao deleted successfully"}
 
 # Endpoints para User
 @router.post("/users/", response_model=schemas.UserInDBBase, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_usuarios"))):
+def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_usuarios"))):
     hashed_password = get_password_hash(user.password)
     db_user = models.User(username=user.username, email=user.email, hashed_password=hashed_password, perfil_id=user.perfil_id, clinica_id=user.clinica_id)
     db.add(db_user)
     db.commit()
-    db.refresh(db_user)
     return db_user
 
 @router.get("/users/me", response_model=schemas.UserInDBBase)
@@ -190,19 +205,19 @@ async def read_users_me(current_user: models.User = Depends(get_current_active_u
     return current_user
 
 @router.get("/users/", response_model=List[schemas.UserInDBBase])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_usuarios"))):
-    users = db.query(models.User).options(joinedload(models.User.perfil)).offset(skip).limit(limit).all()
-    return users
+def read_users(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_usuarios"))):
+    query = db.query(models.User).options(joinedload(models.User.perfil))
+    return paginate(query, [models.User.id], skip, limit, cursor, response)
 
 @router.get("/users/{user_id}", response_model=schemas.UserInDBBase)
-def read_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_usuarios"))):
+def read_user(user_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_usuarios"))):
     user = db.query(models.User).options(joinedload(models.User.perfil)).filter(models.User.id == user_id).first()
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
 
 @router.put("/users/{user_id}", response_model=schemas.UserInDBBase)
-def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_usuarios"))):
+def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_usuarios"))):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -223,21 +238,22 @@ def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(ge
         setattr(db_user, key, value)
 
     db.commit()
-    db.refresh(db_user)
+    principal_cache.invalidate_user(user_id)
     return db_user
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_usuarios"))):
+def delete_user(user_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_usuarios"))):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     db.delete(db_user)
     db.commit()
+    principal_cache.invalidate_user(user_id)
     return {"message": "User deleted successfully"}
 
 # Endpoints para Paciente
 @router.post("/pacientes/", response_model=schemas.PacienteInDBBase, status_code=status.HTTP_201_CREATED)
-def create_paciente(paciente: schemas.PacienteCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_pacientes"))):
+def create_paciente(paciente: schemas.PacienteCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_pacientes"))):
     # Lógica para associar paciente à clínica do usuário logado, se aplicável
     if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar paciente para esta clínica")
@@ -246,138 +262,129 @@ def create_paciente(paciente: schemas.PacienteCreate, db: Session = Depends(get_
     db_paciente = models.Paciente(**paciente.dict())
     db.add(db_paciente)
     db.commit()
-    db.refresh(db_paciente)
     return db_paciente
 
+@router.post("/pacientes/batch", response_model=schemas.BatchResultado[schemas.PacienteInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def create_pacientes_batch(pacientes: List[schemas.PacienteCreate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_pacientes"))):
+    lote = batch.Lote(pacientes)
+    lote.check_clinica(current_user, {i: p.clinica_id for i, p in lote.pendentes()}, "Não autorizado a criar paciente para esta clínica")
+    lote.check_unique(db, models.Paciente.cpf, {i: p.cpf for i, p in lote.pendentes()}, "CPF já cadastrado")
+    lote.check_unique(db, models.Paciente.email, {i: p.email for i, p in lote.pendentes()}, "Email já cadastrado")
+    linhas = {i: {**p.dict(), "clinica_id": p.clinica_id or current_user.clinica_id} for i, p in lote.pendentes()}
+    lote.registros = {i: batch.as_dict(row) for i, row in batch.insert_many(db, models.Paciente, linhas).items()}
+    db.commit()
+    return lote.resultado()
+
+@router.patch("/pacientes/batch", response_model=schemas.BatchResultado[schemas.PacienteInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def update_pacientes_batch(pacientes: List[schemas.PacienteBatchUpdate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_pacientes"))):
+    lote = batch.Lote(pacientes)
+    db_pacientes = lote.get_owned(db, current_user, models.Paciente, "Paciente not found", "Não autorizado a atualizar este paciente")
+    lote.check_clinica(current_user, {i: p.clinica_id for i, p in lote.pendentes() if "clinica_id" in p.model_fields_set}, "Não autorizado a mover paciente para esta clínica")
+    ids = {i: p.id for i, p in lote.pendentes()}
+    lote.check_unique(db, models.Paciente.cpf, {i: p.cpf for i, p in lote.pendentes()}, "CPF já cadastrado", ids)
+    lote.check_unique(db, models.Paciente.email, {i: p.email for i, p in lote.pendentes()}, "Email já cadastrado", ids)
+    lote.aplicar(db_pacientes)
+    db.flush()
+    lote.registros = {i: batch.as_dict(db_pacientes[i]) for i, _ in lote.pendentes()}
+    db.commit()
+    return lote.resultado()
+
+# fields= / include= nas leituras (ver app/api/fieldsets.py)
+pacientes_fieldset = sparse_fieldset(models.Paciente, schemas.PacienteInDBBase, relations=("plano", "clinica"))
+
 @router.get("/pacientes/", response_model=List[schemas.PacienteInDBBase])
-def read_pacientes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_pacientes"))):
-    if current_user.is_superuser:
-        pacientes = db.query(models.Paciente).offset(skip).limit(limit).all()
-    else:
-        pacientes = db.query(models.Paciente).filter(models.Paciente.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return pacientes
+async def read_pacientes(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, selecao: Fieldset = Depends(pacientes_fieldset), db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(has_permission("ler_pacientes"))):
+    query = select(models.Paciente).options(*selecao.options)
+    if not current_user.is_superuser:
+        query = query.where(models.Paciente.clinica_id == current_user.clinica_id)
+    return selecao.render(await paginate_async(db, query, [models.Paciente.id], skip, limit, cursor, response), response)
 
 @router.get("/pacientes/{paciente_id}", response_model=schemas.PacienteInDBBase)
-def read_paciente(paciente_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_pacientes"))):
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == paciente_id).first()
-    if paciente is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente not found")
-    # Verifica se o paciente pertence à clínica do usuário logado, a menos que seja admin
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este paciente")
-    return paciente
+def read_paciente(paciente_id: int, selecao: Fieldset = Depends(pacientes_fieldset), db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_pacientes"))):
+    return selecao.render(get_owned_or_404(db, models.Paciente, paciente_id, current_user, "Paciente not found", "Não autorizado a acessar este paciente", options=selecao.options))
 
 @router.put("/pacientes/{paciente_id}", response_model=schemas.PacienteInDBBase)
-def update_paciente(paciente_id: int, paciente: schemas.PacienteUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_pacientes"))):
-    db_paciente = db.query(models.Paciente).filter(models.Paciente.id == paciente_id).first()
-    if db_paciente is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente not found")
-    # Verifica permissão de atualização
-    if not current_user.is_superuser and db_paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este paciente")
+def update_paciente(paciente_id: int, paciente: schemas.PacienteUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_pacientes"))):
+    db_paciente = get_owned_or_404(db, models.Paciente, paciente_id, current_user, "Paciente not found", "Não autorizado a atualizar este paciente")
     for key, value in paciente.dict(exclude_unset=True).items():
         setattr(db_paciente, key, value)
     db.commit()
-    db.refresh(db_paciente)
     return db_paciente
 
 @router.delete("/pacientes/{paciente_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_paciente(paciente_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_pacientes"))):
-    db_paciente = db.query(models.Paciente).filter(models.Paciente.id == paciente_id).first()
-    if db_paciente is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente not found")
-    # Verifica permissão de exclusão
-    if not current_user.is_superuser and db_paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este paciente")
+def delete_paciente(paciente_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_pacientes"))):
+    db_paciente = get_owned_or_404(db, models.Paciente, paciente_id, current_user, "Paciente not found", "Não autorizado a excluir este paciente")
     db.delete(db_paciente)
     db.commit()
     return {"message": "Paciente deleted successfully"}
 
 # Endpoints para LancamentoFinanceiro
 @router.post("/lancamentos-financeiros/", response_model=schemas.LancamentoFinanceiroInDBBase, status_code=status.HTTP_201_CREATED)
-def create_lancamento_financeiro(lancamento: schemas.LancamentoFinanceiroCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_lancamentos_financeiros"))):
+def create_lancamento_financeiro(lancamento: schemas.LancamentoFinanceiroCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_lancamentos_financeiros"))):
+    # Lançamento avulso pertence à clínica de quem o criou
+    clinica_id = current_user.clinica_id
     # If an attendance is linked, ensure it belongs to the user's clinic
     if lancamento.atendimento_id:
-        atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == lancamento.atendimento_id).first()
-        if not atendimento:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Atendimento not found")
-        agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == atendimento.agendamento_id).first()
-        paciente = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-        if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar lançamento financeiro para este atendimento")
-
-    db_lancamento = models.LancamentoFinanceiro(**lancamento.dict())
+        clinica_id, = check_parents(db, current_user, (models.Atendimento, lancamento.atendimento_id, "Atendimento not found", "Não autorizado a criar lançamento financeiro para este atendimento"))
+
+    db_lancamento = models.LancamentoFinanceiro(**lancamento.dict(), clinica_id=clinica_id)
     db.add(db_lancamento)
     db.commit()
-    db.refresh(db_lancamento)
     return db_lancamento
 
+@router.post("/lancamentos-financeiros/batch", response_model=schemas.BatchResultado[schemas.LancamentoFinanceiroInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def create_lancamentos_financeiros_batch(lancamentos: List[schemas.LancamentoFinanceiroCreate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_lancamentos_financeiros"))):
+    lote = batch.Lote(lancamentos)
+    clinicas = lote.check_parents(db, current_user, models.Atendimento, {i: l.atendimento_id for i, l in lote.pendentes()}, "Atendimento not found", "Não autorizado a criar lançamento financeiro para este atendimento")
+    # Lançamento avulso pertence à clínica de quem o criou
+    linhas = {i: {**l.dict(), "clinica_id": clinicas.get(i, current_user.clinica_id)} for i, l in lote.pendentes()}
+    lote.registros = {i: batch.as_dict(row) for i, row in batch.insert_many(db, models.LancamentoFinanceiro, linhas).items()}
+    db.commit()
+    return lote.resultado()
+
+@router.patch("/lancamentos-financeiros/batch", response_model=schemas.BatchResultado[schemas.LancamentoFinanceiroInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def update_lancamentos_financeiros_batch(lancamentos: List[schemas.LancamentoFinanceiroBatchUpdate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_lancamentos_financeiros"))):
+    lote = batch.Lote(lancamentos)
+    db_lancamentos = lote.get_owned(db, current_user, models.LancamentoFinanceiro, "LancamentoFinanceiro not found", "Não autorizado a atualizar este lançamento financeiro")
+    lote.check_parents(db, current_user, models.Atendimento, {i: l.atendimento_id for i, l in lote.pendentes()}, "Atendimento not found", "Não autorizado a vincular lançamento financeiro a este atendimento")
+    lote.aplicar(db_lancamentos)
+    db.flush()
+    lote.registros = {i: batch.as_dict(db_lancamentos[i]) for i, _ in lote.pendentes()}
+    db.commit()
+    return lote.resultado()
+
 @router.get("/lancamentos-financeiros/", response_model=List[schemas.LancamentoFinanceiroInDBBase])
-def read_lancamentos_financeiros(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_lancamentos_financeiros"))):
-    if current_user.is_superuser:
-        lancamentos = db.query(models.LancamentoFinanceiro).offset(skip).limit(limit).all()
-    else:
-        # Filter by attendance's patient's clinic, which is linked to the user's clinic
-        lancamentos = db.query(models.LancamentoFinanceiro).join(models.Atendimento).join(models.Agendamento).join(models.Paciente).filter(models.Paciente.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return lancamentos
+def read_lancamentos_financeiros(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_lancamentos_financeiros"))):
+    query = db.query(models.LancamentoFinanceiro)
+    if not current_user.is_superuser:
+        query = query.filter(models.LancamentoFinanceiro.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.LancamentoFinanceiro.data_vencimento, models.LancamentoFinanceiro.id], skip, limit, cursor, response)
 
 @router.get("/lancamentos-financeiros/{lancamento_id}", response_model=schemas.LancamentoFinanceiroInDBBase)
-def read_lancamento_financeiro(lancamento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_lancamentos_financeiros"))):
-    lancamento = db.query(models.LancamentoFinanceiro).filter(models.LancamentoFinanceiro.id == lancamento_id).first()
-    if lancamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="LancamentoFinanceiro not found")
-    
-    # Check if the financial entry's attendance's patient belongs to the current user's clinic (unless admin)
-    if lancamento.atendimento_id:
-        atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == lancamento.atendimento_id).first()
-        agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == atendimento.agendamento_id).first()
-        paciente = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-        if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este lançamento financeiro")
-
-    return lancamento
+def read_lancamento_financeiro(lancamento_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_lancamentos_financeiros"))):
+    return get_owned_or_404(db, models.LancamentoFinanceiro, lancamento_id, current_user, "LancamentoFinanceiro not found", "Não autorizado a acessar este lançamento financeiro")
 
 @router.put("/lancamentos-financeiros/{lancamento_id}", response_model=schemas.LancamentoFinanceiroInDBBase)
-def update_lancamento_financeiro(lancamento_id: int, lancamento: schemas.LancamentoFinanceiroUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_lancamentos_financeiros"))):
-    db_lancamento = db.query(models.LancamentoFinanceiro).filter(models.LancamentoFinanceiro.id == lancamento_id).first()
-    if db_lancamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="LancamentoFinanceiro not found")
-    
-    # Check if the financial entry's attendance's patient belongs to the current user's clinic (unless admin)
-    if db_lancamento.atendimento_id:
-        atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == db_lancamento.atendimento_id).first()
-        agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == atendimento.agendamento_id).first()
-        paciente = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-        if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este lançamento financeiro")
-
-    for key, value in lancamento.dict(exclude_unset=True).items():
+def update_lancamento_financeiro(lancamento_id: int, lancamento: schemas.LancamentoFinanceiroUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_lancamentos_financeiros"))):
+    db_lancamento = get_owned_or_404(db, models.LancamentoFinanceiro, lancamento_id, current_user, "LancamentoFinanceiro not found", "Não autorizado a atualizar este lançamento financeiro")
+    changes = lancamento.dict(exclude_unset=True)
+    check_changed_parents(db, current_user, db_lancamento, changes,
+                          (models.Atendimento, "atendimento_id", "Atendimento not found", "Não autorizado a vincular lançamento financeiro a este atendimento"))
+    for key, value in changes.items():
         setattr(db_lancamento, key, value)
     db.commit()
-    db.refresh(db_lancamento)
     return db_lancamento
 
 @router.delete("/lancamentos-financeiros/{lancamento_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_lancamento_financeiro(lancamento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_lancamentos_financeiros"))):
-    db_lancamento = db.query(models.LancamentoFinanceiro).filter(models.LancamentoFinanceiro.id == lancamento_id).first()
-    if db_lancamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="LancamentoFinanceiro not found")
-    
-    # Check if the financial entry's attendance's patient belongs to the current user's clinic (unless admin)
-    if db_lancamento.atendimento_id:
-        atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == db_lancamento.atendimento_id).first()
-        agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == atendimento.agendamento_id).first()
-        paciente = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-        if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este lançamento financeiro")
-
+def delete_lancamento_financeiro(lancamento_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_lancamentos_financeiros"))):
+    db_lancamento = get_owned_or_404(db, models.LancamentoFinanceiro, lancamento_id, current_user, "LancamentoFinanceiro not found", "Não autorizado a excluir este lançamento financeiro")
     db.delete(db_lancamento)
     db.commit()
     return {"message": "LancamentoFinanceiro deleted successfully"}
 
 # Endpoints para Lead
 @router.post("/leads/", response_model=schemas.LeadInDBBase, status_code=status.HTTP_201_CREATED)
-def create_lead(lead: schemas.LeadCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_leads"))):
+def create_lead(lead: schemas.LeadCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_leads"))):
     if not current_user.is_superuser and lead.clinica_id != current_user.clinica_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar lead para esta clínica")
     if lead.clinica_id is None:
@@ -385,123 +392,97 @@ def create_lead(lead: schemas.LeadCreate, db: Session = Depends(get_db), current
     db_lead = models.Lead(**lead.dict())
     db.add(db_lead)
     db.commit()
-    db.refresh(db_lead)
     return db_lead
 
+@router.post("/leads/batch", response_model=schemas.BatchResultado[schemas.LeadInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def create_leads_batch(leads: List[schemas.LeadCreate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_leads"))):
+    lote = batch.Lote(leads)
+    lote.check_clinica(current_user, {i: l.clinica_id for i, l in lote.pendentes()}, "Não autorizado a criar lead para esta clínica")
+    linhas = {i: {**l.dict(), "clinica_id": l.clinica_id or current_user.clinica_id} for i, l in lote.pendentes()}
+    lote.registros = {i: batch.as_dict(row) for i, row in batch.insert_many(db, models.Lead, linhas).items()}
+    db.commit()
+    return lote.resultado()
+
+@router.patch("/leads/batch", response_model=schemas.BatchResultado[schemas.LeadInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def update_leads_batch(leads: List[schemas.LeadBatchUpdate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_leads"))):
+    lote = batch.Lote(leads)
+    db_leads = lote.get_owned(db, current_user, models.Lead, "Lead not found", "Não autorizado a atualizar este lead")
+    lote.check_clinica(current_user, {i: l.clinica_id for i, l in lote.pendentes() if "clinica_id" in l.model_fields_set}, "Não autorizado a mover lead para esta clínica")
+    lote.aplicar(db_leads)
+    db.flush()
+    lote.registros = {i: batch.as_dict(db_leads[i]) for i, _ in lote.pendentes()}
+    db.commit()
+    return lote.resultado()
+
 @router.get("/leads/", response_model=List[schemas.LeadInDBBase])
-def read_leads(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_leads"))):
-    if current_user.is_superuser:
-        leads = db.query(models.Lead).offset(skip).limit(limit).all()
-    else:
-        leads = db.query(models.Lead).filter(models.Lead.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return leads
+def read_leads(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_leads"))):
+    query = db.query(models.Lead)
+    if not current_user.is_superuser:
+        query = query.filter(models.Lead.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.Lead.id], skip, limit, cursor, response)
 
 @router.get("/leads/{lead_id}", response_model=schemas.LeadInDBBase)
-def read_lead(lead_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_leads"))):
-    lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
-    if lead is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead not found")
-    if not current_user.is_superuser and lead.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este lead")
-    return lead
+def read_lead(lead_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_leads"))):
+    return get_owned_or_404(db, models.Lead, lead_id, current_user, "Lead not found", "Não autorizado a acessar este lead")
 
 @router.put("/leads/{lead_id}", response_model=schemas.LeadInDBBase)
-def update_lead(lead_id: int, lead: schemas.LeadUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_leads"))):
-    db_lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
-    if db_lead is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead not found")
-    if not current_user.is_superuser and db_lead.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este lead")
+def update_lead(lead_id: int, lead: schemas.LeadUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_leads"))):
+    db_lead = get_owned_or_404(db, models.Lead, lead_id, current_user, "Lead not found", "Não autorizado a atualizar este lead")
     for key, value in lead.dict(exclude_unset=True).items():
         setattr(db_lead, key, value)
     db.commit()
-    db.refresh(db_lead)
     return db_lead
 
 @router.delete("/leads/{lead_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_lead(lead_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_leads"))):
-    db_lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
-    if db_lead is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead not found")
-    if not current_user.is_superuser and db_lead.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este lead")
+def delete_lead(lead_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_leads"))):
+    db_lead = get_owned_or_404(db, models.Lead, lead_id, current_user, "Lead not found", "Não autorizado a excluir este lead")
     db.delete(db_lead)
     db.commit()
     return {"message": "Lead deleted successfully"}
 
 # Endpoints para Profissional
 @router.post("/profissionais/", response_model=schemas.ProfissionalInDBBase, status_code=status.HTTP_201_CREATED)
-def create_profissional(profissional: schemas.ProfissionalCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_profissionais"))):
+def create_profissional(profissional: schemas.ProfissionalCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_profissionais"))):
     # Ensure the user associated with the professional belongs to the current user's clinic (unless admin)
-    user_obj = db.query(models.User).filter(models.User.id == profissional.user_id).first()
-    if not user_obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
-    if not current_user.is_superuser and user_obj.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar profissional para a clínica deste usuário")
+    check_parents(db, current_user, (models.User, profissional.user_id, "Usuário não encontrado", "Não autorizado a criar profissional para a clínica deste usuário"))
 
     db_profissional = models.Profissional(**profissional.dict())
     db.add(db_profissional)
     db.commit()
-    db.refresh(db_profissional)
     return db_profissional
 
+profissionais_fieldset = sparse_fieldset(models.Profissional, schemas.ProfissionalInDBBase, relations=("user",))
+
 @router.get("/profissionais/", response_model=List[schemas.ProfissionalInDBBase])
-def read_profissionais(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_profissionais"))):
-    if current_user.is_superuser:
-        profissionais = db.query(models.Profissional).offset(skip).limit(limit).all()
-    else:
+def read_profissionais(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, selecao: Fieldset = Depends(profissionais_fieldset), db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_profissionais"))):
+    query = db.query(models.Profissional).options(*selecao.options)
+    if not current_user.is_superuser:
         # Filter by user's clinic, which is linked to the user's clinic
-        profissionais = db.query(models.Profissional).join(models.User).filter(models.User.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return profissionais
+        query = query.join(models.User).filter(models.User.clinica_id == current_user.clinica_id)
+    return selecao.render(paginate(query, [models.Profissional.id], skip, limit, cursor, response), response)
 
 @router.get("/profissionais/{profissional_id}", response_model=schemas.ProfissionalInDBBase)
-def read_profissional(profissional_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_profissionais"))):
-    profissional = db.query(models.Profissional).filter(models.Profissional.id == profissional_id).first()
-    if profissional is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profissional not found")
-    
-    # Check if the professional's user belongs to the current user's clinic (unless admin)
-    user_obj = db.query(models.User).filter(models.User.id == profissional.user_id).first()
-    if not current_user.is_superuser and user_obj.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este profissional")
-
-    return profissional
+def read_profissional(profissional_id: int, selecao: Fieldset = Depends(profissionais_fieldset), db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_profissionais"))):
+    return selecao.render(get_owned_or_404(db, models.Profissional, profissional_id, current_user, "Profissional not found", "Não autorizado a acessar este profissional", options=selecao.options))
 
 @router.put("/profissionais/{profissional_id}", response_model=schemas.ProfissionalInDBBase)
-def update_profissional(profissional_id: int, profissional: schemas.ProfissionalUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_profissionais"))):
-    db_profissional = db.query(models.Profissional).filter(models.Profissional.id == profissional_id).first()
-    if db_profissional is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profissional não encontrado")
-    
-    # Check if the professional's user belongs to the current user's clinic (unless admin)
-    user_obj = db.query(models.User).filter(models.User.id == db_profissional.user_id).first()
-    if not current_user.is_superuser and user_obj.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este profissional")
-
+def update_profissional(profissional_id: int, profissional: schemas.ProfissionalUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_profissionais"))):
+    db_profissional = get_owned_or_404(db, models.Profissional, profissional_id, current_user, "Profissional não encontrado", "Não autorizado a atualizar este profissional")
     for key, value in profissional.dict(exclude_unset=True).items():
         setattr(db_profissional, key, value)
     db.commit()
-    db.refresh(db_profissional)
     return db_profissional
 
 @router.delete("/profissionais/{profissional_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_profissional(profissional_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_profissionais"))):
-    db_profissional = db.query(models.Profissional).filter(models.Profissional.id == profissional_id).first()
-    if db_profissional is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profissional não encontrado")
-    
-    # Check if the professional's user belongs to the current user's clinic (unless admin)
-    user_obj = db.query(models.User).filter(models.User.id == db_profissional.user_id).first()
-    if not current_user.is_superuser and user_obj.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este profissional")
-
+def delete_profissional(profissional_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_profissionais"))):
+    db_profissional = get_owned_or_404(db, models.Profissional, profissional_id, current_user, "Profissional não encontrado", "Não autorizado a excluir este profissional")
     db.delete(db_profissional)
     db.commit()
     return {"message": "Profissional deleted successfully"}
 
 # Endpoints para TipoTratamento
 @router.post("/tipos-tratamento/", response_model=schemas.TipoTratamentoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_tipo_tratamento(tipo_tratamento: schemas.TipoTratamentoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_tipos_tratamento"))):
+def create_tipo_tratamento(tipo_tratamento: schemas.TipoTratamentoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_tipos_tratamento"))):
     if not current_user.is_superuser and tipo_tratamento.clinica_id != current_user.clinica_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar tipo de tratamento para esta clínica")
     if tipo_tratamento.clinica_id is None:
@@ -509,355 +490,516 @@ def create_tipo_tratamento(tipo_tratamento: schemas.TipoTratamentoCreate, db: Se
     db_tipo_tratamento = models.TipoTratamento(**tipo_tratamento.dict())
     db.add(db_tipo_tratamento)
     db.commit()
-    db.refresh(db_tipo_tratamento)
     return db_tipo_tratamento
 
 @router.get("/tipos-tratamento/", response_model=List[schemas.TipoTratamentoInDBBase])
-def read_tipos_tratamento(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_tipos_tratamento"))):
-    if current_user.is_superuser:
-        tipos_tratamento = db.query(models.TipoTratamento).offset(skip).limit(limit).all()
-    else:
-        tipos_tratamento = db.query(models.TipoTratamento).filter(models.TipoTratamento.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return tipos_tratamento
+def read_tipos_tratamento(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_tipos_tratamento"))):
+    query = db.query(models.TipoTratamento)
+    if not current_user.is_superuser:
+        query = query.filter(models.TipoTratamento.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.TipoTratamento.id], skip, limit, cursor, response)
 
 @router.get("/tipos-tratamento/{tipo_tratamento_id}", response_model=schemas.TipoTratamentoInDBBase)
-def read_tipo_tratamento(tipo_tratamento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_tipos_tratamento"))):
-    tipo_tratamento = db.query(models.TipoTratamento).filter(models.TipoTratamento.id == tipo_tratamento_id).first()
-    if tipo_tratamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="TipoTratamento not found")
-    if not current_user.is_superuser and tipo_tratamento.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este tipo de tratamento")
-    return tipo_tratamento
+def read_tipo_tratamento(tipo_tratamento_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_tipos_tratamento"))):
+    return get_owned_or_404(db, models.TipoTratamento, tipo_tratamento_id, current_user, "TipoTratamento not found", "Não autorizado a acessar este tipo de tratamento")
 
 @router.put("/tipos-tratamento/{tipo_tratamento_id}", response_model=schemas.TipoTratamentoInDBBase)
-def update_tipo_tratamento(tipo_tratamento_id: int, tipo_tratamento: schemas.TipoTratamentoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_tipos_tratamento"))):
-    db_tipo_tratamento = db.query(models.TipoTratamento).filter(models.TipoTratamento.id == tipo_tratamento_id).first()
-    if db_tipo_tratamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="TipoTratamento not found")
-    if not current_user.is_superuser and db_tipo_tratamento.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este tipo de tratamento")
+def update_tipo_tratamento(tipo_tratamento_id: int, tipo_tratamento: schemas.TipoTratamentoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_tipos_tratamento"))):
+    db_tipo_tratamento = get_owned_or_404(db, models.TipoTratamento, tipo_tratamento_id, current_user, "TipoTratamento not found", "Não autorizado a atualizar este tipo de tratamento")
     for key, value in tipo_tratamento.dict(exclude_unset=True).items():
         setattr(db_tipo_tratamento, key, value)
     db.commit()
-    db.refresh(db_tipo_tratamento)
     return db_tipo_tratamento
 
 @router.delete("/tipos-tratamento/{tipo_tratamento_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_tipo_tratamento(tipo_tratamento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_tipos_tratamento"))):
-    db_tipo_tratamento = db.query(models.TipoTratamento).filter(models.TipoTratamento.id == tipo_tratamento_id).first()
-    if db_tipo_tratamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="TipoTratamento not found")
-    if not current_user.is_superuser and db_tipo_tratamento.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este tipo de tratamento")
+def delete_tipo_tratamento(tipo_tratamento_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_tipos_tratamento"))):
+    db_tipo_tratamento = get_owned_or_404(db, models.TipoTratamento, tipo_tratamento_id, current_user, "TipoTratamento not found", "Não autorizado a excluir este tipo de tratamento")
     db.delete(db_tipo_tratamento)
     db.commit()
     return {"message": "TipoTratamento deleted successfully"}
 
 # Endpoints para Agendamento
-@router.post("/agendamentos/", response_model=schemas.AgendamentoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_agendamento(agendamento: schemas.AgendamentoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_agendamentos"))):
-    # Ensure the patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-    if not paciente:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar agendamento para este paciente")
 
-    # Ensure the professional belongs to the current user's clinic (unless admin)
+# Janela padrão e máxima das consultas de agenda e de horários livres
+AGENDA_DIAS_PADRAO = 7
+AGENDA_DIAS_MAXIMO = 31
+
+@router.post("/agendamentos/", response_model=schemas.AgendamentoInDBBase, status_code=status.HTTP_201_CREATED)
+def create_agendamento(agendamento: schemas.AgendamentoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_agendamentos"))):
+    # Ensure the patient and the professional belong to the current user's clinic (unless admin)
+    parents = [(models.Paciente, agendamento.paciente_id, "Patient not found", "Não autorizado a criar agendamento para este paciente")]
     if agendamento.profissional_id:
-        profissional = db.query(models.Profissional).filter(models.Profissional.id == agendamento.profissional_id).first()
-        if not profissional:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Professional not found")
-        profissional_user = db.query(models.User).filter(models.User.id == profissional.user_id).first()
-        if not current_user.is_superuser and profissional_user.clinica_id != current_user.clinica_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar agendamento com este profissional")
-
-    db_agendamento = models.Agendamento(**agendamento.dict())
+        parents.append((models.Profissional, agendamento.profissional_id, "Professional not found", "Não autorizado a criar agendamento com este profissional"))
+    clinica_id = check_parents(db, current_user, *parents)[0]
+
+    db_agendamento = models.Agendamento(**agendamento.dict(), clinica_id=clinica_id)
+    duracao, num_guiches = agenda.parametros_da_clinica(db, clinica_id)
+    db_agendamento.data_fim = agenda.somar(db_agendamento.data, duracao)
+    agenda.reservar(db, db_agendamento, num_guiches)
     db.add(db_agendamento)
-    db.commit()
-    db.refresh(db_agendamento)
+    agenda.commit_agendamento(db, db_agendamento)
     return db_agendamento
 
-@router.get("/agendamentos/", response_model=List[schemas.AgendamentoInDBBase])
-def read_agendamentos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_agendamentos"))):
-    if current_user.is_superuser:
-        agendamentos = db.query(models.Agendamento).offset(skip).limit(limit).all()
+@router.post("/agendamentos/recorrentes", response_model=List[schemas.AgendamentoInDBBase], status_code=status.HTTP_201_CREATED)
+def create_agendamentos_recorrentes(serie: schemas.AgendamentoRecorrenteCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_agendamentos"))):
+    datas = agenda.datas_da_serie(serie)
+    # Paciente e profissional validados uma vez para a série inteira
+    parents = [(models.Paciente, serie.paciente_id, "Patient not found", "Não autorizado a criar agendamento para este paciente")]
+    if serie.profissional_id:
+        parents.append((models.Profissional, serie.profissional_id, "Professional not found", "Não autorizado a criar agendamento com este profissional"))
+    clinica_id = check_parents(db, current_user, *parents)[0]
+
+    duracao, num_guiches = agenda.parametros_da_clinica(db, clinica_id)
+    if serie.status == schemas.AgendamentoStatusEnum.CANCELADO:
+        reservas = [(inicio, agenda.somar(inicio, duracao), serie.guiche_numero) for inicio in datas]
     else:
-        # Filter by patient's clinic, which is linked to the user's clinic
-        agendamentos = db.query(models.Agendamento).join(models.Paciente).filter(models.Paciente.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return agendamentos
+        reservas = [(r.inicio, r.fim, r.guiche_numero) for r in agenda.reservar_serie(db, datas, duracao, clinica_id, num_guiches, serie.profissional_id, serie.guiche_numero)]
+
+    # Um único INSERT de várias linhas e um único commit; o RETURNING traz as colunas da resposta, na ordem da série, sem recarregar objetos
+    rows = db.execute(insert(models.Agendamento).returning(*models.Agendamento.__table__.c, sort_by_parameter_order=True), [
+        {
+            "paciente_id": serie.paciente_id,
+            "profissional_id": serie.profissional_id,
+            "status": serie.status.value,
+            "clinica_id": clinica_id,
+            "data": inicio,
+            "data_fim": fim,
+            "guiche_numero": guiche,
+        }
+        for inicio, fim, guiche in reservas
+    ]).all()
+    agenda.commit_agendamento(db, *rows)
+    return [row._asdict() for row in rows]
+
+@router.post("/agendamentos/batch", response_model=schemas.BatchResultado[schemas.AgendamentoInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def create_agendamentos_batch(agendamentos: List[schemas.AgendamentoCreate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_agendamentos"))):
+    lote = batch.Lote(agendamentos)
+    clinicas = lote.check_parents(db, current_user, models.Paciente, {i: a.paciente_id for i, a in lote.pendentes()}, "Patient not found", "Não autorizado a criar agendamento para este paciente")
+    lote.check_parents(db, current_user, models.Profissional, {i: a.profissional_id for i, a in lote.pendentes()}, "Professional not found", "Não autorizado a criar agendamento com este profissional")
+
+    # Conflitos e guichês de todo o lote em uma consulta; cada item aceito ocupa o horário para os seguintes
+    parametros = agenda.parametros_das_clinicas(db, clinicas.values())
+    reservas = {}
+    for i, a in lote.pendentes():
+        duracao, num_guiches = parametros[clinicas[i]]
+        try:
+            data_fim = agenda.somar(a.data, duracao)
+        except HTTPException as erro:
+            lote.falhar(i, erro)
+            continue
+        reservas[i] = agenda.Reserva(a.data, data_fim, clinicas[i], num_guiches, profissional_id=a.profissional_id, guiche_numero=a.guiche_numero)
+    ativas = {i: r for i, r in reservas.items() if agendamentos[i].status != schemas.AgendamentoStatusEnum.CANCELADO}
+    agenda.verificar_reservas(db, list(ativas.values()))
+    for i, reserva in ativas.items():
+        if reserva.erro is not None:
+            lote.falhar(i, reserva.erro)
+
+    linhas = {
+        i: {**a.dict(), "clinica_id": clinicas[i], "data_fim": reservas[i].fim, "guiche_numero": reservas[i].guiche_numero}
+        for i, a in lote.pendentes()
+    }
+    rows = batch.insert_many(db, models.Agendamento, linhas)
+    lote.registros = {i: batch.as_dict(row) for i, row in rows.items()}
+    agenda.commit_agendamento(db, *rows.values())
+    return lote.resultado()
+
+@router.patch("/agendamentos/batch", response_model=schemas.BatchResultado[schemas.AgendamentoInDBBase], status_code=status.HTTP_207_MULTI_STATUS)
+def update_agendamentos_batch(agendamentos: List[schemas.AgendamentoBatchUpdate], db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_agendamentos"))):
+    lote = batch.Lote(agendamentos)
+    db_agendamentos = lote.get_owned(db, current_user, models.Agendamento, "Agendamento not found", "Não autorizado a atualizar este agendamento")
+    lote.check_parents(db, current_user, models.Paciente, {i: a.paciente_id for i, a in lote.pendentes()}, "Patient not found", "Não autorizado a mover agendamento para este paciente")
+    lote.check_parents(db, current_user, models.Profissional, {i: a.profissional_id for i, a in lote.pendentes()}, "Professional not found", "Não autorizado a agendar com este profissional")
+
+    anteriores = {i: (db_agendamentos[i].data_fim, db_agendamentos[i].data, db_agendamentos[i].guiche_numero) for i, _ in lote.pendentes()}
+    alteracoes = lote.aplicar(db_agendamentos)
+    # Mesma regra do update individual: remarcações, trocas de profissional/guichê e reativações
+    reagendados = [i for i, changes in alteracoes.items() if changes.keys() & {"data", "profissional_id", "guiche_numero", "status"}]
+    parametros = agenda.parametros_das_clinicas(db, [db_agendamentos[i].clinica_id for i in reagendados])
+    reservas = {}
+    for i in reagendados:
+        db_agendamento = db_agendamentos[i]
+        data_fim, data, guiche_anterior = anteriores[i]
+        duracao_padrao, num_guiches = parametros[db_agendamento.clinica_id]
+        try:
+            db_agendamento.data_fim = agenda.somar(db_agendamento.data, data_fim - data if data_fim is not None else duracao_padrao)
+        except HTTPException as erro:
+            lote.falhar(i, erro)
+            db.expire(db_agendamento)
+            continue
+        if db_agendamento.status == agenda.STATUS_SEM_CONFLITO:
+            continue
+        if "guiche_numero" not in alteracoes[i]:
+            db_agendamento.guiche_numero = None
+        reservas[i] = agenda.Reserva(
+            db_agendamento.data, db_agendamento.data_fim, db_agendamento.clinica_id, num_guiches,
+            profissional_id=db_agendamento.profissional_id, guiche_numero=db_agendamento.guiche_numero, agendamento_id=db_agendamento.id, preferido=guiche_anterior,
+        )
+    agenda.verificar_reservas(db, list(reservas.values()))
+    for i, reserva in reservas.items():
+        if reserva.erro is not None:
+            lote.falhar(i, reserva.erro)
+            # descarta as alterações do item recusado
+            db.expire(db_agendamentos[i])
+        else:
+            db_agendamentos[i].guiche_numero = reserva.guiche_numero
+
+    db.flush()
+    lote.registros = {i: batch.as_dict(db_agendamentos[i]) for i, _ in lote.pendentes()}
+    agenda.commit_agendamento(db, *[db_agendamentos[i] for i in lote.registros])
+    return lote.resultado()
+
+# A data é chave da paginação e é sempre carregada
+agendamentos_fieldset = sparse_fieldset(models.Agendamento, schemas.AgendamentoInDBBase, relations=("paciente", "profissional", "profissional.user", "atendimento"),
+                                        keys=(models.Agendamento.data,))
+
+@router.get("/agendamentos/", response_model=List[schemas.AgendamentoInDBBase])
+async def read_agendamentos(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    profissional_id: Optional[int] = None,
+    status_agendamento: Optional[schemas.AgendamentoStatusEnum] = Query(None, alias="status"),
+    guiche_numero: Optional[int] = None,
+    selecao: Fieldset = Depends(agendamentos_fieldset),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(has_permission("ler_agendamentos")),
+):
+    # Intervalo semiaberto [start, end), resolvido pelos índices (clinica_id, data, id) / (profissional_id, data)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intervalo inválido: start deve ser anterior a end")
+    query = select(models.Agendamento).options(*selecao.options)
+    if not current_user.is_superuser:
+        query = query.where(models.Agendamento.clinica_id == current_user.clinica_id)
+    if start is not None:
+        query = query.where(models.Agendamento.data >= start)
+    if end is not None:
+        query = query.where(models.Agendamento.data < end)
+    if profissional_id is not None:
+        query = query.where(models.Agendamento.profissional_id == profissional_id)
+    if status_agendamento is not None:
+        query = query.where(models.Agendamento.status == status_agendamento.value)
+    if guiche_numero is not None:
+        query = query.where(models.Agendamento.guiche_numero == guiche_numero)
+    return selecao.render(await paginate_async(db, query, [models.Agendamento.data, models.Agendamento.id], skip, limit, cursor, response), response)
+
+@router.get("/agendamentos/slots", response_model=List[schemas.HorarioLivre])
+async def read_horarios_livres(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    clinica_id: Optional[int] = None,
+    tipo_tratamento_id: Optional[int] = None,
+    profissional_id: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(has_permission("ler_agendamentos")),
+):
+    if start is None:
+        start = datetime.combine(datetime.now().date(), time.min)
+    if end is None:
+        end = agenda.somar(start, timedelta(days=AGENDA_DIAS_PADRAO))
+    if start >= end or end - start > timedelta(days=AGENDA_DIAS_MAXIMO):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Intervalo inválido: start deve ser anterior a end e o período não pode passar de {AGENDA_DIAS_MAXIMO} dias")
+    minimo, maximo = agenda.HORARIOS_LIVRES_PERIODO
+    if start < minimo or end > maximo:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=agenda.FORA_DO_CALENDARIO)
+    clinica_id = resolve_clinica_id(current_user, clinica_id, "Não autorizado a consultar horários desta clínica")
+
+    clinica = (await db.execute(
+        select(models.Clinica.num_guiches, models.Clinica.tempo_minimo_atendimento).where(models.Clinica.id == clinica_id)
+    )).first()
+    if clinica is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Clinica not found")
+    minutos = clinica.tempo_minimo_atendimento
+    if tipo_tratamento_id is not None:
+        minutos = await db.scalar(select(models.TipoTratamento.tempo_minimo_atendimento).where(
+            models.TipoTratamento.id == tipo_tratamento_id, models.TipoTratamento.clinica_id == clinica_id,
+        ))
+        if minutos is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="TipoTratamento not found")
+
+    query = (
+        select(models.Profissional.id, models.Profissional.carga_horaria_semanal)
+        .join(models.User, models.User.id == models.Profissional.user_id)
+        .where(models.User.clinica_id == clinica_id)
+        .order_by(models.Profissional.id)
+    )
+    if profissional_id:
+        query = query.where(models.Profissional.id.in_(profissional_id))
+    profissionais = (await db.execute(query)).all()
+    if profissional_id and len(profissionais) != len(set(profissional_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Professional not found")
+
+    # Todos os agendamentos ativos da clínica no período, em uma consulta (índice clinica_id, data): ocupam o
+    # profissional e um dos guichês
+    agendamentos = (await db.execute(
+        select(models.Agendamento.data, models.Agendamento.data_fim, models.Agendamento.profissional_id)
+        .where(
+            models.Agendamento.clinica_id == clinica_id,
+            models.Agendamento.data > start - models.DURACAO_MAXIMA_AGENDAMENTO,
+            models.Agendamento.data < end,
+            models.Agendamento.data_fim > start,
+            models.Agendamento.status != agenda.STATUS_SEM_CONFLITO,
+        )
+        .order_by(models.Agendamento.data)
+    )).all()
+
+    return agenda.horarios_livres(
+        agendamentos,
+        profissionais,
+        start,
+        end,
+        duracao=models.duracao_agendamento(minutos),
+        passo=models.duracao_agendamento(clinica.tempo_minimo_atendimento),
+        num_guiches=clinica.num_guiches,
+    )
+
+@router.post("/agendamentos/guiches/rebalancear", response_model=schemas.RebalanceamentoGuiches)
+def rebalancear_guiches(
+    dia: date,
+    clinica_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(has_permission("atualizar_agendamentos")),
+):
+    clinica_id = resolve_clinica_id(current_user, clinica_id, "Não autorizado a alterar agendamentos desta clínica")
+    duracao, num_guiches = agenda.parametros_da_clinica(db, clinica_id)
+    inicio = datetime.combine(dia, time.min)
+    rows = db.execute(
+        select(models.Agendamento.id, models.Agendamento.data, models.Agendamento.data_fim, models.Agendamento.guiche_numero)
+        .where(
+            models.Agendamento.clinica_id == clinica_id,
+            models.Agendamento.data >= inicio,
+            models.Agendamento.data < agenda.somar(inicio, timedelta(days=1)),
+            models.Agendamento.status != agenda.STATUS_SEM_CONFLITO,
+        )
+        .order_by(models.Agendamento.data, models.Agendamento.id)
+    ).all()
+    alocacao, sem_guiche = agenda.particionar_guiches([(r.id, r.data, r.data_fim or r.data + duracao) for r in rows], num_guiches)
+
+    # UPDATE em lote pela chave primária, só das linhas que mudaram
+    atuais = {r.id: r.guiche_numero for r in rows}
+    alteracoes = [{"id": i, "guiche_numero": alocacao.get(i)} for i in atuais if atuais[i] != alocacao.get(i)]
+    agenda.commit_guiches(db, alteracoes)
+    return {
+        "alocacao": [{"id": i, "guiche_numero": g} for i, g in alocacao.items()],
+        "alterados": len(alteracoes),
+        "sem_guiche": sem_guiche,
+    }
 
 @router.get("/agendamentos/{agendamento_id}", response_model=schemas.AgendamentoInDBBase)
-def read_agendamento(agendamento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_agendamentos"))):
-    agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == agendamento_id).first()
-    if agendamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento not found")
-    
-    # Check if the appointment's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este agendamento")
-    
-    return agendamento
+def read_agendamento(agendamento_id: int, selecao: Fieldset = Depends(agendamentos_fieldset), db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_agendamentos"))):
+    return selecao.render(get_owned_or_404(db, models.Agendamento, agendamento_id, current_user, "Agendamento not found", "Não autorizado a acessar este agendamento", options=selecao.options))
 
 @router.put("/agendamentos/{agendamento_id}", response_model=schemas.AgendamentoInDBBase)
-def update_agendamento(agendamento_id: int, agendamento: schemas.AgendamentoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_agendamentos"))):
-    db_agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == agendamento_id).first()
-    if db_agendamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento not found")
-    
-    # Check if the appointment's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == db_agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este agendamento")
-
-    for key, value in agendamento.dict(exclude_unset=True).items():
+def update_agendamento(agendamento_id: int, agendamento: schemas.AgendamentoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_agendamentos"))):
+    db_agendamento = get_owned_or_404(db, models.Agendamento, agendamento_id, current_user, "Agendamento not found", "Não autorizado a atualizar este agendamento")
+    changes = agendamento.dict(exclude_unset=True)
+    check_changed_parents(
+        db, current_user, db_agendamento, changes,
+        (models.Paciente, "paciente_id", "Patient not found", "Não autorizado a mover agendamento para este paciente"),
+        (models.Profissional, "profissional_id", "Professional not found", "Não autorizado a agendar com este profissional"),
+    )
+    duracao = db_agendamento.data_fim - db_agendamento.data if db_agendamento.data_fim is not None else None
+    guiche_anterior = db_agendamento.guiche_numero
+    for key, value in changes.items():
         setattr(db_agendamento, key, value)
-    db.commit()
-    db.refresh(db_agendamento)
+    # Só remarcações, trocas de profissional/guichê e reativações podem criar conflito
+    if changes.keys() & {"data", "profissional_id", "guiche_numero", "status"}:
+        duracao_padrao, num_guiches = agenda.parametros_da_clinica(db, db_agendamento.clinica_id)
+        db_agendamento.data_fim = agenda.somar(db_agendamento.data, duracao or duracao_padrao)
+        if "guiche_numero" not in changes and db_agendamento.status != agenda.STATUS_SEM_CONFLITO:
+            # Guichê escolhido pelo alocador: mantém o atual se continuar livre no novo horário
+            db_agendamento.guiche_numero = None
+        agenda.reservar(db, db_agendamento, num_guiches, preferido=guiche_anterior)
+    agenda.commit_agendamento(db, db_agendamento)
     return db_agendamento
 
 @router.delete("/agendamentos/{agendamento_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_agendamento(agendamento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_agendamentos"))):
-    db_agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == agendamento_id).first()
-    if db_agendamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento not found")
-    
-    # Check if the appointment's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == db_agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este agendamento")
-
+def delete_agendamento(agendamento_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_agendamentos"))):
+    db_agendamento = get_owned_or_404(db, models.Agendamento, agendamento_id, current_user, "Agendamento not found", "Não autorizado a excluir este agendamento")
     db.delete(db_agendamento)
     db.commit()
     return {"message": "Agendamento deleted successfully"}
 
+# Agenda do profissional logado (consultada em polling pela tela de agenda)
+@router.get("/profissional/agenda/", response_model=List[schemas.AgendaProfissionalItem])
+async def read_profissional_agenda(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_profissional_user),
+):
+    if start is None:
+        start = datetime.combine(datetime.now().date(), time.min)
+    if end is None:
+        end = agenda.somar(start, timedelta(days=AGENDA_DIAS_PADRAO))
+    if start >= end or end - start > timedelta(days=AGENDA_DIAS_MAXIMO):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Intervalo inválido: start deve ser anterior a end e o período não pode passar de {AGENDA_DIAS_MAXIMO} dias")
+
+    # Uma única consulta (índice profissional_id, data); o profissional é resolvido pelo join com o usuário logado
+    query = (
+        select(
+            models.Agendamento.id,
+            models.Agendamento.data,
+            models.Agendamento.status,
+            models.Agendamento.guiche_numero,
+            models.Agendamento.paciente_id,
+            models.Paciente.nome.label("paciente_nome"),
+            models.Atendimento.id.label("atendimento_id"),
+            models.Atendimento.status.label("atendimento_status"),
+        )
+        .join(models.Profissional, models.Profissional.id == models.Agendamento.profissional_id)
+        .join(models.Paciente, models.Paciente.id == models.Agendamento.paciente_id)
+        .outerjoin(models.Atendimento, models.Atendimento.agendamento_id == models.Agendamento.id)
+        .where(models.Profissional.user_id == current_user.id, models.Agendamento.data >= start, models.Agendamento.data < end)
+        .order_by(models.Agendamento.data, models.Agendamento.id)
+    )
+    result = await db.execute(query)
+    return json_response_with_etag(request, [dict(row) for row in result.mappings()])
+
 # Endpoints para Atendimento
 @router.post("/atendimentos/", response_model=schemas.AtendimentoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_atendimento(atendimento: schemas.AtendimentoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_atendimentos"))):
+def create_atendimento(atendimento: schemas.AtendimentoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_atendimentos"))):
     # Ensure the associated agendamento belongs to the current user's clinic (unless admin)
-    agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == atendimento.agendamento_id).first()
-    if not agendamento:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento not found")
-    
-    paciente_agendamento = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente_agendamento.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar atendimento para este agendamento")
+    clinica_id, = check_parents(db, current_user, (models.Agendamento, atendimento.agendamento_id, "Agendamento not found", "Não autorizado a criar atendimento para este agendamento"))
 
-    db_atendimento = models.Atendimento(**atendimento.dict())
+    db_atendimento = models.Atendimento(**atendimento.dict(), clinica_id=clinica_id)
     db.add(db_atendimento)
     db.commit()
-    db.refresh(db_atendimento)
     return db_atendimento
 
+atendimentos_fieldset = sparse_fieldset(models.Atendimento, schemas.AtendimentoInDBBase,
+                                        relations=("agendamento", "agendamento.paciente", "agendamento.profissional", "agendamento.profissional.user", "tipo_tratamento_realizado"))
+
 @router.get("/atendimentos/", response_model=List[schemas.AtendimentoInDBBase])
-def read_atendimentos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_atendimentos"))):
-    if current_user.is_superuser:
-        atendimentos = db.query(models.Atendimento).offset(skip).limit(limit).all()
-    else:
-        # Filter by agendamento's patient's clinic, which is linked to the user's clinic
-        atendimentos = db.query(models.Atendimento).join(models.Agendamento).join(models.Paciente).filter(models.Paciente.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return atendimentos
+async def read_atendimentos(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, selecao: Fieldset = Depends(atendimentos_fieldset), db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(has_permission("ler_atendimentos"))):
+    query = select(models.Atendimento).options(*selecao.options)
+    if not current_user.is_superuser:
+        query = query.where(models.Atendimento.clinica_id == current_user.clinica_id)
+    return selecao.render(await paginate_async(db, query, [models.Atendimento.id], skip, limit, cursor, response), response)
 
 @router.get("/atendimentos/{atendimento_id}", response_model=schemas.AtendimentoInDBBase)
-def read_atendimento(atendimento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_atendimentos"))):
-    atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == atendimento_id).first()
-    if atendimento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Atendimento not found")
-    
-    # Check if the attendance's appointment's patient belongs to the current user's clinic (unless admin)
-    agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == atendimento.agendamento_id).first()
-    paciente_agendamento = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente_agendamento.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este atendimento")
-
-    return atendimento
+def read_atendimento(atendimento_id: int, selecao: Fieldset = Depends(atendimentos_fieldset), db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_atendimentos"))):
+    return selecao.render(get_owned_or_404(db, models.Atendimento, atendimento_id, current_user, "Atendimento not found", "Não autorizado a acessar este atendimento", options=selecao.options))
 
 @router.put("/atendimentos/{atendimento_id}", response_model=schemas.AtendimentoInDBBase)
-def update_atendimento(atendimento_id: int, atendimento: schemas.AtendimentoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_atendimentos"))):
-    db_atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == atendimento_id).first()
-    if db_atendimento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Atendimento not found")
-    
-    # Check if the attendance's appointment's patient belongs to the current user's clinic (unless admin)
-    agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == db_atendimento.agendamento_id).first()
-    paciente_agendamento = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente_agendamento.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este atendimento")
-
-    for key, value in atendimento.dict(exclude_unset=True).items():
+def update_atendimento(atendimento_id: int, atendimento: schemas.AtendimentoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_atendimentos"))):
+    db_atendimento = get_owned_or_404(db, models.Atendimento, atendimento_id, current_user, "Atendimento not found", "Não autorizado a atualizar este atendimento")
+    changes = atendimento.dict(exclude_unset=True)
+    check_changed_parents(db, current_user, db_atendimento, changes,
+                          (models.Agendamento, "agendamento_id", "Agendamento not found", "Não autorizado a vincular atendimento a este agendamento"))
+    for key, value in changes.items():
         setattr(db_atendimento, key, value)
     db.commit()
-    db.refresh(db_atendimento)
     return db_atendimento
 
 @router.delete("/atendimentos/{atendimento_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_atendimento(atendimento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_atendimentos"))):
-    db_atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == atendimento_id).first()
-    if db_atendimento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Atendimento not found")
-    
-    # Check if the attendance's appointment's patient belongs to the current user's clinic (unless admin)
-    agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == db_atendimento.agendamento_id).first()
-    paciente_agendamento = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente_agendamento.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este atendimento")
-
+def delete_atendimento(atendimento_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_atendimentos"))):
+    db_atendimento = get_owned_or_404(db, models.Atendimento, atendimento_id, current_user, "Atendimento not found", "Não autorizado a excluir este atendimento")
     db.delete(db_atendimento)
     db.commit()
     return {"message": "Atendimento deleted successfully"}
 
 # Endpoints para Prontuario
 @router.post("/prontuarios/", response_model=schemas.ProntuarioInDBBase, status_code=status.HTTP_201_CREATED)
-def create_prontuario(prontuario: schemas.ProntuarioCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_prontuarios"))):
+def create_prontuario(prontuario: schemas.ProntuarioCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_prontuarios"))):
     # Ensure the patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == prontuario.paciente_id).first()
-    if not paciente:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar prontuário para este paciente")
+    check_parents(db, current_user, (models.Paciente, prontuario.paciente_id, "Patient not found", "Não autorizado a criar prontuário para este paciente"))
 
     db_prontuario = models.Prontuario(**prontuario.dict())
     db.add(db_prontuario)
     db.commit()
-    db.refresh(db_prontuario)
     return db_prontuario
 
-@router.get("/prontuarios/", response_model=List[schemas.ProntuarioInDBBase])
-def read_prontuarios(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_prontuarios"))):
-    if current_user.is_superuser:
-        prontuarios = db.query(models.Prontuario).offset(skip).limit(limit).all()
-    else:
+@router.get("/prontuarios/", response_model=List[schemas.ProntuarioResumo])
+def read_prontuarios(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_prontuarios"))):
+    # Só as colunas da listagem; o conteúdo clínico (colunas Text) fica para o detalhe
+    query = (
+        db.query(
+            models.Prontuario.id,
+            models.Prontuario.paciente_id,
+            models.Paciente.nome.label("paciente_nome"),
+            models.Prontuario.data_criacao,
+            models.Prontuario.tipo_tratamento_definido_id,
+            models.TipoTratamento.nome.label("tipo_tratamento_nome"),
+            models.Prontuario.editavel,
+            models.Prontuario.is_finalized,
+        )
+        .join(models.Paciente, models.Paciente.id == models.Prontuario.paciente_id)
+        .outerjoin(models.TipoTratamento, models.TipoTratamento.id == models.Prontuario.tipo_tratamento_definido_id)
+    )
+    if not current_user.is_superuser:
         # Filter by patient's clinic, which is linked to the user's clinic
-        prontuarios = db.query(models.Prontuario).join(models.Paciente).filter(models.Paciente.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return prontuarios
+        query = query.filter(models.Paciente.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.Prontuario.id], skip, limit, cursor, response)
 
 @router.get("/prontuarios/{prontuario_id}", response_model=schemas.ProntuarioInDBBase)
-def read_prontuario(prontuario_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_prontuarios"))):
-    prontuario = db.query(models.Prontuario).filter(models.Prontuario.id == prontuario_id).first()
-    if prontuario is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prontuario not found")
-    
-    # Check if the medical record's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == prontuario.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este prontuário")
-
-    return prontuario
+def read_prontuario(prontuario_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_prontuarios"))):
+    return get_owned_or_404(db, models.Prontuario, prontuario_id, current_user, "Prontuario not found", "Não autorizado a acessar este prontuário",
+                            options=[undefer_group("conteudo")])
 
 @router.put("/prontuarios/{prontuario_id}", response_model=schemas.ProntuarioInDBBase)
-def update_prontuario(prontuario_id: int, prontuario: schemas.ProntuarioUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_prontuarios"))):
-    db_prontuario = db.query(models.Prontuario).filter(models.Prontuario.id == prontuario_id).first()
-    if db_prontuario is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prontuario not found")
-    
-    # Check if the medical record's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == db_prontuario.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este prontuário")
-
+def update_prontuario(prontuario_id: int, prontuario: schemas.ProntuarioUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_prontuarios"))):
+    db_prontuario = get_owned_or_404(db, models.Prontuario, prontuario_id, current_user, "Prontuario not found", "Não autorizado a atualizar este prontuário",
+                                     options=[undefer_group("conteudo")])
     for key, value in prontuario.dict(exclude_unset=True).items():
         setattr(db_prontuario, key, value)
     db.commit()
-    db.refresh(db_prontuario)
     return db_prontuario
 
 @router.delete("/prontuarios/{prontuario_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_prontuario(prontuario_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_prontuarios"))):
-    db_prontuario = db.query(models.Prontuario).filter(models.Prontuario.id == prontuario_id).first()
-    if db_prontuario is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prontuario not found")
-    
-    # Check if the medical record's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == db_prontuario.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este prontuário")
-
+def delete_prontuario(prontuario_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_prontuarios"))):
+    db_prontuario = get_owned_or_404(db, models.Prontuario, prontuario_id, current_user, "Prontuario not found", "Não autorizado a excluir este prontuário")
     db.delete(db_prontuario)
     db.commit()
     return {"message": "Prontuario deleted successfully"}
 
 # Endpoints para DocumentoArquivo
 @router.post("/documentos/", response_model=schemas.DocumentoArquivoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_documento_arquivo(documento: schemas.DocumentoArquivoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_documentos"))):
-    # Ensure the associated pasta belongs to the current user's clinic (unless admin)
-    pasta = db.query(models.PastaDocumento).filter(models.PastaDocumento.id == documento.pasta_id).first()
-    if not pasta:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PastaDocumento not found")
-    if not current_user.is_superuser and pasta.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar documento para esta pasta")
-
-    # Ensure the associated paciente belongs to the current user's clinic (unless admin)
+def create_documento_arquivo(documento: schemas.DocumentoArquivoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_documentos"))):
+    # Ensure the associated pasta and paciente belong to the current user's clinic (unless admin)
+    parents = [(models.PastaDocumento, documento.pasta_id, "PastaDocumento not found", "Não autorizado a criar documento para esta pasta")]
     if documento.paciente_id:
-        paciente = db.query(models.Paciente).filter(models.Paciente.id == documento.paciente_id).first()
-        if not paciente:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente not found")
-        if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar documento para este paciente")
+        parents.append((models.Paciente, documento.paciente_id, "Paciente not found", "Não autorizado a criar documento para este paciente"))
+    check_parents(db, current_user, *parents)
 
     db_documento = models.DocumentoArquivo(**documento.dict())
     db.add(db_documento)
     db.commit()
-    db.refresh(db_documento)
     return db_documento
 
 @router.get("/documentos/", response_model=List[schemas.DocumentoArquivoInDBBase])
-def read_documentos_arquivo(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_documentos"))):
-    if current_user.is_superuser:
-        documentos = db.query(models.DocumentoArquivo).offset(skip).limit(limit).all()
-    else:
+def read_documentos_arquivo(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_documentos"))):
+    query = db.query(models.DocumentoArquivo)
+    if not current_user.is_superuser:
         # Filter by pasta's clinic, which is linked to the user's clinic
-        documentos = db.query(models.DocumentoArquivo).join(models.PastaDocumento).filter(models.PastaDocumento.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return documentos
+        query = query.join(models.PastaDocumento).filter(models.PastaDocumento.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.DocumentoArquivo.id], skip, limit, cursor, response)
 
 @router.get("/documentos/{documento_id}", response_model=schemas.DocumentoArquivoInDBBase)
-def read_documento_arquivo(documento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_documentos"))):
-    documento = db.query(models.DocumentoArquivo).filter(models.DocumentoArquivo.id == documento_id).first()
-    if documento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="DocumentoArquivo not found")
-    
-    # Check if the document's pasta belongs to the current user's clinic (unless admin)
-    pasta = db.query(models.PastaDocumento).filter(models.PastaDocumento.id == documento.pasta_id).first()
-    if not current_user.is_superuser and pasta.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este documento")
-
-    return documento
+def read_documento_arquivo(documento_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_documentos"))):
+    return get_owned_or_404(db, models.DocumentoArquivo, documento_id, current_user, "DocumentoArquivo not found", "Não autorizado a acessar este documento")
 
 @router.put("/documentos/{documento_id}", response_model=schemas.DocumentoArquivoInDBBase)
 def update_documento_arquivo(documento_id: int, documento: schemas.DocumentoArquivoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_documento = db.query(models.DocumentoArquivo).filter(models.DocumentoArquivo.id == documento_id).first()
-    if db_documento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="DocumentoArquivo not found")
-    
-    # Check if the document's pasta belongs to the current user's clinic (unless admin)
-    pasta = db.query(models.PastaDocumento).filter(models.PastaDocumento.id == db_documento.pasta_id).first()
-    if not current_user.is_superuser and pasta.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este documento")
-
+    db_documento = get_owned_or_404(db, models.DocumentoArquivo, documento_id, current_user, "DocumentoArquivo not found", "Não autorizado a atualizar este documento")
     for key, value in documento.dict(exclude_unset=True).items():
         setattr(db_documento, key, value)
     db.commit()
-    db.refresh(db_documento)
     return db_documento
 
 @router.delete("/documentos/{documento_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_documento_arquivo(documento_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_documento = db.query(models.DocumentoArquivo).filter(models.DocumentoArquivo.id == documento_id).first()
-    if db_documento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="DocumentoArquivo not found")
-    
-    # Check if the document's pasta belongs to the current user's clinic (unless admin)
-    pasta = db.query(models.PastaDocumento).filter(models.PastaDocumento.id == db_documento.pasta_id).first()
-    if not current_user.is_superuser and pasta.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este documento")
-
+    db_documento = get_owned_or_404(db, models.DocumentoArquivo, documento_id, current_user, "DocumentoArquivo not found", "Não autorizado a excluir este documento")
     db.delete(db_documento)
     db.commit()
     return {"message": "DocumentoArquivo deleted successfully"}
 
 # Endpoints para PastaDocumento
 @router.post("/pastas-documento/", response_model=schemas.PastaDocumentoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_pasta_documento(pasta: schemas.PastaDocumentoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_pastas_documento"))):
+def create_pasta_documento(pasta: schemas.PastaDocumentoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_pastas_documento"))):
     if not current_user.is_superuser and pasta.clinica_id != current_user.clinica_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar pasta de documento para esta clínica")
     if pasta.clinica_id is None:
@@ -865,53 +1007,37 @@ def create_pasta_documento(pasta: schemas.PastaDocumentoCreate, db: Session = De
     db_pasta = models.PastaDocumento(**pasta.dict())
     db.add(db_pasta)
     db.commit()
-    db.refresh(db_pasta)
     return db_pasta
 
 @router.get("/pastas-documento/", response_model=List[schemas.PastaDocumentoInDBBase])
-def read_pastas_documento(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_pastas_documento"))):
-    if current_user.is_superuser:
-        pastas = db.query(models.PastaDocumento).offset(skip).limit(limit).all()
-    else:
-        pastas = db.query(models.PastaDocumento).filter(models.PastaDocumento.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return pastas
+def read_pastas_documento(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_pastas_documento"))):
+    query = db.query(models.PastaDocumento)
+    if not current_user.is_superuser:
+        query = query.filter(models.PastaDocumento.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.PastaDocumento.id], skip, limit, cursor, response)
 
 @router.get("/pastas-documento/{pasta_id}", response_model=schemas.PastaDocumentoInDBBase)
-def read_pasta_documento(pasta_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_pastas_documento"))):
-    pasta = db.query(models.PastaDocumento).filter(models.PastaDocumento.id == pasta_id).first()
-    if pasta is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PastaDocumento not found")
-    if not current_user.is_superuser and pasta.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar esta pasta de documento")
-    return pasta
+def read_pasta_documento(pasta_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_pastas_documento"))):
+    return get_owned_or_404(db, models.PastaDocumento, pasta_id, current_user, "PastaDocumento not found", "Não autorizado a acessar esta pasta de documento")
 
 @router.put("/pastas-documento/{pasta_id}", response_model=schemas.PastaDocumentoInDBBase)
-def update_pasta_documento(pasta_id: int, pasta: schemas.PastaDocumentoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_pastas_documento"))):
-    db_pasta = db.query(models.PastaDocumento).filter(models.PastaDocumento.id == pasta_id).first()
-    if db_pasta is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PastaDocumento not found")
-    if not current_user.is_superuser and db_pasta.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar esta pasta de documento")
+def update_pasta_documento(pasta_id: int, pasta: schemas.PastaDocumentoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_pastas_documento"))):
+    db_pasta = get_owned_or_404(db, models.PastaDocumento, pasta_id, current_user, "PastaDocumento not found", "Não autorizado a atualizar esta pasta de documento")
     for key, value in pasta.dict(exclude_unset=True).items():
         setattr(db_pasta, key, value)
     db.commit()
-    db.refresh(db_pasta)
     return db_pasta
 
 @router.delete("/pastas-documento/{pasta_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_pasta_documento(pasta_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_pastas_documento"))):
-    db_pasta = db.query(models.PastaDocumento).filter(models.PastaDocumento.id == pasta_id).first()
-    if db_pasta is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PastaDocumento not found")
-    if not current_user.is_superuser and db_pasta.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir esta pasta de documento")
+def delete_pasta_documento(pasta_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_pastas_documento"))):
+    db_pasta = get_owned_or_404(db, models.PastaDocumento, pasta_id, current_user, "PastaDocumento not found", "Não autorizado a excluir esta pasta de documento")
     db.delete(db_pasta)
     db.commit()
     return {"message": "PastaDocumento deleted successfully"}
 
 # Endpoints para CampanhaMarketing
 @router.post("/campanhas-marketing/", response_model=schemas.CampanhaMarketingInDBBase, status_code=status.HTTP_201_CREATED)
-def create_campanha_marketing(campanha: schemas.CampanhaMarketingCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_campanhas_marketing"))):
+def create_campanha_marketing(campanha: schemas.CampanhaMarketingCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_campanhas_marketing"))):
     if not current_user.is_superuser and campanha.clinica_id != current_user.clinica_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar campanha de marketing para esta clínica")
     if campanha.clinica_id is None:
@@ -919,296 +1045,173 @@ def create_campanha_marketing(campanha: schemas.CampanhaMarketingCreate, db: Ses
     db_campanha = models.CampanhaMarketing(**campanha.dict())
     db.add(db_campanha)
     db.commit()
-    db.refresh(db_campanha)
     return db_campanha
 
 @router.get("/campanhas-marketing/", response_model=List[schemas.CampanhaMarketingInDBBase])
-def read_campanhas_marketing(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_campanhas_marketing"))):
-    if current_user.is_superuser:
-        campanhas = db.query(models.CampanhaMarketing).offset(skip).limit(limit).all()
-    else:
-        campanhas = db.query(models.CampanhaMarketing).filter(models.CampanhaMarketing.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return campanhas
+def read_campanhas_marketing(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_campanhas_marketing"))):
+    query = db.query(models.CampanhaMarketing)
+    if not current_user.is_superuser:
+        query = query.filter(models.CampanhaMarketing.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.CampanhaMarketing.id], skip, limit, cursor, response)
 
 @router.get("/campanhas-marketing/{campanha_id}", response_model=schemas.CampanhaMarketingInDBBase)
-def read_campanha_marketing(campanha_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_campanhas_marketing"))):
-    campanha = db.query(models.CampanhaMarketing).filter(models.CampanhaMarketing.id == campanha_id).first()
-    if campanha is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CampanhaMarketing not found")
-    if not current_user.is_superuser and campanha.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar esta campanha de marketing")
-    return campanha
+def read_campanha_marketing(campanha_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_campanhas_marketing"))):
+    return get_owned_or_404(db, models.CampanhaMarketing, campanha_id, current_user, "CampanhaMarketing not found", "Não autorizado a acessar esta campanha de marketing")
 
 @router.put("/campanhas-marketing/{campanha_id}", response_model=schemas.CampanhaMarketingInDBBase)
-def update_campanha_marketing(campanha_id: int, campanha: schemas.CampanhaMarketingUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_campanhas_marketing"))):
-    db_campanha = db.query(models.CampanhaMarketing).filter(models.CampanhaMarketing.id == campanha_id).first()
-    if db_campanha is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CampanhaMarketing not found")
-    if not current_user.is_superuser and db_campanha.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar esta campanha de marketing")
+def update_campanha_marketing(campanha_id: int, campanha: schemas.CampanhaMarketingUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_campanhas_marketing"))):
+    db_campanha = get_owned_or_404(db, models.CampanhaMarketing, campanha_id, current_user, "CampanhaMarketing not found", "Não autorizado a atualizar esta campanha de marketing")
     for key, value in campanha.dict(exclude_unset=True).items():
         setattr(db_campanha, key, value)
     db.commit()
-    db.refresh(db_campanha)
     return db_campanha
 
 @router.delete("/campanhas-marketing/{campanha_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_campanha_marketing(campanha_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_campanhas_marketing"))):
-    db_campanha = db.query(models.CampanhaMarketing).filter(models.CampanhaMarketing.id == campanha_id).first()
-    if db_campanha is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CampanhaMarketing not found")
-    if not current_user.is_superuser and db_campanha.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir esta campanha de marketing")
+def delete_campanha_marketing(campanha_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_campanhas_marketing"))):
+    db_campanha = get_owned_or_404(db, models.CampanhaMarketing, campanha_id, current_user, "CampanhaMarketing not found", "Não autorizado a excluir esta campanha de marketing")
     db.delete(db_campanha)
     db.commit()
     return {"message": "CampanhaMarketing deleted successfully"}
 
 # Endpoints para Comissao
 @router.post("/comissoes/", response_model=schemas.ComissaoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_comissao(comissao: schemas.ComissaoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_comissoes"))):
-    # Ensure the associated professional belongs to the current user's clinic (unless admin)
-    profissional = db.query(models.Profissional).filter(models.Profissional.id == comissao.profissional_id).first()
-    if not profissional:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profissional not found")
-    profissional_user = db.query(models.User).filter(models.User.id == profissional.user_id).first()
-    if not current_user.is_superuser and profissional_user.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar comissão para este profissional")
-
-    # Ensure the associated attendance belongs to the current user's clinic (unless admin)
-    atendimento = db.query(models.Atendimento).filter(models.Atendimento.id == comissao.atendimento_id).first()
-    if not atendimento:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Atendimento not found")
-    agendamento = db.query(models.Agendamento).filter(models.Agendamento.id == atendimento.agendamento_id).first()
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == agendamento.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar comissão para este atendimento")
-
-    db_comissao = models.Comissao(**comissao.dict())
+def create_comissao(comissao: schemas.ComissaoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_comissoes"))):
+    # Ensure the associated professional and attendance belong to the current user's clinic (unless admin)
+    clinica_id, _ = check_parents(
+        db, current_user,
+        (models.Profissional, comissao.profissional_id, "Profissional not found", "Não autorizado a criar comissão para este profissional"),
+        (models.Atendimento, comissao.atendimento_id, "Atendimento not found", "Não autorizado a criar comissão para este atendimento"),
+    )
+
+    db_comissao = models.Comissao(**comissao.dict(), clinica_id=clinica_id)
     db.add(db_comissao)
     db.commit()
-    db.refresh(db_comissao)
     return db_comissao
 
+comissoes_fieldset = sparse_fieldset(models.Comissao, schemas.ComissaoInDBBase, relations=("profissional", "profissional.user", "atendimento"))
+
 @router.get("/comissoes/", response_model=List[schemas.ComissaoInDBBase])
-def read_comissoes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_comissoes"))):
-    if current_user.is_superuser:
-        comissoes = db.query(models.Comissao).offset(skip).limit(limit).all()
-    else:
-        # Filter by professional's clinic, which is linked to the user's clinic
-        comissoes = db.query(models.Comissao).join(models.Profissional).join(models.User).filter(models.User.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return comissoes
+def read_comissoes(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, selecao: Fieldset = Depends(comissoes_fieldset), db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_comissoes"))):
+    query = db.query(models.Comissao).options(*selecao.options)
+    if not current_user.is_superuser:
+        query = query.filter(models.Comissao.clinica_id == current_user.clinica_id)
+    return selecao.render(paginate(query, [models.Comissao.id], skip, limit, cursor, response), response)
 
 @router.get("/comissoes/{comissao_id}", response_model=schemas.ComissaoInDBBase)
-def read_comissao(comissao_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_comissoes"))):
-    comissao = db.query(models.Comissao).filter(models.Comissao.id == comissao_id).first()
-    if comissao is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comissao not found")
-    
-    # Check if the commission's professional belongs to the current user's clinic (unless admin)
-    profissional = db.query(models.Profissional).filter(models.Profissional.id == comissao.profissional_id).first()
-    profissional_user = db.query(models.User).filter(models.User.id == profissional.user_id).first()
-    if not current_user.is_superuser and profissional_user.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar esta comissão")
-
-    return comissao
+def read_comissao(comissao_id: int, selecao: Fieldset = Depends(comissoes_fieldset), db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_comissoes"))):
+    return selecao.render(get_owned_or_404(db, models.Comissao, comissao_id, current_user, "Comissao not found", "Não autorizado a acessar esta comissão", options=selecao.options))
 
 @router.put("/comissoes/{comissao_id}", response_model=schemas.ComissaoInDBBase)
-def update_comissao(comissao_id: int, comissao: schemas.ComissaoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_comissoes"))):
-    db_comissao = db.query(models.Comissao).filter(models.Comissao.id == comissao_id).first()
-    if db_comissao is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comissao not found")
-    
-    # Check if the commission's professional belongs to the current user's clinic (unless admin)
-    profissional = db.query(models.Profissional).filter(models.Profissional.id == db_comissao.profissional_id).first()
-    profissional_user = db.query(models.User).filter(models.User.id == profissional.user_id).first()
-    if not current_user.is_superuser and profissional_user.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar esta comissão")
-
-    for key, value in comissao.dict(exclude_unset=True).items():
+def update_comissao(comissao_id: int, comissao: schemas.ComissaoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_comissoes"))):
+    db_comissao = get_owned_or_404(db, models.Comissao, comissao_id, current_user, "Comissao not found", "Não autorizado a atualizar esta comissão")
+    changes = comissao.dict(exclude_unset=True)
+    check_changed_parents(
+        db, current_user, db_comissao, changes,
+        (models.Profissional, "profissional_id", "Profissional not found", "Não autorizado a vincular comissão a este profissional"),
+        (models.Atendimento, "atendimento_id", "Atendimento not found", "Não autorizado a vincular comissão a este atendimento"),
+    )
+    for key, value in changes.items():
         setattr(db_comissao, key, value)
     db.commit()
-    db.refresh(db_comissao)
     return db_comissao
 
 @router.delete("/comissoes/{comissao_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_comissao(comissao_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_comissoes"))):
-    db_comissao = db.query(models.Comissao).filter(models.Comissao.id == comissao_id).first()
-    if db_comissao is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comissao not found")
-    
-    # Check if the commission's professional belongs to the current user's clinic (unless admin)
-    profissional = db.query(models.Profissional).filter(models.Profissional.id == db_comissao.profissional_id).first()
-    profissional_user = db.query(models.User).filter(models.User.id == profissional.user_id).first()
-    if not current_user.is_superuser and profissional_user.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir esta comissão")
-
+def delete_comissao(comissao_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_comissoes"))):
+    db_comissao = get_owned_or_404(db, models.Comissao, comissao_id, current_user, "Comissao not found", "Não autorizado a excluir esta comissão")
     db.delete(db_comissao)
     db.commit()
     return {"message": "Comissao deleted successfully"}
 
 # Endpoints para Fatura
 @router.post("/faturas/", response_model=schemas.FaturaInDBBase, status_code=status.HTTP_201_CREATED)
-def create_fatura(fatura: schemas.FaturaCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_faturas"))):
+def create_fatura(fatura: schemas.FaturaCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_faturas"))):
     # Ensure the associated convenio belongs to the current user's clinic (unless admin)
-    convenio = db.query(models.Convenio).filter(models.Convenio.id == fatura.convenio_id).first()
-    if not convenio:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Convenio not found")
-    if not current_user.is_superuser and convenio.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar fatura para este convênio")
+    check_parents(db, current_user, (models.Convenio, fatura.convenio_id, "Convenio not found", "Não autorizado a criar fatura para este convênio"))
 
     db_fatura = models.Fatura(**fatura.dict())
     db.add(db_fatura)
     db.commit()
-    db.refresh(db_fatura)
     return db_fatura
 
 @router.get("/faturas/", response_model=List[schemas.FaturaInDBBase])
-def read_faturas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_faturas"))):
-    if current_user.is_superuser:
-        faturas = db.query(models.Fatura).offset(skip).limit(limit).all()
-    else:
+def read_faturas(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_faturas"))):
+    query = db.query(models.Fatura)
+    if not current_user.is_superuser:
         # Filter by convenio's clinic, which is linked to the user's clinic
-        faturas = db.query(models.Fatura).join(models.Convenio).filter(models.Convenio.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return faturas
+        query = query.join(models.Convenio).filter(models.Convenio.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.Fatura.id], skip, limit, cursor, response)
 
 @router.get("/faturas/{fatura_id}", response_model=schemas.FaturaInDBBase)
-def read_fatura(fatura_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_faturas"))):
-    fatura = db.query(models.Fatura).filter(models.Fatura.id == fatura_id).first()
-    if fatura is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fatura not found")
-    
-    # Check if the invoice's convenio belongs to the current user's clinic (unless admin)
-    convenio = db.query(models.Convenio).filter(models.Convenio.id == fatura.convenio_id).first()
-    if not current_user.is_superuser and convenio.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar esta fatura")
-
-    return fatura
+def read_fatura(fatura_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_faturas"))):
+    return get_owned_or_404(db, models.Fatura, fatura_id, current_user, "Fatura not found", "Não autorizado a acessar esta fatura")
 
 @router.put("/faturas/{fatura_id}", response_model=schemas.FaturaInDBBase)
-def update_fatura(fatura_id: int, fatura: schemas.FaturaUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_faturas"))):
-    db_fatura = db.query(models.Fatura).filter(models.Fatura.id == fatura_id).first()
-    if db_fatura is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fatura not found")
-    
-    # Check if the invoice's convenio belongs to the current user's clinic (unless admin)
-    convenio = db.query(models.Convenio).filter(models.Convenio.id == db_fatura.convenio_id).first()
-    if not current_user.is_superuser and convenio.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar esta fatura")
-
+def update_fatura(fatura_id: int, fatura: schemas.FaturaUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_faturas"))):
+    db_fatura = get_owned_or_404(db, models.Fatura, fatura_id, current_user, "Fatura not found", "Não autorizado a atualizar esta fatura")
     for key, value in fatura.dict(exclude_unset=True).items():
         setattr(db_fatura, key, value)
     db.commit()
-    db.refresh(db_fatura)
     return db_fatura
 
 @router.delete("/faturas/{fatura_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_fatura(fatura_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_faturas"))):
-    db_fatura = db.query(models.Fatura).filter(models.Fatura.id == fatura_id).first()
-    if db_fatura is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fatura not found")
-    
-    # Check if the invoice's convenio belongs to the current user's clinic (unless admin)
-    convenio = db.query(models.Convenio).filter(models.Convenio.id == db_fatura.convenio_id).first()
-    if not current_user.is_superuser and convenio.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir esta fatura")
-
+def delete_fatura(fatura_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_faturas"))):
+    db_fatura = get_owned_or_404(db, models.Fatura, fatura_id, current_user, "Fatura not found", "Não autorizado a excluir esta fatura")
     db.delete(db_fatura)
     db.commit()
     return {"message": "Fatura deleted successfully"}
 
 # Endpoints para PesquisaSatisfacao
 @router.post("/pesquisas-satisfacao/", response_model=schemas.PesquisaSatisfacaoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_pesquisa_satisfacao(pesquisa: schemas.PesquisaSatisfacaoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_pesquisas_satisfacao"))):
+def create_pesquisa_satisfacao(pesquisa: schemas.PesquisaSatisfacaoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_pesquisas_satisfacao"))):
     # Ensure the associated patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == pesquisa.paciente_id).first()
-    if not paciente:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar pesquisa de satisfação para este paciente")
+    clinica_id, = check_parents(db, current_user, (models.Paciente, pesquisa.paciente_id, "Patient not found", "Não autorizado a criar pesquisa de satisfação para este paciente"))
 
     if pesquisa.clinica_id is None:
-        pesquisa.clinica_id = paciente.clinica_id # Associate with patient's clinic
+        pesquisa.clinica_id = clinica_id # Associate with patient's clinic
 
     db_pesquisa = models.PesquisaSatisfacao(**pesquisa.dict())
     db.add(db_pesquisa)
     db.commit()
-    db.refresh(db_pesquisa)
     return db_pesquisa
 
 @router.get("/pesquisas-satisfacao/", response_model=List[schemas.PesquisaSatisfacaoInDBBase])
-def read_pesquisas_satisfacao(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_pesquisas_satisfacao"))):
-    if current_user.is_superuser:
-        pesquisas = db.query(models.PesquisaSatisfacao).offset(skip).limit(limit).all()
-    else:
+def read_pesquisas_satisfacao(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_pesquisas_satisfacao"))):
+    query = db.query(models.PesquisaSatisfacao)
+    if not current_user.is_superuser:
         # Filter by patient's clinic, which is linked to the user's clinic
-        pesquisas = db.query(models.PesquisaSatisfacao).join(models.Paciente).filter(models.Paciente.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return pesquisas
+        query = query.join(models.Paciente).filter(models.Paciente.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.PesquisaSatisfacao.id], skip, limit, cursor, response)
 
 @router.get("/pesquisas-satisfacao/{pesquisa_id}", response_model=schemas.PesquisaSatisfacaoInDBBase)
-def read_pesquisa_satisfacao(pesquisa_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_pesquisas_satisfacao"))):
-    pesquisa = db.query(models.PesquisaSatisfacao).filter(models.PesquisaSatisfacao.id == pesquisa_id).first()
-    if pesquisa is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PesquisaSatisfacao not found")
-    
-    # Check if the survey's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == pesquisa.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar esta pesquisa de satisfação")
-
-    return pesquisa
+def read_pesquisa_satisfacao(pesquisa_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_pesquisas_satisfacao"))):
+    return get_owned_or_404(db, models.PesquisaSatisfacao, pesquisa_id, current_user, "PesquisaSatisfacao not found", "Não autorizado a acessar esta pesquisa de satisfação")
 
 @router.put("/pesquisas-satisfacao/{pesquisa_id}", response_model=schemas.PesquisaSatisfacaoInDBBase)
-def update_pesquisa_satisfacao(pesquisa_id: int, pesquisa: schemas.PesquisaSatisfacaoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_pesquisas_satisfacao"))):
-    db_pesquisa = db.query(models.PesquisaSatisfacao).filter(models.PesquisaSatisfacao.id == pesquisa_id).first()
-    if db_pesquisa is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PesquisaSatisfacao not found")
-    
-    # Check if the survey's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == db_pesquisa.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar esta pesquisa de satisfação")
-
+def update_pesquisa_satisfacao(pesquisa_id: int, pesquisa: schemas.PesquisaSatisfacaoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_pesquisas_satisfacao"))):
+    db_pesquisa = get_owned_or_404(db, models.PesquisaSatisfacao, pesquisa_id, current_user, "PesquisaSatisfacao not found", "Não autorizado a atualizar esta pesquisa de satisfação")
     for key, value in pesquisa.dict(exclude_unset=True).items():
         setattr(db_pesquisa, key, value)
     db.commit()
-    db.refresh(db_pesquisa)
     return db_pesquisa
 
 @router.delete("/pesquisas-satisfacao/{pesquisa_id}", status_code=status.HTTP_204_NO_CONTENT)
-def update_pesquisa_satisfacao(pesquisa_id: int, pesquisa: schemas.PesquisaSatisfacaoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_pesquisas_satisfacao"))):
-    db_pesquisa = db.query(models.PesquisaSatisfacao).filter(models.PesquisaSatisfacao.id == pesquisa_id).first()
-    if db_pesquisa is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PesquisaSatisfacao not found")
-    
-    # Check if the survey's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == db_pesquisa.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar esta pesquisa de satisfação")
-
+def update_pesquisa_satisfacao(pesquisa_id: int, pesquisa: schemas.PesquisaSatisfacaoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_pesquisas_satisfacao"))):
+    db_pesquisa = get_owned_or_404(db, models.PesquisaSatisfacao, pesquisa_id, current_user, "PesquisaSatisfacao not found", "Não autorizado a atualizar esta pesquisa de satisfação")
     for key, value in pesquisa.dict(exclude_unset=True).items():
         setattr(db_pesquisa, key, value)
     db.commit()
-    db.refresh(db_pesquisa)
     return db_pesquisa
 
 @router.delete("/pesquisas-satisfacao/{pesquisa_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_pesquisa_satisfacao(pesquisa_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_pesquisas_satisfacao"))):
-    db_pesquisa = db.query(models.PesquisaSatisfacao).filter(models.PesquisaSatisfacao.id == pesquisa_id).first()
-    if db_pesquisa is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PesquisaSatisfacao not found")
-    
-    # Check if the survey's patient belongs to the current user's clinic (unless admin)
-    paciente = db.query(models.Paciente).filter(models.Paciente.id == db_pesquisa.paciente_id).first()
-    if not current_user.is_superuser and paciente.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir esta pesquisa de satisfação")
-
+def delete_pesquisa_satisfacao(pesquisa_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_pesquisas_satisfacao"))):
+    db_pesquisa = get_owned_or_404(db, models.PesquisaSatisfacao, pesquisa_id, current_user, "PesquisaSatisfacao not found", "Não autorizado a excluir esta pesquisa de satisfação")
     db.delete(db_pesquisa)
     db.commit()
     return {"message": "PesquisaSatisfacao deleted successfully"}
 
 # Endpoints para CupomDesconto
 @router.post("/cupons-desconto/", response_model=schemas.CupomDescontoInDBBase, status_code=status.HTTP_201_CREATED)
-def create_cupom_desconto(cupom: schemas.CupomDescontoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("criar_cupons_desconto"))):
+def create_cupom_desconto(cupom: schemas.CupomDescontoCreate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("criar_cupons_desconto"))):
     if not current_user.is_superuser and cupom.clinica_id != current_user.clinica_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a criar cupom de desconto para esta clínica")
     if cupom.clinica_id is None:
@@ -1216,46 +1219,30 @@ def create_cupom_desconto(cupom: schemas.CupomDescontoCreate, db: Session = Depe
     db_cupom = models.CupomDesconto(**cupom.dict())
     db.add(db_cupom)
     db.commit()
-    db.refresh(db_cupom)
     return db_cupom
 
 @router.get("/cupons-desconto/", response_model=List[schemas.CupomDescontoInDBBase])
-def read_cupons_desconto(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_cupons_desconto"))):
-    if current_user.is_superuser:
-        cupons = db.query(models.CupomDesconto).offset(skip).limit(limit).all()
-    else:
-        cupons = db.query(models.CupomDesconto).filter(models.CupomDesconto.clinica_id == current_user.clinica_id).offset(skip).limit(limit).all()
-    return cupons
+def read_cupons_desconto(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_cupons_desconto"))):
+    query = db.query(models.CupomDesconto)
+    if not current_user.is_superuser:
+        query = query.filter(models.CupomDesconto.clinica_id == current_user.clinica_id)
+    return paginate(query, [models.CupomDesconto.id], skip, limit, cursor, response)
 
 @router.get("/cupons-desconto/{cupom_id}", response_model=schemas.CupomDescontoInDBBase)
-def read_cupom_desconto(cupom_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("ler_cupons_desconto"))):
-    cupom = db.query(models.CupomDesconto).filter(models.CupomDesconto.id == cupom_id).first()
-    if cupom is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CupomDesconto not found")
-    if not current_user.is_superuser and cupom.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a acessar este cupom de desconto")
-    return cupom
+def read_cupom_desconto(cupom_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("ler_cupons_desconto"))):
+    return get_owned_or_404(db, models.CupomDesconto, cupom_id, current_user, "CupomDesconto not found", "Não autorizado a acessar este cupom de desconto")
 
 @router.put("/cupons-desconto/{cupom_id}", response_model=schemas.CupomDescontoInDBBase)
-def update_cupom_desconto(cupom_id: int, cupom: schemas.CupomDescontoUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("atualizar_cupons_desconto"))):
-    db_cupom = db.query(models.CupomDesconto).filter(models.CupomDesconto.id == cupom_id).first()
-    if db_cupom is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CupomDesconto not found")
-    if not current_user.is_superuser and db_cupom.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a atualizar este cupom de desconto")
+def update_cupom_desconto(cupom_id: int, cupom: schemas.CupomDescontoUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("atualizar_cupons_desconto"))):
+    db_cupom = get_owned_or_404(db, models.CupomDesconto, cupom_id, current_user, "CupomDesconto not found", "Não autorizado a atualizar este cupom de desconto")
     for key, value in cupom.dict(exclude_unset=True).items():
         setattr(db_cupom, key, value)
     db.commit()
-    db.refresh(db_cupom)
     return db_cupom
 
 @router.delete("/cupons-desconto/{cupom_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_cupom_desconto(cupom_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(has_permission("excluir_cupons_desconto"))):
-    db_cupom = db.query(models.CupomDesconto).filter(models.CupomDesconto.id == cupom_id).first()
-    if db_cupom is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CupomDesconto not found")
-    if not current_user.is_superuser and db_cupom.clinica_id != current_user.clinica_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado a excluir este cupom de desconto")
+def delete_cupom_desconto(cupom_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(has_permission("excluir_cupons_desconto"))):
+    db_cupom = get_owned_or_404(db, models.CupomDesconto, cupom_id, current_user, "CupomDesconto not found", "Não autorizado a excluir este cupom de desconto")
     db.delete(db_cupom)
     db.commit()
     return {"message": "CupomDesconto deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Streaming exports.
+
+This file implements the `/export` endpoints for the large per-clinic tables (agendamentos, atendimentos, lançamentos
+financeiros and comissões). Rows are read from a server-side cursor (`stream_results` + `yield_per`) and written to
+a `StreamingResponse` as CSV or NDJSON batch by batch, so a worker exports millions of rows in constant memory
+instead of the client paging through the list endpoints. The columns are those of the list endpoint's schema, id first.
+"""
+import csv
+import io
+from datetime import date, datetime
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..core.auth import has_permission
+from ..core.cache import Principal
+from ..core.database import get_db
+from ..core.responses import dumps
+from .fieldsets import schema_columns
+from .tenancy import resolve_clinica_id
+
+router = APIRouter()
+
+# Linhas por fetch do cursor e por bloco enviado ao cliente
+EXPORT_BATCH_SIZE = 2_000
+
+MEDIA_TYPES = {
+    schemas.ExportFormatoEnum.CSV: "text/csv; charset=utf-8",
+    schemas.ExportFormatoEnum.NDJSON: "application/x-ndjson",
+}
+
+def _batches(engine: Engine, query) -> Iterator[list]:
+    # Conexão própria: a sessão da requisição é fechada antes de o corpo começar a ser enviado
+    with engine.connect() as conn, conn.begin():
+        if conn.dialect.name == "postgresql":
+            # O cursor fica aberto enquanto o cliente consome o arquivo; o statement_timeout padrão o interromperia
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(query)
+        for partition in result.partitions():
+            yield partition
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _csv(columns: List[str], batches: Iterator[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Cabeçalho mesmo sem linhas
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson(columns: List[str], batches: Iterator[list]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in batch)
+
+def _check_range(start, end) -> None:
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intervalo inválido: start deve ser anterior a end")
+
+def export_response(db: Session, model, schema, date_column, clinica_id: int, start, end, formato: schemas.ExportFormatoEnum, nome: str, join=None) -> StreamingResponse:
+    """
+    Exporta as linhas de `model` da clínica no intervalo semiaberto [start, end) de `date_column`, em ordem de
+    (`date_column`, id). `join` é a condição para quando `date_column` pertence a outra tabela.
+    """
+    _check_range(start, end)
+    columns = sorted(schema_columns(model, schema), key=lambda name: name != "id")
+    query = select(*[getattr(model, name) for name in columns]).where(model.clinica_id == clinica_id)
+    if join is not None:
+        query = query.join(date_column.class_, join)
+    if start is not None:
+        query = query.where(date_column >= start)
+    if end is not None:
+        query = query.where(date_column < end)
+    query = query.order_by(date_column, model.id)
+
+    writer = _csv if formato == schemas.ExportFormatoEnum.CSV else _ndjson
+    filename = f"{nome}-clinica-{clinica_id}" + (f"-{start:%Y%m%d}" if start is not None else "") + f".{formato.value}"
+    return StreamingResponse(
+        writer(columns, _batches(db.get_bind(), query)),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+FORBIDDEN_DETAIL = "Não autorizado a exportar dados desta clínica"
+
+@router.get("/agendamentos/export")
+def export_agendamentos(
+    formato: schemas.ExportFormatoEnum = schemas.ExportFormatoEnum.CSV,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    clinica_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(has_permission("ler_agendamentos")),
+):
+    clinica_id = resolve_clinica_id(current_user, clinica_id, FORBIDDEN_DETAIL)
+    return export_response(db, models.Agendamento, schemas.AgendamentoInDBBase, models.Agendamento.data, clinica_id, start, end, formato, "agendamentos")
+
+@router.get("/atendimentos/export")
+def export_atendimentos(
+    formato: schemas.ExportFormatoEnum = schemas.ExportFormatoEnum.CSV,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    clinica_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(has_permission("ler_atendimentos")),
+):
+    clinica_id = resolve_clinica_id(current_user, clinica_id, FORBIDDEN_DETAIL)
+    return export_response(db, models.Atendimento, schemas.AtendimentoInDBBase, models.Atendimento.data_inicio, clinica_id, start, end, formato, "atendimentos")
+
+@router.get("/lancamentos-financeiros/export")
+def export_lancamentos_financeiros(
+    formato: schemas.ExportFormatoEnum = schemas.ExportFormatoEnum.CSV,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    clinica_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(has_permission("ler_lancamentos_financeiros")),
+):
+    # Período pela data de vencimento
+    clinica_id = resolve_clinica_id(current_user, clinica_id, FORBIDDEN_DETAIL)
+    return export_response(db, models.LancamentoFinanceiro, schemas.LancamentoFinanceiroInDBBase, models.LancamentoFinanceiro.data_vencimento,
+                           clinica_id, start, end, formato, "lancamentos-financeiros")
+
+@router.get("/comissoes/export")
+def export_comissoes(
+    formato: schemas.ExportFormatoEnum = schemas.ExportFormatoEnum.CSV,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    clinica_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(has_permission("ler_comissoes")),
+):
+    # Comissão não tem data própria: o período é o do início do atendimento
+    clinica_id = resolve_clinica_id(current_user, clinica_id, FORBIDDEN_DETAIL)
+    return export_response(db, models.Comissao, schemas.ComissaoInDBBase, models.Atendimento.data_inicio, clinica_id, start, end, formato, "comissoes",
+                           join=models.Atendimento.id == models.Comissao.atendimento_id)
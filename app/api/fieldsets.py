@@ -0,0 +1,140 @@
+"""
+Sparse fieldsets and relation expansion.
+
+This file implements the `fields=` and `include=` query parameters of the list/detail endpoints. `include` names the
+relations to embed (`include=paciente,profissional.user`) and `fields` the columns to return, dotted for included
+relations (`fields=data,status,paciente.nome`). The request is turned into loader options, `load_only` for the
+columns and `joinedload`/`selectinload` for the relations, so the SELECT carries only what the screen asked for and
+the relations come in the same round trip instead of one follow-up call per row.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import ConfigDict, TypeAdapter, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from .. import schemas
+
+# (colunas, ((relação, subárvore), ...)): a seleção normalizada, hashable para o cache dos serializadores
+Tree = Tuple[Tuple[str, ...], Tuple[Tuple[str, "Tree"], ...]]
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+def _schema_for(model) -> type:
+    # Relações são serializadas com o schema "InDBBase" do modelo de destino (ex.: Paciente -> PacienteInDBBase)
+    return getattr(schemas, f"{model.__name__}InDBBase")
+
+def schema_columns(model, schema) -> List[str]:
+    """Campos do schema que são colunas do modelo, na ordem do schema (relações aninhadas ficam de fora)."""
+    column_attrs = inspect(model).column_attrs.keys()
+    return [name for name in schema.model_fields if name in column_attrs]
+
+def _tree(model, schema, paths: Dict[str, List[str]], prefix: str = "") -> Tree:
+    columns = schema_columns(model, schema)
+    requested = paths.get(prefix)
+    if requested:
+        invalid = [name for name in requested if name not in columns]
+        if invalid:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Campo inválido: {(prefix + '.' if prefix else '') + invalid[0]}")
+        # O id sempre acompanha o registro
+        columns = [name for name in columns if name in requested or name == "id"]
+
+    relations = []
+    mapper = inspect(model)
+    for path in paths:
+        parent, _, name = path.rpartition(".")
+        if path and parent == prefix:
+            target = mapper.relationships[name].mapper.class_
+            relations.append((name, _tree(target, _schema_for(target), paths, path)))
+    return tuple(columns), tuple(sorted(relations))
+
+def _options(model, tree: Tree, keys: Sequence = ()) -> list:
+    columns, relations = tree
+    mapper = inspect(model)
+    options = [load_only(*[getattr(model, name) for name in columns], *keys)]
+    for name, subtree in relations:
+        relationship = mapper.relationships[name]
+        # Relações para um registro vêm no mesmo SELECT; coleções em um segundo SELECT ... IN
+        loader = selectinload if relationship.uselist else joinedload
+        options.append(loader(getattr(model, name)).options(*_options(relationship.mapper.class_, subtree)))
+    return options
+
+@lru_cache(maxsize=256)
+def _partial_schema(model, schema, tree: Tree) -> type:
+    """Schema com só os campos selecionados; os tipos e validações vêm do schema original."""
+    columns, relations = tree
+    fields: Dict[str, Any] = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in columns}
+    mapper = inspect(model)
+    for name, subtree in relations:
+        relationship = mapper.relationships[name]
+        target = relationship.mapper.class_
+        nested = _partial_schema(target, _schema_for(target), subtree)
+        fields[name] = (List[nested], []) if relationship.uselist else (Optional[nested], None)
+    return create_model(f"{schema.__name__}Parcial", __config__=ConfigDict(from_attributes=True), **fields)
+
+@lru_cache(maxsize=256)
+def _adapter(model, schema, tree: Tree, many: bool) -> TypeAdapter:
+    partial = _partial_schema(model, schema, tree)
+    return TypeAdapter(List[partial] if many else partial)
+
+class Fieldset:
+    """Seleção de campos/relações de uma requisição; inativa quando nem `fields` nem `include` foram informados."""
+
+    def __init__(self, model, schema, tree: Optional[Tree] = None, keys: Sequence = ()):
+        self.model = model
+        self.schema = schema
+        self.tree = tree
+        self.options = _options(model, tree, keys) if tree is not None else []
+
+    @property
+    def active(self) -> bool:
+        return self.tree is not None
+
+    def render(self, content, response: Optional[Response] = None):
+        """
+        Com seleção ativa, serializa `content` (um registro ou uma lista) só com os campos pedidos e devolve a
+        resposta pronta, preservando os cabeçalhos já definidos (ex.: X-Next-Cursor). Sem seleção, devolve
+        `content` para o `response_model` do endpoint.
+        """
+        if not self.active:
+            return content
+        adapter = _adapter(self.model, self.schema, self.tree, isinstance(content, list))
+        # Valida a partir dos objetos ORM antes de serializar; dump_json direto sobre o modelo gera avisos do pydantic
+        body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"} if response is not None else None
+        return Response(content=body, media_type="application/json", headers=headers)
+
+def sparse_fieldset(model, schema, relations: Sequence[str] = (), keys: Sequence = ()):
+    """
+    Dependência que lê `fields` e `include` da query string.
+
+    `relations` lista as relações que o endpoint aceita expandir (caminhos com ponto, ex.: "profissional.user");
+    `keys` são colunas que o endpoint sempre precisa carregar, como a chave de ordenação da paginação.
+    """
+    allowed = set(relations)
+    description = "Relações a incluir: " + ", ".join(relations) if relations else "Sem relações para incluir"
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,nome,paciente.nome)"),
+        include: Optional[str] = Query(None, description=description),
+    ) -> Fieldset:
+        if fields is None and include is None:
+            return Fieldset(model, schema, keys=keys)
+        paths: Dict[str, List[str]] = {"": []}
+        for path in _split(include):
+            if path not in allowed:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Relação inválida: {path}")
+            # Incluir profissional.user inclui também profissional
+            parts = path.split(".")
+            for i in range(1, len(parts) + 1):
+                paths.setdefault(".".join(parts[:i]), [])
+        for field in _split(fields):
+            prefix, _, name = field.rpartition(".")
+            if prefix not in paths:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Campo de relação não incluída: {field}")
+            paths[prefix].append(name)
+        return Fieldset(model, schema, _tree(model, schema, paths), keys)
+    return dependency
@@ -0,0 +1,68 @@
+"""
+Prometheus metrics endpoint.
+
+This file exposes `GET /metrics` with the HTTP request metrics collected by `MetricsMiddleware` and the current state of
+the connection pools, the principal cache and the bcrypt thread pool of the worker that answered the scrape.
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..core.auth import principal_cache
+from ..core import database
+from ..core.database import get_pool_status
+from ..core.metrics import PrometheusText, RequestMetrics
+from ..core.security import password_hashing_pool
+
+router = APIRouter()
+
+# Alimentado pelo MetricsMiddleware registrado em app/main.py
+request_metrics = RequestMetrics()
+
+def _pool_metrics(text: PrometheusText) -> None:
+    pools = {"sync": get_pool_status(database.engine), "async": get_pool_status(database.async_engine)}
+    # Pools sem limite (ex.: SQLite em desenvolvimento) não têm tamanho nem histograma de espera
+    limitados = {nome: status for nome, status in pools.items() if "size" in status}
+    text.gauge("db_pool_size", "Conexões mantidas abertas pelo pool.", [({"pool": n}, s["size"]) for n, s in limitados.items()])
+    text.gauge("db_pool_checked_out", "Conexões em uso.", [({"pool": n}, s["checked_out"]) for n, s in limitados.items()])
+    text.gauge("db_pool_overflow", "Conexões abertas acima do tamanho do pool.", [({"pool": n}, s["overflow"]) for n, s in limitados.items()])
+    text.gauge("db_pool_max_overflow", "Conexões extras permitidas acima do tamanho do pool.", [({"pool": n}, s["max_overflow"]) for n, s in limitados.items()])
+    medidos = {nome: status for nome, status in pools.items() if "wait_seconds" in status}
+    text.histogram("db_pool_wait_seconds", "Espera por uma conexão livre.", [({"pool": n}, s["wait_seconds"]) for n, s in medidos.items()])
+    text.counter("db_pool_timeouts_total", "Esperas por conexão que estouraram o pool_timeout.", [({"pool": n}, s["timeouts"]) for n, s in medidos.items()])
+
+def _http_metrics(text: PrometheusText) -> None:
+    metrics = request_metrics
+    text.counter("http_requests_total", "Requisições HTTP respondidas, por rota e status.", [
+        ({"method": method, "route": route, "status": status_code}, count)
+        for (method, route, status_code), count in sorted(metrics.responses.items())
+    ])
+    text.gauge("http_requests_in_progress", "Requisições HTTP em andamento.", [(None, metrics.in_progress)])
+    for name, help_text, histograms in (
+        ("http_request_duration_seconds", "Latência das requisições HTTP.", metrics.latency),
+        ("http_request_size_bytes", "Tamanho do corpo das requisições HTTP.", metrics.request_size),
+        ("http_response_size_bytes", "Tamanho do corpo das respostas HTTP.", metrics.response_size),
+    ):
+        text.histogram(name, help_text, [({"method": method, "route": route}, h.snapshot()) for (method, route), h in sorted(histograms.items())])
+
+def _auth_metrics(text: PrometheusText) -> None:
+    cache = principal_cache.stats()
+    consultas = cache["hits"] + cache["misses"]
+    text.counter("auth_principal_cache_hits_total", "Requisições autenticadas resolvidas pelo cache de principals.", [(None, cache["hits"])])
+    text.counter("auth_principal_cache_misses_total", "Requisições autenticadas que carregaram o usuário do banco.", [(None, cache["misses"])])
+    text.gauge("auth_principal_cache_hit_ratio", "Fração de acertos do cache de principals desde o início do processo.", [(None, cache["hits"] / consultas if consultas else 0.0)])
+    text.gauge("auth_principal_cache_size", "Principals em cache.", [(None, cache["size"])])
+
+    hashing = password_hashing_pool.stats()
+    text.gauge("password_hash_queue_depth", "Operações de bcrypt aguardando uma thread.", [(None, hashing["queued"])])
+    text.gauge("password_hash_running", "Operações de bcrypt em execução.", [(None, hashing["running"])])
+    text.gauge("password_hash_workers", "Threads disponíveis para bcrypt.", [(None, hashing["max_workers"])])
+    text.counter("password_hash_completed_total", "Operações de bcrypt concluídas.", [(None, hashing["completed"])])
+
+# async: roda no loop de eventos, a mesma thread em que o middleware atualiza as métricas HTTP
+@router.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+async def read_metrics():
+    text = PrometheusText()
+    _http_metrics(text)
+    _pool_metrics(text)
+    _auth_metrics(text)
+    return PlainTextResponse(text.render(), media_type=PrometheusText.CONTENT_TYPE)
@@ -0,0 +1,76 @@
+"""
+Pagination helpers for the list endpoints.
+
+This file implements keyset (cursor) pagination: results are ordered by a stable key and the next page starts
+right after the last key returned, so deep pages cost the same as the first one. The opaque cursor for the next
+page is returned in the `X-Next-Cursor` response header; `skip`/`limit` keep working as a compatibility mode.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Date, DateTime, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Maior `limit` aceito pelas rotas de listagem; páginas maiores devem usar o cursor ou os endpoints /export
+MAX_LIMIT = 1000
+
+def encode_cursor(values: Sequence) -> str:
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, key_columns: Sequence) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(key_columns):
+            raise ValueError("cursor length")
+        values = []
+        for column, value in zip(key_columns, payload):
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, Date):
+                value = date.fromisoformat(value)
+            elif type(value) is not column.type.python_type:
+                # O valor vai direto para o WHERE: listas, objetos ou texto no lugar do id não chegam ao banco
+                raise TypeError("cursor value")
+            values.append(value)
+        return values
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+def _after(key_columns: Sequence, values: Sequence):
+    # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), escrito sem row values para funcionar em qualquer banco
+    column, value = key_columns[0], values[0]
+    if len(key_columns) == 1:
+        return column > value
+    return or_(column > value, and_(column == value, _after(key_columns[1:], values[1:])))
+
+def _apply(query, key_columns: Sequence, skip: int, limit: int, cursor: Optional[str]):
+    query = query.order_by(*key_columns)
+    if cursor:
+        query = query.where(_after(key_columns, decode_cursor(cursor, key_columns)))
+    elif skip:
+        query = query.offset(skip)
+    # Busca um item a mais só para saber se existe próxima página
+    return query.limit(limit + 1)
+
+def _page(items: list, key_columns: Sequence, limit: int, response: Optional[Response]) -> list:
+    if len(items) > limit:
+        items = items[:limit]
+        if response is not None and items:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(items[-1], c.key) for c in key_columns])
+    return items
+
+def paginate(query, key_columns: Sequence, skip: int, limit: int, cursor: Optional[str], response: Optional[Response]) -> List:
+    """Pagina uma `Query` síncrona ordenada por `key_columns` (a última coluna deve ser única, ex.: o id)."""
+    return _page(_apply(query, key_columns, skip, limit, cursor).all(), key_columns, limit, response)
+
+async def paginate_async(db: AsyncSession, query, key_columns: Sequence, skip: int, limit: int, cursor: Optional[str], response: Optional[Response]) -> List:
+    """Versão de `paginate` para um `select()` executado em uma `AsyncSession`."""
+    result = await db.execute(_apply(query, key_columns, skip, limit, cursor))
+    return _page(list(result.scalars().all()), key_columns, limit, response)
@@ -0,0 +1,133 @@
+"""
+Tenant ownership checks.
+
+This file resolves which clinic owns a record in a single SELECT, so the detail/update/delete/create handlers
+don't need to walk Atendimento -> Agendamento -> Paciente (or Profissional -> User) one query at a time.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+
+# modelo -> (tabela que guarda a clínica dona do registro, condição de join; None quando é a própria tabela)
+_OWNER = {
+    models.Paciente: (models.Paciente, None),
+    models.Lead: (models.Lead, None),
+    models.TipoTratamento: (models.TipoTratamento, None),
+    models.Convenio: (models.Convenio, None),
+    models.PastaDocumento: (models.PastaDocumento, None),
+    models.CampanhaMarketing: (models.CampanhaMarketing, None),
+    models.CupomDesconto: (models.CupomDesconto, None),
+    models.User: (models.User, None),
+    # clinica_id desnormalizado (ver app/models.py)
+    models.Agendamento: (models.Agendamento, None),
+    models.Atendimento: (models.Atendimento, None),
+    models.LancamentoFinanceiro: (models.LancamentoFinanceiro, None),
+    models.Comissao: (models.Comissao, None),
+    # um join até a tabela com clinica_id
+    models.Profissional: (models.User, models.User.id == models.Profissional.user_id),
+    models.Prontuario: (models.Paciente, models.Paciente.id == models.Prontuario.paciente_id),
+    models.PesquisaSatisfacao: (models.Paciente, models.Paciente.id == models.PesquisaSatisfacao.paciente_id),
+    models.DocumentoArquivo: (models.PastaDocumento, models.PastaDocumento.id == models.DocumentoArquivo.pasta_id),
+    models.Fatura: (models.Convenio, models.Convenio.id == models.Fatura.convenio_id),
+}
+
+def _is_foreign(current_user, clinica_id: Optional[int]) -> bool:
+    return not current_user.is_superuser and clinica_id != current_user.clinica_id
+
+def get_owned_or_404(db: Session, model, obj_id: int, current_user, not_found_detail: str, forbidden_detail: str, options: Iterable = ()):
+    """
+    Carrega o registro junto com a clínica dona em uma única consulta e valida o acesso do usuário.
+
+    `options` são opções de carregamento do ORM aplicadas à consulta (ex.: `undefer_group(...)`).
+    """
+    owner, onclause = _OWNER[model]
+    query = db.query(model, owner.clinica_id).options(*options)
+    if onclause is not None:
+        query = query.outerjoin(owner, onclause)
+    row = query.filter(model.id == obj_id).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+    obj, clinica_id = row
+    if _is_foreign(current_user, clinica_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden_detail)
+    return obj
+
+def get_owned_many(db: Session, model, obj_ids: Iterable[int]) -> Dict[int, Tuple[object, Optional[int]]]:
+    """Carrega vários registros com a clínica dona de cada um em uma única consulta IN: {id: (registro, clinica_id)}."""
+    owner, onclause = _OWNER[model]
+    query = db.query(model, owner.clinica_id)
+    if onclause is not None:
+        query = query.outerjoin(owner, onclause)
+    return {obj.id: (obj, clinica_id) for obj, clinica_id in query.filter(model.id.in_(set(obj_ids)))}
+
+def owners_of(db: Session, model, obj_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+    """Clínica dona de cada registro existente entre `obj_ids`, em uma única consulta IN: {id: clinica_id}."""
+    owner, onclause = _OWNER[model]
+    query = select(model.id, owner.clinica_id).select_from(model)
+    if onclause is not None:
+        query = query.outerjoin(owner, onclause)
+    return {obj_id: clinica_id for obj_id, clinica_id in db.execute(query.where(model.id.in_(set(obj_ids))))}
+
+def ownership_error(owners: Dict[int, Optional[int]], obj_id: int, current_user, not_found_detail: str, forbidden_detail: str) -> Optional[HTTPException]:
+    """O 404/403 que `get_owned_or_404` levantaria para `obj_id`, a partir do resultado de `owners_of`."""
+    if obj_id not in owners:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+    if _is_foreign(current_user, owners[obj_id]):
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden_detail)
+    return None
+
+def check_parents(db: Session, current_user, *parents: Tuple) -> List[Optional[int]]:
+    """
+    Valida registros referenciados por um payload, cada um como `(model, id, not_found_detail, forbidden_detail)`.
+
+    Todos são resolvidos em um único SELECT de subconsultas escalares; os erros são levantados na ordem em que os
+    pais foram informados. Retorna o clinica_id de cada pai.
+    """
+    columns = []
+    for model, obj_id, _, _ in parents:
+        owner, onclause = _OWNER[model]
+        found = select(model.id).where(model.id == obj_id)
+        clinica = select(owner.clinica_id).select_from(model)
+        if onclause is not None:
+            clinica = clinica.join(owner, onclause)
+        columns += [found.scalar_subquery(), clinica.where(model.id == obj_id).scalar_subquery()]
+    row = db.execute(select(*columns)).one()
+
+    clinicas = []
+    for i, (_, _, not_found_detail, forbidden_detail) in enumerate(parents):
+        found, clinica_id = row[2 * i], row[2 * i + 1]
+        if found is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+        if _is_foreign(current_user, clinica_id):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden_detail)
+        clinicas.append(clinica_id)
+    return clinicas
+
+def check_changed_parents(db: Session, current_user, obj, changes: dict, *parents: Tuple) -> None:
+    """
+    `check_parents` para updates, com cada pai como `(model, campo, not_found_detail, forbidden_detail)`.
+
+    Só os pais cujo id muda em `changes` são validados: o listener before_update copia o clinica_id do novo pai, e um
+    pai de outra clínica tiraria o registro da clínica de quem o atualiza.
+    """
+    changed = [
+        (model, changes[field], not_found_detail, forbidden_detail)
+        for model, field, not_found_detail, forbidden_detail in parents
+        if changes.get(field) is not None and changes[field] != getattr(obj, field)
+    ]
+    if changed:
+        check_parents(db, current_user, *changed)
+
+def resolve_clinica_id(current_user, clinica_id: Optional[int], forbidden_detail: str) -> int:
+    """Clínica alvo de operações por clínica: a do usuário ou, para superusuário, a informada (obrigatória)."""
+    if not current_user.is_superuser:
+        if clinica_id is not None and clinica_id != current_user.clinica_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden_detail)
+        clinica_id = current_user.clinica_id
+    if clinica_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="clinica_id é obrigatório")
+    return clinica_id
@@ -4,16 +4,21 @@ Authentication and authorization utilities.
 This file contains functions for getting the current user, checking for active users, and checking for permissions.
 """
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session, joinedload
 
 from .. import models
+from ..core.cache import Principal, PrincipalCache
+from ..core.config import settings
 from ..core.database import get_db
 from ..core.security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+principal_cache = PrincipalCache(ttl_seconds=settings.principal_cache_ttl_seconds)
+
+def _get_username_from_token(token: str) -> str:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,38 +30,61 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     username: str = payload.get("sub")
     if username is None:
         raise credentials_exception
+    return username
+
+def _load_user(username: str, db: Session) -> models.User:
     user = db.query(models.User).options(joinedload(models.User.perfil).joinedload(models.Perfil.permissoes)).filter(models.User.username == username).first()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    principal_cache.set(Principal.from_user(user))
     return user
 
+# Dependência síncrona: o FastAPI a executa no threadpool, fora do event loop
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    return _load_user(_get_username_from_token(token), db)
+
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
 
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    # Usa o cache de permissões e só consulta o banco (no threadpool) quando o usuário não está em cache ou expirou
+    username = _get_username_from_token(token)
+    principal = principal_cache.get(username)
+    if principal is None:
+        principal = Principal.from_user(await run_in_threadpool(_load_user, username, db))
+    return principal
+
+async def get_current_active_principal(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    if not current_user.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    return current_user
+
 def has_permission(permission_name: str):
-    async def permission_checker(current_user: models.User = Depends(get_current_active_user)):
+    async def permission_checker(current_user: Principal = Depends(get_current_active_principal)):
+        # Aceita também um models.User já carregado (ex.: chamadas diretas fora do FastAPI)
+        principal = current_user if isinstance(current_user, Principal) else Principal.from_user(current_user)
+
         # Se o usuário for superuser ou tiver acesso de admin, ele tem todas as permissões
-        if current_user.is_superuser or (current_user.perfil and any(p.nome == "admin_acesso" for p in current_user.perfil.permissoes)):
+        if principal.has_permission(permission_name):
             return current_user
 
-        if not current_user.perfil:
+        if principal.perfil_id is None:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuário não possui perfil atribuído")
-        
-        # Verifica se o perfil do usuário possui a permissão necessária
-        for permission in current_user.perfil.permissoes:
-            if permission.nome == permission_name:
-                return current_user
-        
+
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Usuário não possui permissão: {permission_name}")
     return permission_checker
 
-async def get_current_admin_user(current_user: models.User = Depends(has_permission("admin_acesso"))):
+async def get_current_admin_user(current_user: Principal = Depends(has_permission("admin_acesso"))):
     return current_user
 
-async def get_current_profissional_user(current_user: models.User = Depends(has_permission("profissional_acesso"))):
+async def get_current_profissional_user(current_user: Principal = Depends(has_permission("profissional_acesso"))):
     return current_user
 
-async def get_current_paciente_user(current_user: models.User = Depends(has_permission("paciente_acesso"))):
+async def get_current_paciente_user(current_user: Principal = Depends(has_permission("paciente_acesso"))):
     return current_user
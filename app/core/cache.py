@@ -0,0 +1,92 @@
+"""
+In-process caches.
+
+This file contains the resolved-principal cache used by the authentication dependencies, so that
+protected requests don't reload the user, its perfil and its permissões on every call.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from .. import models
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Usuário autenticado já resolvido, com o conjunto de permissões do seu perfil."""
+    id: int
+    username: str
+    is_active: bool
+    is_superuser: bool
+    clinica_id: Optional[int]
+    perfil_id: Optional[int]
+    permissoes: FrozenSet[str]
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        permissoes = frozenset(p.nome for p in user.perfil.permissoes) if user.perfil else frozenset()
+        return cls(
+            id=user.id,
+            username=user.username,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            clinica_id=user.clinica_id,
+            perfil_id=user.perfil_id,
+            permissoes=permissoes,
+        )
+
+    def has_permission(self, permission_name: str) -> bool:
+        return self.is_superuser or "admin_acesso" in self.permissoes or permission_name in self.permissoes
+
+
+class PrincipalCache:
+    """
+    Cache por processo de `Principal`, indexado por username, com expiração (TTL).
+
+    Cada worker tem a sua própria instância: as invalidações disparadas pelos endpoints só
+    alcançam o processo que atendeu a requisição, e o TTL limita o tempo em que os demais
+    workers podem servir permissões desatualizadas.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, Principal]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[username]
+            self.misses += 1
+            return None
+
+    def set(self, principal: Principal) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[principal.username] = (time.monotonic() + self.ttl_seconds, principal)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for username in [u for u, (_, p) in self._entries.items() if p.id == user_id]:
+                del self._entries[username]
+
+    def invalidate_perfil(self, perfil_id: int) -> None:
+        with self._lock:
+            for username in [u for u, (_, p) in self._entries.items() if p.perfil_id == perfil_id]:
+                del self._entries[username]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
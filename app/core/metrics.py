@@ -0,0 +1,178 @@
+"""
+Metrics primitives.
+
+This file contains the in-process counters and histograms used to instrument the application (database pool, requests, caches),
+the ASGI middleware that measures every HTTP request and the Prometheus text exposition of those numbers.
+"""
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Buckets padrão (em segundos) para medir latências
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Buckets (em bytes) para tamanhos de requisição e resposta
+DEFAULT_SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Histogram:
+    """Histograma cumulativo com buckets fixos, no formato usado pelo Prometheus."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "count": running + counts[-1], "sum": total}
+
+
+class LoopHistogram(Histogram):
+    """Histograma observado somente no loop de eventos (uma única thread), então `observe` dispensa o lock."""
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sum += value
+
+
+class RequestMetrics:
+    """
+    Latência, tamanhos e status das requisições HTTP, por método e rota.
+
+    A rota é o template (`/api/pacientes/{paciente_id}`), não o caminho, para manter a cardinalidade limitada.
+    Todas as observações são feitas pelo `MetricsMiddleware`, no loop de eventos, inclusive as de endpoints
+    síncronos; por isso nada aqui usa lock.
+    """
+
+    def __init__(self, latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, size_buckets: Sequence[float] = DEFAULT_SIZE_BUCKETS):
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.latency: Dict[Tuple[str, str], LoopHistogram] = {}
+        self.request_size: Dict[Tuple[str, str], LoopHistogram] = {}
+        self.response_size: Dict[Tuple[str, str], LoopHistogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.in_progress = 0
+
+    def observe(self, method: str, route: str, status_code: int, duration: float, request_bytes: int, response_bytes: int) -> None:
+        key = (method, route)
+        if key not in self.latency:
+            self.latency[key] = LoopHistogram(self.latency_buckets)
+            self.request_size[key] = LoopHistogram(self.size_buckets)
+            self.response_size[key] = LoopHistogram(self.size_buckets)
+        self.latency[key].observe(duration)
+        self.request_size[key].observe(request_bytes)
+        self.response_size[key].observe(response_bytes)
+        status_key = (method, route, status_code)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+
+def _route_template(scope) -> str:
+    # O roteador do FastAPI grava a rota encontrada no próprio scope
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que alimenta um `RequestMetrics` com cada requisição HTTP."""
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_counting():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_counting(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_progress += 1
+        try:
+            await self.app(scope, receive_counting, send_counting)
+        finally:
+            self.metrics.in_progress -= 1
+            self.metrics.observe(scope["method"], _route_template(scope), status_code, time.perf_counter() - start, request_bytes, response_bytes)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Optional[dict]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusText:
+    """Monta a exposição no formato texto do Prometheus (versão 0.0.4)."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def _header(self, name: str, kind: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Optional[dict], float]]) -> None:
+        self._header(name, "counter", help_text)
+        self._lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Optional[dict], float]]) -> None:
+        self._header(name, "gauge", help_text)
+        self._lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+
+    def histogram(self, name: str, help_text: str, samples: Iterable[Tuple[Optional[dict], dict]]) -> None:
+        """`samples`: pares (labels, `Histogram.snapshot()`)."""
+        self._header(name, "histogram", help_text)
+        for labels, snapshot in samples:
+            labels = labels or {}
+            for bound, count in snapshot["buckets"]:
+                self._lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(float(bound))})} {count}")
+            self._lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {snapshot['count']}")
+            self._lines.append(f"{name}_sum{_labels(labels)} {_number(float(snapshot['sum']))}")
+            self._lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
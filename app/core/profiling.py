@@ -0,0 +1,149 @@
+"""
+Per-request SQL instrumentation.
+
+This file counts the SQL statements each request sends to the database (through the SQLAlchemy cursor events),
+measures the time spent on them and groups repeated statements by fingerprint to surface N+1 patterns. The numbers
+go out as a `Server-Timing` header and a structured log line, and a statement budget can turn an excess into an
+error so the test suite catches regressions.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.db.queries")
+
+# Listas IN e VALUES de várias linhas variam de tamanho conforme o lote; literais não entram na impressão digital
+_LISTAS = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)\s*,?)+\)")
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_ESPACOS = re.compile(r"\s+")
+
+class QueryBudgetExceeded(AssertionError):
+    """Requisição passou do número de comandos SQL permitido (somente no modo estrito)."""
+
+def fingerprint(statement: str) -> str:
+    """Forma normalizada de um comando, igual para execuções que só diferem nos parâmetros."""
+    statement = _LITERAIS.sub("?", statement)
+    statement = _LISTAS.sub("(?)", statement)
+    return _ESPACOS.sub(" ", statement).strip()
+
+class QueryStats:
+    """Comandos executados por uma requisição. Cada requisição tem o seu, então não há disputa por lock."""
+
+    def __init__(self, budget: int = 0, strict: bool = False):
+        self.budget = budget
+        self.strict = strict
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[dict]:
+        """Comandos executados `threshold` vezes ou mais na mesma requisição (candidatos a N+1)."""
+        return [{"fingerprint": fp, "count": count} for fp, count in self.fingerprints.most_common() if count >= threshold]
+
+    @property
+    def over_budget(self) -> bool:
+        return 0 < self.budget < self.count
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.count += 1
+    if stats.strict and stats.over_budget:
+        raise QueryBudgetExceeded(
+            f"{stats.count} comandos SQL na requisição (orçamento: {stats.budget}); mais repetidos: {stats.repeated(2)}"
+        )
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    stats.record(statement, time.perf_counter() - conn.info["query_start"].pop())
+
+def instrument_queries() -> None:
+    """Registra os eventos em todas as engines (inclusive a síncrona por trás da engine asyncio). Idempotente."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+def query_budget(max_queries: int):
+    """Dependência de rota que substitui o orçamento padrão de comandos SQL da requisição."""
+    def dependency():
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return dependency
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI que coleta as estatísticas de SQL de cada requisição HTTP.
+
+    O cabeçalho `Server-Timing` reflete os comandos executados até o início da resposta; o log, emitido ao final,
+    inclui também os de respostas em streaming.
+    """
+
+    def __init__(self, app, budget: int = 0, strict: bool = False, repeat_threshold: int = 3):
+        self.app = app
+        self.budget = budget
+        self.strict = strict
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(self.budget, self.strict)
+        token = _current.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"server-timing", stats.server_timing().encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._log(scope, status_code, stats, time.perf_counter() - start)
+
+    def _log(self, scope, status_code: int, stats: QueryStats, elapsed: float) -> None:
+        repeated = stats.repeated(self.repeat_threshold)
+        level = logging.WARNING if repeated or stats.over_budget else logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(level, json.dumps({
+            "event": "db_queries",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 2),
+            "request_ms": round(elapsed * 1000, 2),
+            "budget": stats.budget or None,
+            "repeated": repeated,
+        }, ensure_ascii=False))
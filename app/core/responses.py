@@ -0,0 +1,27 @@
+"""
+JSON response rendering.
+
+This file renders JSON bodies with pydantic-core's Rust encoder (the one behind `model_dump_json`) instead of the
+standard library `json` module. FastAPI has already converted `response_model` results to JSON-compatible values, so
+the encoder only writes bytes; for everything else Decimal becomes a string (as in pydantic's JSON mode) and
+date/datetime/time values are written in ISO 8601.
+"""
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+def _fallback(value: Any) -> Any:
+    # Tipos que o pydantic-core não conhece seguem as regras do FastAPI
+    return jsonable_encoder(value)
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto em UTF-8; NaN e infinito viram null em vez de gerar JSON inválido."""
+    return to_json(content, inf_nan_mode="null", fallback=_fallback)
+
+class FastJSONResponse(JSONResponse):
+    """Resposta JSON padrão da aplicação (ver create_app em app/main.py)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
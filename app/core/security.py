@@ -3,11 +3,16 @@ Security-related utilities.
 
 This file contains functions for password hashing, and creating and decoding JWT tokens.
 """
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 
+from .config import settings
+
 # Configuração para hashing de senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -16,12 +21,69 @@ SECRET_KEY = "your-super-secret-jwt-key" # Mude isso em produção!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+class PasswordHashingPool:
+    """
+    Pool de threads limitado para as operações de bcrypt.
+
+    O bcrypt libera o GIL, então as threads rodam em paralelo sem bloquear o event loop; o limite de
+    workers evita que um pico de logins consuma todas as CPUs. `queued` é a profundidade da fila
+    (tarefas aguardando uma thread) e `running` o número de hashes em execução.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+
+    def _run(self, fn, *args):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _on_done(self, future) -> None:
+        # Uma tarefa cancelada antes de começar nunca passa por _run
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            self.queued += 1
+        future = self._executor.submit(self._run, fn, *args)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"max_workers": self.max_workers, "queued": self.queued, "running": self.running, "completed": self.completed}
+
+password_hashing_pool = PasswordHashingPool(max_workers=settings.password_hash_max_workers)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hashing_pool.run(verify_password, plain_password, hashed_password)
+
+# Hash de custo mínimo (4 rounds): verificar custa ~1 ms e só serve para aquecer o bcrypt
+_WARM_UP_HASH = "$2b$04$ah1xU6/wiSGn2eOhKZ4i0.Kk9w4ElDX3bXIzzx3nV0AEAQENQ/DES"
+
+async def warm_up_password_hashing() -> None:
+    """Carrega o backend do bcrypt do passlib (feito na primeira verificação) e inicia uma thread do pool."""
+    await password_hashing_pool.run(verify_password, "warm-up", _WARM_UP_HASH)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -1,17 +1,29 @@
 """
 Main application file.
 
-This file initializes the FastAPI application, sets up CORS middleware, and includes the API router.
+This file builds the FastAPI application (`create_app`): CORS and instrumentation middleware, the API routers and a
+lifespan that binds the database engines to the application settings, optionally warms them up and disposes of them
+on shutdown. The schema is managed by Alembic (`alembic upgrade head`), never at startup.
 """
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .api import endpoints
-from .core.database import Base, engine
+from sqlalchemy.orm import configure_mappers
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from .api import endpoints, exports, metrics
+from .core import database
+from .core.config import Settings, settings as default_settings
+from .core.metrics import MetricsMiddleware
+from .core.profiling import QueryStatsMiddleware, instrument_queries
+from .core.responses import FastJSONResponse
+from .core.security import warm_up_password_hashing
 
-app = FastAPI()
+logger = logging.getLogger("app.startup")
 
 # Set up CORS
 origins = [
@@ -21,16 +33,72 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def warm_up(app: FastAPI) -> dict:
+    """
+    Adianta o trabalho que a primeira requisição de cada worker faria: configuração dos mappers do ORM, schema
+    OpenAPI, conexões dos pools e carga do bcrypt. Retorna a duração de cada etapa em milissegundos.
+    """
+    timings = {}
+    start = time.perf_counter()
+    configure_mappers()
+    app.openapi()
+    timings["caches_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    start = time.perf_counter()
+    pools, _ = await asyncio.gather(database.warm_up_pools(), warm_up_password_hashing())
+    timings["pools_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    timings["connections"] = pools
+    return timings
+
+def create_app(settings: Settings = default_settings) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        start = time.perf_counter()
+        database.configure_engines(settings)
+        report = {"event": "startup", "warmup": settings.startup_warmup}
+        if settings.startup_warmup:
+            report.update(await warm_up(app))
+        report["startup_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        app.state.startup = report
+        logger.info(json.dumps(report))
+        yield
+        await database.dispose_engines()
+
+    # Corpo JSON gerado pelo encoder do pydantic-core em vez do módulo json
+    app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+    app.state.settings = settings
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Content-Disposition"],
+    )
+
+    # Contagem de comandos SQL por requisição (cabeçalho Server-Timing e log app.db.queries)
+    instrument_queries()
+    app.add_middleware(
+        QueryStatsMiddleware,
+        budget=settings.db_query_budget,
+        strict=settings.db_query_budget_strict,
+        repeat_threshold=settings.db_query_repeat_threshold,
+    )
+
+    # Latência, tamanhos e status por rota, expostos em /metrics
+    app.add_middleware(MetricsMiddleware, metrics=metrics.request_metrics)
+
+    # Antes do router principal: /agendamentos/export não pode ser capturado por /agendamentos/{agendamento_id}
+    app.include_router(exports.router, prefix="/api")
+    app.include_router(endpoints.router, prefix="/api")
+    app.include_router(metrics.router)
+
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to FastAPI!"}
 
-app.include_router(endpoints.router, prefix="/api")
+    return app
 
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to FastAPI!"}
\ No newline at end of file
+# uvicorn app.main:app (ou uvicorn --factory app.main:create_app)
+app = create_app()
@@ -3,9 +3,10 @@ Database models for the application.
 
 This file defines the SQLAlchemy models for all tables in the database.
 """
-from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, Numeric, UniqueConstraint, Table
-from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, Numeric, UniqueConstraint, Table, Index
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import deferred, relationship
+from datetime import datetime, timedelta
 from app.core.database import Base
 
 # Tabela de associação para o relacionamento muitos-para-muitos entre Perfil e Permissao
@@ -36,7 +37,7 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     perfil_id = Column(Integer, ForeignKey("perfis.id"))
     is_active = Column(Boolean, default=True)
-    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True)
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True, index=True)
 
     perfil = relationship("Perfil")
     clinica = relationship("Clinica", back_populates="users")
@@ -91,7 +92,7 @@ class Paciente(Base):
     telefone = Column(String, default="")
     endereco = Column(Text, default="")
     responsavel_legal = Column(String, default="")
-    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True)
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True, index=True)
 
     plano = relationship("Plano")
     clinica = relationship("Clinica")
@@ -121,7 +122,7 @@ class Convenio(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, unique=True, nullable=False)
-    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True)
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True, index=True)
 
     clinica = relationship("Clinica", back_populates="convenios")
     planos = relationship("Plano", back_populates="convenio")
@@ -162,34 +163,35 @@ class Prontuario(Base):
     __tablename__ = "prontuarios"
 
     id = Column(Integer, primary_key=True, index=True)
-    paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
+    paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False, index=True)
     tipo_tratamento_definido_id = Column(Integer, ForeignKey("tipos_tratamento.id"), nullable=True)
     data_criacao = Column(DateTime, default=datetime.utcnow)
     editavel = Column(Boolean, default=True)
     is_finalized = Column(Boolean, default=False)
 
-    queixa_principal = Column(Text, default="")
-    historia_doenca_atual = Column(Text, default="")
-    antecedentes_pessoais_familiares = Column(Text, default="")
-    habitos_vida = Column(Text, default="")
-    uso_medicamentos = Column(Text, default="")
-    alergias_conhecidas = Column(Text, default="")
+    # Conteúdo clínico: fora do SELECT padrão, carregado só no detalhe (undefer_group("conteudo"))
+    queixa_principal = deferred(Column(Text, default=""), group="conteudo")
+    historia_doenca_atual = deferred(Column(Text, default=""), group="conteudo")
+    antecedentes_pessoais_familiares = deferred(Column(Text, default=""), group="conteudo")
+    habitos_vida = deferred(Column(Text, default=""), group="conteudo")
+    uso_medicamentos = deferred(Column(Text, default=""), group="conteudo")
+    alergias_conhecidas = deferred(Column(Text, default=""), group="conteudo")
 
-    sinais_vitais = Column(Text, default="")
-    exame_fisico_geral_segmentar = Column(Text, default="")
-    avaliacoes_especificas = Column(Text, default="")
+    sinais_vitais = deferred(Column(Text, default=""), group="conteudo")
+    exame_fisico_geral_segmentar = deferred(Column(Text, default=""), group="conteudo")
+    avaliacoes_especificas = deferred(Column(Text, default=""), group="conteudo")
 
-    hipoteses_diagnosticas = Column(Text, default="")
-    exames_complementares = Column(Text, default="")
-    conclusao_diagnostica = Column(Text, default="")
+    hipoteses_diagnosticas = deferred(Column(Text, default=""), group="conteudo")
+    exames_complementares = deferred(Column(Text, default=""), group="conteudo")
+    conclusao_diagnostica = deferred(Column(Text, default=""), group="conteudo")
 
-    prescricoes = Column(Text, default="")
-    encaminhamentos = Column(Text, default="")
-    procedimentos_realizados = Column(Text, default="")
-    orientacoes_paciente = Column(Text, default="")
-    plano_tratamento_acompanhamento = Column(Text, default="")
+    prescricoes = deferred(Column(Text, default=""), group="conteudo")
+    encaminhamentos = deferred(Column(Text, default=""), group="conteudo")
+    procedimentos_realizados = deferred(Column(Text, default=""), group="conteudo")
+    orientacoes_paciente = deferred(Column(Text, default=""), group="conteudo")
+    plano_tratamento_acompanhamento = deferred(Column(Text, default=""), group="conteudo")
 
-    evolucao_clinica = Column(Text, default="")
+    evolucao_clinica = deferred(Column(Text, default=""), group="conteudo")
 
     termo_consentimento = Column(String, default="") # Storing path to file
     fichas_avaliacao_especifica = Column(String, default="") # Storing path to file
@@ -210,24 +212,41 @@ class Agendamento(Base):
     paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
     profissional_id = Column(Integer, ForeignKey("profissionais.id"), nullable=True)
     data = Column(DateTime, nullable=False)
+    # Fim do horário reservado (data + duração do atendimento), usado na detecção de conflitos
+    data_fim = Column(DateTime, nullable=True)
     status = Column(String, default="AGENDADO") # AGENDADO, CONCLUIDO, CANCELADO
     guiche_numero = Column(Integer, nullable=True)
+    # Desnormalizado de paciente.clinica_id (ver listeners no fim do arquivo)
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True)
 
     paciente = relationship("Paciente", back_populates="agendamentos")
     profissional = relationship("Profissional", back_populates="agendamentos")
     atendimento = relationship("Atendimento", back_populates="agendamento", uselist=False)
 
+    __table_args__ = (
+        # listagem por clínica paginada por (data, id), agenda do profissional e histórico do paciente
+        Index("ix_agendamentos_clinica_id_data", "clinica_id", "data", "id"),
+        # filtro start/end sem clínica (superusuário)
+        Index("ix_agendamentos_data", "data", "id"),
+        Index("ix_agendamentos_profissional_id_data", "profissional_id", "data"),
+        Index("ix_agendamentos_paciente_id_data", "paciente_id", "data"),
+        # ocupação do guichê (guiche_numero é por clínica)
+        Index("ix_agendamentos_clinica_id_guiche_numero_data", "clinica_id", "guiche_numero", "data"),
+    )
+
 class Atendimento(Base):
     __tablename__ = "atendimentos"
 
     id = Column(Integer, primary_key=True, index=True)
-    agendamento_id = Column(Integer, ForeignKey("agendamentos.id"), nullable=False)
+    agendamento_id = Column(Integer, ForeignKey("agendamentos.id"), nullable=False, index=True)
     observacoes = Column(Text, default="")
     data_inicio = Column(DateTime, default=datetime.utcnow)
     data_fim = Column(DateTime, nullable=True)
     status = Column(String, default="INICIADO") # INICIADO, FINALIZADO
     tipo_tratamento_realizado_id = Column(Integer, ForeignKey("tipos_tratamento.id"), nullable=True)
     prontuario_id = Column(Integer, ForeignKey("prontuarios.id"), nullable=True)
+    # Desnormalizado de agendamento.clinica_id
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True, index=True)
 
     agendamento = relationship("Agendamento", back_populates="atendimento")
     tipo_tratamento_realizado = relationship("TipoTratamento", back_populates="atendimentos")
@@ -236,12 +255,17 @@ class Atendimento(Base):
     comissoes = relationship("Comissao", back_populates="atendimento")
     faturas = relationship("Fatura", secondary="fatura_atendimentos", back_populates="atendimentos")
 
+    __table_args__ = (
+        # exportação por clínica e período, em ordem de (data_inicio, id)
+        Index("ix_atendimentos_clinica_id_data_inicio", "clinica_id", "data_inicio", "id"),
+    )
+
 class PastaDocumento(Base):
     __tablename__ = "pastas_documento"
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
-    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=False)
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     clinica = relationship("Clinica", back_populates="pastas_documento")
@@ -251,7 +275,7 @@ class DocumentoArquivo(Base):
     __tablename__ = "documentos_arquivo"
 
     id = Column(Integer, primary_key=True, index=True)
-    pasta_id = Column(Integer, ForeignKey("pastas_documento.id"), nullable=False)
+    pasta_id = Column(Integer, ForeignKey("pastas_documento.id"), nullable=False, index=True)
     paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=True)
     arquivo = Column(String, nullable=False) # Storing path to file
     hash_arquivo = Column(String, nullable=False)
@@ -284,15 +308,22 @@ class LancamentoFinanceiro(Base):
     valor = Column(Numeric(10, 2), nullable=False)
     data_vencimento = Column(Date, nullable=False)
     data_pagamento = Column(Date, nullable=True)
-    atendimento_id = Column(Integer, ForeignKey("atendimentos.id"), nullable=True)
+    atendimento_id = Column(Integer, ForeignKey("atendimentos.id"), nullable=True, index=True)
+    # Desnormalizado de atendimento.clinica_id; lançamentos avulsos recebem a clínica de quem os criou
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True)
 
     atendimento = relationship("Atendimento", back_populates="lancamentos_financeiros")
 
+    __table_args__ = (
+        # listagem por clínica paginada por (data_vencimento, id)
+        Index("ix_lancamentos_financeiros_clinica_id_data_vencimento", "clinica_id", "data_vencimento", "id"),
+    )
+
 class Fatura(Base):
     __tablename__ = "faturas"
 
     id = Column(Integer, primary_key=True, index=True)
-    convenio_id = Column(Integer, ForeignKey("convenios.id"), nullable=False)
+    convenio_id = Column(Integer, ForeignKey("convenios.id"), nullable=False, index=True)
     mes_referencia = Column(Date, nullable=False)
     valor_total = Column(Numeric(10, 2), nullable=False)
     status = Column(String, default="ABERTA") # ABERTA, FECHADA, PAGA, GLOSADA
@@ -315,10 +346,12 @@ class Comissao(Base):
     __tablename__ = "comissoes"
 
     id = Column(Integer, primary_key=True, index=True)
-    profissional_id = Column(Integer, ForeignKey("profissionais.id"), nullable=False)
-    atendimento_id = Column(Integer, ForeignKey("atendimentos.id"), nullable=False)
+    profissional_id = Column(Integer, ForeignKey("profissionais.id"), nullable=False, index=True)
+    atendimento_id = Column(Integer, ForeignKey("atendimentos.id"), nullable=False, index=True)
     valor = Column(Numeric(10, 2), nullable=False)
     paga = Column(Boolean, default=False)
+    # Desnormalizado da clínica do usuário do profissional
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True, index=True)
 
     profissional = relationship("Profissional", back_populates="comissoes")
     atendimento = relationship("Atendimento", back_populates="comissoes")
@@ -338,6 +371,10 @@ class Lead(Base):
 
     clinica = relationship("Clinica", back_populates="leads")
 
+    __table_args__ = (
+        Index("ix_leads_clinica_id_status", "clinica_id", "status"),
+    )
+
 class CampanhaMarketing(Base):
     __tablename__ = "campanhas_marketing"
 
@@ -347,7 +384,7 @@ class CampanhaMarketing(Base):
     data_inicio = Column(Date, nullable=False)
     data_fim = Column(Date, nullable=True)
     descricao = Column(Text, default="")
-    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True)
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True, index=True)
 
     clinica = relationship("Clinica", back_populates="campanhas_marketing")
     cupons_desconto = relationship("CupomDesconto", back_populates="campanha")
@@ -356,7 +393,7 @@ class PesquisaSatisfacao(Base):
     __tablename__ = "pesquisas_satisfacao"
 
     id = Column(Integer, primary_key=True, index=True)
-    paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
+    paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False, index=True)
     data_pesquisa = Column(Date, default=datetime.utcnow)
     nota_nps = Column(Integer, nullable=False) # 0 to 10
     comentarios = Column(Text, default="")
@@ -374,7 +411,113 @@ class CupomDesconto(Base):
     data_validade = Column(Date, nullable=False)
     ativo = Column(Boolean, default=True)
     campanha_id = Column(Integer, ForeignKey("campanhas_marketing.id"), nullable=True)
-    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True)
+    clinica_id = Column(Integer, ForeignKey("clinicas.id"), nullable=True, index=True)
 
     campanha = relationship("CampanhaMarketing", back_populates="cupons_desconto")
     clinica = relationship("Clinica", back_populates="cupons_desconto")
+
+
+# Manutenção do clinica_id desnormalizado
+#
+# Agendamento, Atendimento, LancamentoFinanceiro e Comissao guardam o clinica_id da cadeia de que dependem, para
+# que o filtro por clínica seja um único predicado indexado em vez de joins em 3-4 tabelas. Os endpoints já
+# carregam o pai ao validar a clínica e preenchem o valor diretamente; os listeners abaixo cobrem as demais
+# escritas via ORM (scripts, mudança de pai) e propagam a alteração para os registros dependentes.
+
+def _clinica_do_pai(connection, model, parent_id):
+    if parent_id is None:
+        return None
+    if model is Agendamento:
+        query = select(Paciente.clinica_id).where(Paciente.id == parent_id)
+    elif model is Atendimento:
+        query = select(Agendamento.clinica_id).where(Agendamento.id == parent_id)
+    elif model is LancamentoFinanceiro:
+        query = select(Atendimento.clinica_id).where(Atendimento.id == parent_id)
+    else:
+        query = select(User.clinica_id).join(Profissional, Profissional.user_id == User.id).where(Profissional.id == parent_id)
+    return connection.scalar(query)
+
+# modelo -> atributo que aponta para o pai de quem herda o clinica_id
+_CLINICA_PARENT_FK = {
+    Agendamento: "paciente_id",
+    Atendimento: "agendamento_id",
+    LancamentoFinanceiro: "atendimento_id",
+    Comissao: "profissional_id",
+}
+
+def _propagar_clinica(connection, ids_agendamentos=None, ids_atendimentos=None, clinica_id=None):
+    # Descendo a cadeia agendamento -> atendimento -> lançamento
+    if ids_agendamentos is not None:
+        connection.execute(update(Atendimento).where(Atendimento.agendamento_id.in_(ids_agendamentos)).values(clinica_id=clinica_id))
+        ids_atendimentos = select(Atendimento.id).where(Atendimento.agendamento_id.in_(ids_agendamentos))
+    if ids_atendimentos is not None:
+        connection.execute(update(LancamentoFinanceiro).where(LancamentoFinanceiro.atendimento_id.in_(ids_atendimentos)).values(clinica_id=clinica_id))
+
+def _before_insert(mapper, connection, target):
+    if target.clinica_id is None:
+        target.clinica_id = _clinica_do_pai(connection, type(target), getattr(target, _CLINICA_PARENT_FK[type(target)]))
+
+def _before_update(mapper, connection, target):
+    fk = _CLINICA_PARENT_FK[type(target)]
+    parent_id = getattr(target, fk)
+    # Lançamento desvinculado do atendimento mantém a clínica que já tinha
+    if inspect(target).attrs[fk].history.has_changes() and parent_id is not None:
+        target.clinica_id = _clinica_do_pai(connection, type(target), parent_id)
+
+for _model in _CLINICA_PARENT_FK:
+    event.listen(_model, "before_insert", _before_insert)
+    event.listen(_model, "before_update", _before_update)
+
+
+# Duração dos agendamentos
+#
+# Agendamento não tem tipo de tratamento associado, então a duração reservada é o tempo mínimo de atendimento da
+# clínica. O teto permite que a busca de conflitos delimite a varredura do índice por data (ver app/api/agenda.py).
+DURACAO_PADRAO_MINUTOS = 30
+DURACAO_MAXIMA_AGENDAMENTO = timedelta(hours=12)
+
+def duracao_agendamento(minutos):
+    return min(timedelta(minutes=minutos or DURACAO_PADRAO_MINUTOS), DURACAO_MAXIMA_AGENDAMENTO)
+
+@event.listens_for(Agendamento, "before_insert")
+def _agendamento_data_fim(mapper, connection, target):
+    # Registrado depois de _before_insert: o clinica_id já está preenchido
+    if target.data_fim is None and target.data is not None:
+        minutos = connection.scalar(select(Clinica.tempo_minimo_atendimento).where(Clinica.id == target.clinica_id)) if target.clinica_id else None
+        target.data_fim = target.data + duracao_agendamento(minutos)
+
+@event.listens_for(Agendamento, "before_update")
+def _agendamento_remarcado(mapper, connection, target):
+    # Remarcação sem data_fim explícito mantém a duração reservada
+    state = inspect(target)
+    data = state.attrs.data.history
+    if data.deleted and data.deleted[0] is not None and target.data_fim is not None and not state.attrs.data_fim.history.has_changes():
+        target.data_fim = target.data_fim + (target.data - data.deleted[0])
+
+@event.listens_for(Paciente, "after_update")
+def _paciente_clinica_alterada(mapper, connection, target):
+    if inspect(target).attrs.clinica_id.history.has_changes():
+        connection.execute(update(Agendamento).where(Agendamento.paciente_id == target.id).values(clinica_id=target.clinica_id))
+        _propagar_clinica(connection, ids_agendamentos=select(Agendamento.id).where(Agendamento.paciente_id == target.id), clinica_id=target.clinica_id)
+
+@event.listens_for(Agendamento, "after_update")
+def _agendamento_clinica_alterada(mapper, connection, target):
+    if inspect(target).attrs.clinica_id.history.has_changes():
+        _propagar_clinica(connection, ids_agendamentos=[target.id], clinica_id=target.clinica_id)
+
+@event.listens_for(Atendimento, "after_update")
+def _atendimento_clinica_alterada(mapper, connection, target):
+    if inspect(target).attrs.clinica_id.history.has_changes():
+        _propagar_clinica(connection, ids_atendimentos=[target.id], clinica_id=target.clinica_id)
+
+@event.listens_for(User, "after_update")
+def _user_clinica_alterada(mapper, connection, target):
+    if inspect(target).attrs.clinica_id.history.has_changes():
+        profissionais = select(Profissional.id).where(Profissional.user_id == target.id)
+        connection.execute(update(Comissao).where(Comissao.profissional_id.in_(profissionais)).values(clinica_id=target.clinica_id))
+
+@event.listens_for(Profissional, "after_update")
+def _profissional_user_alterado(mapper, connection, target):
+    if inspect(target).attrs.user_id.history.has_changes():
+        clinica_id = connection.scalar(select(User.clinica_id).where(User.id == target.user_id))
+        connection.execute(update(Comissao).where(Comissao.profissional_id == target.id).values(clinica_id=clinica_id))
@@ -3,8 +3,8 @@ Pydantic schemas for the application.
 
 This file defines the Pydantic models for data validation and serialization.
 """
-from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import Any, Generic, List, Optional, TypeVar
 from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
@@ -22,8 +22,7 @@ class PermissaoUpdate(PermissaoBase):
 class PermissaoInDBBase(PermissaoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PerfilBase(BaseModel):
     nome: str
@@ -38,8 +37,7 @@ class PerfilInDBBase(PerfilBase):
     id: int
     permissoes: List[PermissaoInDBBase] = []
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserBase(BaseModel):
     username: str
@@ -64,8 +62,7 @@ class UserInDBBase(UserBase):
     last_login: Optional[datetime] = None
     perfil: PerfilInDBBase # Adicionado para carregar o objeto Perfil
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ClinicaBase(BaseModel):
     nome: str
@@ -83,8 +80,7 @@ class ClinicaUpdate(ClinicaBase):
 class ClinicaInDBBase(ClinicaBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PacienteBase(BaseModel):
     nome: str
@@ -105,11 +101,13 @@ class PacienteUpdate(PacienteBase):
     cpf: Optional[str] = None
     data_nascimento: Optional[date] = None
 
+class PacienteBatchUpdate(PacienteUpdate):
+    id: int
+
 class PacienteInDBBase(PacienteBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProfissionalBase(BaseModel):
     user_id: int
@@ -131,8 +129,7 @@ class ProfissionalUpdate(ProfissionalBase):
 class ProfissionalInDBBase(ProfissionalBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ConvenioBase(BaseModel):
     nome: str
@@ -147,8 +144,7 @@ class ConvenioUpdate(ConvenioBase):
 class ConvenioInDBBase(ConvenioBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PlanoBase(BaseModel):
     convenio_id: int
@@ -163,8 +159,7 @@ class PlanoUpdate(PlanoBase):
 class PlanoInDBBase(PlanoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TipoTratamentoBase(BaseModel):
     clinica_id: int
@@ -182,8 +177,7 @@ class TipoTratamentoUpdate(TipoTratamentoBase):
 class TipoTratamentoInDBBase(TipoTratamentoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProntuarioBase(BaseModel):
     paciente_id: int
@@ -225,8 +219,20 @@ class ProntuarioInDBBase(ProntuarioBase):
     id: int
     data_criacao: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class ProntuarioResumo(BaseModel):
+    """Linha da listagem de prontuários: sem o conteúdo clínico, que só é carregado no detalhe."""
+    id: int
+    paciente_id: int
+    paciente_nome: str
+    data_criacao: datetime
+    tipo_tratamento_definido_id: Optional[int] = None
+    tipo_tratamento_nome: Optional[str] = None
+    editavel: Optional[bool] = True
+    is_finalized: Optional[bool] = False
+
+    model_config = ConfigDict(from_attributes=True)
 
 class AgendamentoStatusEnum(str, Enum):
     AGENDADO = "AGENDADO"
@@ -248,11 +254,67 @@ class AgendamentoUpdate(AgendamentoBase):
     data: Optional[datetime] = None
     status: Optional[AgendamentoStatusEnum] = None
 
+class AgendamentoBatchUpdate(AgendamentoUpdate):
+    id: int
+
+class RecorrenciaFrequenciaEnum(str, Enum):
+    DIARIA = "DIARIA"
+    SEMANAL = "SEMANAL"
+
+# Séries de agendamentos (terapias semanais etc.): até 104 ocorrências, com no máximo 52 dias/semanas entre elas
+RECORRENCIA_MAXIMA = 104
+RECORRENCIA_INTERVALO_MAXIMO = 52
+
+class AgendamentoRecorrenteCreate(AgendamentoBase):
+    """Série de agendamentos a partir de `data`, a cada `intervalo` dias/semanas, até `ocorrencias` e/ou `ate`."""
+    frequencia: RecorrenciaFrequenciaEnum = RecorrenciaFrequenciaEnum.SEMANAL
+    intervalo: int = Field(default=1, ge=1, le=RECORRENCIA_INTERVALO_MAXIMO)
+    ocorrencias: Optional[int] = Field(default=None, ge=1, le=RECORRENCIA_MAXIMA)
+    ate: Optional[date] = None
+
 class AgendamentoInDBBase(AgendamentoBase):
     id: int
+    data_fim: Optional[datetime] = None
+    clinica_id: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class AgendamentoConflito(BaseModel):
+    """Agendamento que ocupa o mesmo horário do profissional ou do guichê (corpo da resposta 409)."""
+    id: int
+    data: datetime
+    data_fim: Optional[datetime] = None
+    profissional_id: Optional[int] = None
+    guiche_numero: Optional[int] = None
+    motivos: List[str]
+
+class GuicheAlocado(BaseModel):
+    id: int
+    guiche_numero: int
+
+class RebalanceamentoGuiches(BaseModel):
+    """Resultado da redistribuição dos guichês de um dia."""
+    alocacao: List[GuicheAlocado]
+    alterados: int
+    # agendamentos além da capacidade de guichês no horário; ficam sem guichê
+    sem_guiche: List[int]
+
+class HorarioLivre(BaseModel):
+    """Horário em que o profissional pode receber um novo agendamento."""
+    profissional_id: int
+    inicio: datetime
+    fim: datetime
 
-    class Config:
-        orm_mode = True
+class AgendaProfissionalItem(BaseModel):
+    """Linha da agenda do profissional logado: agendamento com nome do paciente e status do atendimento."""
+    id: int
+    data: datetime
+    status: str
+    guiche_numero: Optional[int] = None
+    paciente_id: int
+    paciente_nome: str
+    atendimento_id: Optional[int] = None
+    atendimento_status: Optional[str] = None
 
 class AtendimentoStatusEnum(str, Enum):
     INICIADO = "INICIADO"
@@ -275,9 +337,9 @@ class AtendimentoUpdate(AtendimentoBase):
 class AtendimentoInDBBase(AtendimentoBase):
     id: int
     data_inicio: datetime
+    clinica_id: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PastaDocumentoBase(BaseModel):
     nome: str
@@ -293,8 +355,7 @@ class PastaDocumentoInDBBase(PastaDocumentoBase):
     id: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DocumentoArquivoBase(BaseModel):
     pasta_id: int
@@ -312,8 +373,7 @@ class DocumentoArquivoInDBBase(DocumentoArquivoBase):
     id: int
     uploaded_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TabelaPrecosBase(BaseModel):
     tratamento_id: int
@@ -329,8 +389,7 @@ class TabelaPrecosUpdate(TabelaPrecosBase):
 class TabelaPrecosInDBBase(TabelaPrecosBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class LancamentoFinanceiroTipoEnum(str, Enum):
     RECEITA = "RECEITA"
@@ -353,11 +412,14 @@ class LancamentoFinanceiroUpdate(LancamentoFinanceiroBase):
     valor: Optional[Decimal] = Field(default=None, decimal_places=2, max_digits=10)
     data_vencimento: Optional[date] = None
 
+class LancamentoFinanceiroBatchUpdate(LancamentoFinanceiroUpdate):
+    id: int
+
 class LancamentoFinanceiroInDBBase(LancamentoFinanceiroBase):
     id: int
+    clinica_id: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class FaturaStatusEnum(str, Enum):
     ABERTA = "ABERTA"
@@ -380,8 +442,7 @@ class FaturaUpdate(FaturaBase):
 class FaturaInDBBase(FaturaBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ComissaoBase(BaseModel):
     profissional_id: int
@@ -397,9 +458,9 @@ class ComissaoUpdate(ComissaoBase):
 
 class ComissaoInDBBase(ComissaoBase):
     id: int
+    clinica_id: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class LeadStatusEnum(str, Enum):
     NOVO = "NOVO"
@@ -422,13 +483,15 @@ class LeadCreate(LeadBase):
 class LeadUpdate(LeadBase):
     pass
 
+class LeadBatchUpdate(LeadUpdate):
+    id: int
+
 class LeadInDBBase(LeadBase):
     id: int
     data_criacao: datetime
     data_atualizacao: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class CampanhaMarketingTipoEnum(str, Enum):
     SMS = "SMS"
@@ -453,8 +516,7 @@ class CampanhaMarketingUpdate(CampanhaMarketingBase):
 class CampanhaMarketingInDBBase(CampanhaMarketingBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PesquisaSatisfacaoBase(BaseModel):
     paciente_id: int
@@ -472,8 +534,7 @@ class PesquisaSatisfacaoInDBBase(PesquisaSatisfacaoBase):
     id: int
     data_pesquisa: date
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class CupomDescontoBase(BaseModel):
     codigo: str
@@ -492,8 +553,7 @@ class CupomDescontoUpdate(CupomDescontoBase):
 class CupomDescontoInDBBase(CupomDescontoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Schemas for relationships (read-only, nested)
 class Clinica(ClinicaInDBBase):
@@ -594,6 +654,27 @@ class CupomDesconto(CupomDescontoInDBBase):
     campanha: Optional[CampanhaMarketingInDBBase] = None
     clinica: Optional[ClinicaInDBBase] = None
 
+# Respostas dos endpoints /{recurso}/batch
+T = TypeVar("T")
+
+class BatchErro(BaseModel):
+    indice: int
+    status_code: int
+    detail: Any
+
+class BatchItem(BaseModel, Generic[T]):
+    indice: int
+    registro: T
+
+class BatchResultado(BaseModel, Generic[T]):
+    """Itens gravados e itens recusados de um lote, identificados pela posição no corpo da requisição."""
+    itens: List[BatchItem[T]]
+    erros: List[BatchErro]
+
+class ExportFormatoEnum(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
 class Token(BaseModel):
     access_token: str
     token_type: str
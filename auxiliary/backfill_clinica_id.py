@@ -0,0 +1,47 @@
+"""
+Backfill do clinica_id desnormalizado.
+
+Recalcula, em lotes, o clinica_id de agendamentos, atendimentos, lançamentos financeiros e comissões a partir da
+cadeia de que cada um depende. A migration 3f9a2c1d8e47 já faz o backfill inicial; este script serve para bases
+grandes (lotes curtos evitam travar as tabelas) e para corrigir divergências criadas por escritas fora do ORM.
+
+Uso: python -m auxiliary.backfill_clinica_id [--batch-size 5000]
+"""
+import argparse
+
+from sqlalchemy import func, select, update
+
+from app.core.database import engine
+from app.models import Agendamento, Atendimento, Comissao, LancamentoFinanceiro, Paciente, Profissional, User
+
+# (modelo, clinica_id esperado como subquery correlacionada) na ordem pai -> filho
+TARGETS = [
+    (Agendamento, select(Paciente.clinica_id).where(Paciente.id == Agendamento.paciente_id).scalar_subquery()),
+    (Atendimento, select(Agendamento.clinica_id).where(Agendamento.id == Atendimento.agendamento_id).scalar_subquery()),
+    (LancamentoFinanceiro, select(Atendimento.clinica_id).where(Atendimento.id == LancamentoFinanceiro.atendimento_id).scalar_subquery()),
+    (Comissao, select(User.clinica_id).join(Profissional, Profissional.user_id == User.id).where(Profissional.id == Comissao.profissional_id).scalar_subquery()),
+]
+
+def backfill(batch_size: int = 5000) -> None:
+    for model, expected in TARGETS:
+        query = update(model)
+        if model is LancamentoFinanceiro:
+            # Lançamentos avulsos não têm de onde herdar a clínica
+            query = query.where(LancamentoFinanceiro.atendimento_id.isnot(None))
+        with engine.connect() as conn:
+            max_id = conn.scalar(select(func.max(model.id))) or 0
+        total = 0
+        for start in range(0, max_id, batch_size):
+            with engine.begin() as conn:
+                result = conn.execute(
+                    query.where(model.id > start, model.id <= start + batch_size)
+                    .where(model.clinica_id.is_distinct_from(expected))
+                    .values(clinica_id=expected)
+                )
+                total += result.rowcount
+        print(f"{model.__tablename__}: {total} registros atualizados")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    backfill(parser.parse_args().batch_size)
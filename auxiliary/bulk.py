@@ -0,0 +1,101 @@
+"""
+Bulk row loading.
+
+This file writes generated rows straight into a table: through `COPY ... FROM STDIN` on PostgreSQL and through batched
+`executemany` INSERTs on other databases (SQLite in the tests). Rows are tuples in the order of the given columns and
+are consumed lazily, so generators with millions of rows never sit in memory. Callers assign the ids themselves
+(`next_ids`) to know the foreign keys without reading anything back, and fix the sequences afterwards
+(`reset_sequences`).
+"""
+import csv
+import io
+from itertools import islice
+from typing import Dict, Iterable, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app import models
+
+NULL = "\\N"
+
+class CsvStream:
+    """
+    Arquivo somente leitura com o CSV das linhas, gerado sob demanda para o COPY ... FROM STDIN.
+
+    O psycopg2 lê em blocos de `size` caracteres; as linhas são convertidas em lotes e cada leitura só copia o bloco
+    pedido. None vira o marcador NULL do COPY, para não se confundir com texto vazio.
+    """
+
+    def __init__(self, rows: Iterable[tuple], lote: int = 5_000):
+        self._rows = iter(rows)
+        self._lote = lote
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pendente = ""
+        self._posicao = 0
+        self.count = 0
+
+    def _preencher(self) -> bool:
+        linhas = list(islice(self._rows, self._lote))
+        if not linhas:
+            return False
+        self._writer.writerows(tuple(NULL if valor is None else valor for valor in linha) for linha in linhas)
+        self.count += len(linhas)
+        self._pendente = self._pendente[self._posicao:] + self._buffer.getvalue()
+        self._posicao = 0
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return True
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            while self._preencher():
+                pass
+            size = len(self._pendente) - self._posicao
+        while len(self._pendente) - self._posicao < size and self._preencher():
+            pass
+        bloco = self._pendente[self._posicao:self._posicao + size]
+        self._posicao += len(bloco)
+        return bloco
+
+    readline = read
+
+def write_rows(conn: Connection, table: str, columns: Sequence[str], rows: Iterable[tuple], batch_size: int = 10_000) -> int:
+    """Grava as linhas em `table` e retorna quantas foram gravadas. Colunas omitidas não recebem os defaults do ORM."""
+    if conn.dialect.name == "postgresql":
+        stream = CsvStream(rows)
+        cursor = conn.connection.dbapi_connection.cursor()
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')", stream, size=1 << 16)
+        return stream.count
+
+    # Fallback (SQLite): executemany em lotes, com a tabela do metadata para converter Decimal/datas
+    insert = models.Base.metadata.tables[table].insert()
+    rows, total = iter(rows), 0
+    while lote := list(islice(rows, batch_size)):
+        conn.execute(insert, [dict(zip(columns, linha)) for linha in lote])
+        total += len(lote)
+    return total
+
+def disable_statement_timeout(conn: Connection) -> None:
+    """O statement_timeout das conexões da aplicação (DB_STATEMENT_TIMEOUT_MS) interromperia cargas grandes."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+
+def next_ids(conn: Connection, tables: Iterable[str]) -> Dict[str, int]:
+    """Primeiro id livre de cada tabela."""
+    return {table: conn.scalar(text(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")) for table in tables}
+
+def reset_sequences(conn: Connection, tables: Iterable[str]) -> None:
+    """Após gravar ids explícitos, faz as sequências do PostgreSQL continuarem depois deles."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+
+def analyze(engine: Engine, tables: Sequence[str]) -> None:
+    """Atualiza as estatísticas do planejador depois da carga."""
+    if not tables:
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ANALYZE {', '.join(tables)}" if conn.dialect.name == "postgresql" else "ANALYZE"))
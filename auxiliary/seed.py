@@ -0,0 +1,310 @@
+"""
+Seed de clínicas, equipe e pacientes.
+
+Substitui populate_clinics_and_services.py e populate_users_and_patients.py. As linhas são geradas sob demanda e
+gravadas em massa por `auxiliary.bulk` (COPY no PostgreSQL, executemany em lotes no SQLite), em uma transação por
+comando, e todos os usuários criados compartilham um único hash de senha calculado no início. Os comandos são
+idempotentes: rodar de novo só completa o que falta. Os ids são atribuídos pelo script, então não rode dois seeds ao
+mesmo tempo no mesmo banco.
+
+Uso:
+    python -m auxiliary.seed catalogo
+    python -m auxiliary.seed equipe --atendentes 1 --profissionais 1 --pacientes 5
+    python -m auxiliary.seed equipe --profissionais 20 --pacientes 100000 --senha staging123
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+from app.core.database import engine
+from app.core.security import get_password_hash
+from app.models import Clinica, Paciente, Perfil, TipoTratamento, User
+from auxiliary import bulk
+
+# Domínio reservado: marca os registros do seed (e permite contá-los para completar só o que falta)
+DOMINIO = "seed.invalid"
+
+# (nome, endereço, telefone, guichês, tempo mínimo de atendimento, serviços)
+CATALOGO = [
+    ("Clínica Odontológica", "Rua dos Dentistas, 100", "11987654321", 5, 30, [
+        "Ortodontia (aparelhos)",
+        "Implantodontia (implantes)",
+        "Odontopediatria",
+        "Endodontia (canal)",
+        "Periodontia (gengiva)",
+        "Cirurgia oral",
+        "Prótese dentária",
+        "Estética dental (clareamento, lentes de contato)",
+        "Odontologia digital (scanner intraoral, planejamento 3D)",
+    ]),
+    ("Clínica Oftalmológica", "Avenida da Visão, 200", "11987654322", 3, 45, [
+        "Exame de vista completo (refração)",
+        "Mapeamento de retina",
+        "Cirurgia de catarata e miopia",
+        "Tratamento de glaucoma",
+        "Adaptação de lentes de contato",
+        "Cirurgia refrativa a laser",
+        "Teste do olhinho (pediátrico)",
+    ]),
+    ("Clínica de Fisioterapia", "Rua da Reabilitação, 300", "11987654323", 4, 60, [
+        "Reabilitação ortopédica, neurológica e respiratória",
+        "Fisioterapia esportiva",
+        "RPG (Reeducação Postural Global)",
+        "Pilates terapêutico",
+        "Eletroterapia",
+        "Terapias manuais e de liberação miofascial",
+        "Reabilitação pós-operatória",
+    ]),
+    ("Clínica de Psicologia e Psicoterapia", "Travessa da Mente, 400", "11987654324", 2, 50, [
+        "Psicoterapia individual, infantil, casal ou familiar",
+        "Avaliação psicológica e laudos",
+        "Terapia cognitivo-comportamental (TCC)",
+        "Terapia sistêmica",
+        "Psicopedagogia clínica",
+        "Acompanhamento emocional para luto, ansiedade, depressão",
+        "Orientação vocacional",
+    ]),
+    ("Clínica Psiquiátrica", "Alameda do Equilíbrio, 500", "11987654325", 2, 60, [
+        "Consulta psiquiátrica",
+        "Prescrição e monitoramento de psicofármacos",
+        "Internação voluntária ou involuntária",
+        "Tratamento para dependência química",
+        "Tratamento para transtornos como bipolaridade, esquizofrenia, TOC, etc.",
+    ]),
+    ("Clínica de Estética e Dermatologia Estética", "Rua da Beleza, 600", "11987654326", 3, 60, [
+        "Limpeza de pele profunda",
+        "Peeling químico e mecânico",
+        "Microagulhamento",
+        "Preenchimentos com ácido hialurônico",
+        "Botox (toxina botulínica)",
+        "Depilação a laser",
+        "Procedimentos corporais (radiofrequência, criolipólise, drenagem linfática)",
+        "Tratamentos capilares (queda, crescimento, laser)",
+    ]),
+    ("Clínica de Nutrição e Nutrologia", "Avenida da Alimentação, 700", "11987654327", 2, 45, [
+        "Avaliação nutricional com bioimpedância",
+        "Planejamento alimentar personalizado",
+        "Dietas para emagrecimento, hipertrofia, doenças crônicas",
+        "Suplementação nutricional",
+        "Nutrição esportiva",
+        "Nutrição funcional",
+        "Atendimento para transtornos alimentares",
+    ]),
+    ("Clínica de Fonoaudiologia", "Rua da Voz, 800", "11987654328", 2, 40, [
+        "Avaliação e terapia da fala, linguagem e voz",
+        "Distúrbios de aprendizagem",
+        "Terapia para dislexia, gagueira, apraxia",
+        "Reabilitação auditiva",
+        "Adaptação de aparelhos auditivos",
+        "Intervenção em autismo e TEA",
+    ]),
+    ("Clínica de Reprodução Humana", "Alameda da Vida, 900", "11987654329", 3, 60, [
+        "Fertilização in vitro (FIV)",
+        "Inseminação artificial",
+        "Congelamento de óvulos, sêmen e embriões",
+        "Doação de gametas",
+        "Diagnóstico genético pré-implantacional",
+        "Tratamento de infertilidade feminina e masculina",
+    ]),
+    ("Clínica de Diagnóstico por Imagem", "Rua do Raio-X, 1000", "11987654330", 4, 20, [
+        "Ultrassonografia (geral, obstétrica, doppler)",
+        "Ressonância magnética",
+        "Tomografia computadorizada",
+        "Mamografia",
+        "Densitometria óssea",
+        "Raio-X digital",
+        "Biópsias guiadas por imagem",
+    ]),
+    ("Clínica de Análises Clínicas", "Avenida do Laboratório, 1100", "11987654331", 3, 15, [
+        "Coleta de sangue e outros fluidos",
+        "Hemograma completo, exames hormonais, glicemia, colesterol etc.",
+        "Exames toxicológicos e de DNA",
+        "Testes para ISTs e doenças infecciosas",
+        "Painéis genéticos e exames de intolerância alimentar",
+    ]),
+    ("Clínica de Alergia e Imunologia", "Rua da Imunidade, 1200", "11987654332", 2, 30, [
+        "Testes alérgicos (cutâneo, IgE)",
+        "Tratamento de rinite, asma, urticária, dermatite",
+        "Vacinas para alergia (imunoterapia)",
+        "Avaliação imunológica",
+        "Acompanhamento de imunodeficiências",
+    ]),
+    ("Clínica de Geriatria e Cuidados Paliativos", "Travessa da Longevidade, 1300", "11987654333", 2, 60, [
+        "Avaliação multidisciplinar do idoso",
+        "Controle de doenças crônicas",
+        "Cuidados paliativos e dor crônica",
+        "Reabilitação geriátrica",
+        "Atendimento domiciliar",
+    ]),
+    ("Clínica de Reabilitação Química (Dependência)", "Alameda da Recuperação, 1400", "11987654334", 1, 90, [
+        "Desintoxicação supervisionada",
+        "Terapia comportamental e em grupo",
+        "Internação e acompanhamento 24h",
+        "Apoio psicossocial",
+        "Reintegração familiar",
+    ]),
+    ("Clínica de Medicina do Trabalho", "Rua da Ocupação, 1500", "11987654335", 3, 20, [
+        "Exames admissionais, periódicos, demissionais",
+        "Laudos de saúde ocupacional (ASO)",
+        "Programas de controle médico e saúde ocupacional (PCMSO)",
+        "Perícias e atestados",
+        "Consultas para retorno ao trabalho e aptidão",
+    ]),
+    ("Clínica de Medicina Esportiva", "Avenida do Atleta, 1600", "11987654336", 2, 45, [
+        "Avaliação física e funcional",
+        "Prescrição de treinos personalizados",
+        "Prevenção e tratamento de lesões esportivas",
+        "Nutrição esportiva",
+        "Reabilitação ortopédica e performance",
+    ]),
+    ("Clínica de Podologia", "Rua dos Pés, 1700", "11987654337", 1, 30, [
+        "Tratamento de unhas encravadas",
+        "Calosidades e rachaduras",
+        "Podologia geriátrica e diabética",
+        "Avaliação postural e da pisada",
+    ]),
+    ("Clínica de Dor (Algologia)", "Praça do Alívio, 1800", "11987654338", 2, 60, [
+        "Diagnóstico e tratamento de dor crônica",
+        "Bloqueios anestésicos",
+        "Tratamentos com medicamentos ou intervenções minimamente invasivas",
+        "Cuidados multidisciplinares para fibromialgia, enxaqueca, dores lombares",
+    ]),
+]
+
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João", "Larissa",
+         "Lucas", "Mariana", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago", "Vitória"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+              "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa"]
+LOGRADOUROS = ["Rua das Flores", "Avenida Paulista", "Rua XV de Novembro", "Rua da Consolação", "Avenida Brasil",
+               "Rua Augusta", "Alameda Santos", "Rua Direita"]
+
+CLINICAS = ("id", "nome", "endereco", "telefone", "num_guiches", "tempo_minimo_atendimento")
+TIPOS_TRATAMENTO = ("id", "clinica_id", "nome", "descricao", "tempo_minimo_atendimento")
+USERS = ("id", "username", "email", "hashed_password", "perfil_id", "is_active", "clinica_id", "first_name", "last_name",
+         "date_joined", "last_login", "is_superuser", "is_staff")
+PROFISSIONAIS = ("id", "user_id", "especialidade", "conselho_profissional", "numero_conselho", "carga_horaria_semanal", "comissao_percentual")
+PACIENTES = ("id", "nome", "cpf", "rg", "data_nascimento", "email", "telefone", "endereco", "responsavel_legal", "clinica_id")
+
+def seed_catalogo(conn: Connection) -> Dict[str, int]:
+    """Clínicas do CATALOGO e seus serviços (tipos de tratamento) que ainda não existem."""
+    clinicas = dict(conn.execute(select(Clinica.nome, Clinica.id)).all())
+    ids = bulk.next_ids(conn, ["clinicas", "tipos_tratamento"])
+    novas = []
+    for nome, endereco, telefone, num_guiches, minutos, _ in CATALOGO:
+        if nome not in clinicas:
+            clinicas[nome] = ids["clinicas"] + len(novas)
+            novas.append((clinicas[nome], nome, endereco, telefone, num_guiches, minutos))
+    existentes = set(conn.execute(select(TipoTratamento.clinica_id, TipoTratamento.nome)).all())
+
+    def servicos() -> Iterator[tuple]:
+        tipo_id = ids["tipos_tratamento"]
+        for nome, _, _, _, minutos, lista in CATALOGO:
+            for servico in lista:
+                if (clinicas[nome], servico) not in existentes:
+                    yield (tipo_id, clinicas[nome], servico, f"Serviço de {servico} oferecido pela {nome}", minutos)
+                    tipo_id += 1
+
+    return {
+        "clinicas": bulk.write_rows(conn, "clinicas", CLINICAS, novas),
+        "tipos_tratamento": bulk.write_rows(conn, "tipos_tratamento", TIPOS_TRATAMENTO, servicos()),
+    }
+
+def username(papel: str, clinica_id: int, indice: int) -> str:
+    """atendente_<clínica>, prof_<clínica> (nomes dos scripts antigos) e, a partir do segundo, com sufixo _<n>."""
+    prefixo = {"ATENDENTE": "atendente", "PROFISSIONAL": "prof"}[papel]
+    return f"{prefixo}_{clinica_id}" if indice == 1 else f"{prefixo}_{clinica_id}_{indice}"
+
+def _paciente(rng: random.Random, paciente_id: int, clinica_id: int, hoje: date) -> tuple:
+    # CPF derivado do id (prefixo 8): único sem consultar o banco
+    cpf = f"{80_000_000_000 + paciente_id:011d}"
+    nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+    nascimento = hoje - timedelta(days=rng.randrange(18 * 365, 90 * 365))
+    return (paciente_id, nome, cpf, f"{rng.randrange(10 ** 8, 10 ** 9)}", nascimento, f"paciente{paciente_id}@{DOMINIO}",
+            f"119{rng.randrange(10 ** 7, 10 ** 8)}", f"{rng.choice(LOGRADOUROS)}, {rng.randrange(1, 3000)}", "", clinica_id)
+
+def seed_equipe(conn: Connection, hashed_password: str, atendentes: int = 1, profissionais: int = 1, pacientes: int = 5,
+                clinica_ids: Optional[Sequence[int]] = None, seed: int = 0) -> Dict[str, int]:
+    """
+    Completa, em cada clínica, `atendentes` e `profissionais` usuários e `pacientes` pacientes do seed.
+
+    Todos os usuários novos recebem `hashed_password`; os perfis ATENDENTE e PROFISSIONAL vêm de populate_permissions.py.
+    """
+    query = select(Clinica.id).order_by(Clinica.id)
+    if clinica_ids:
+        query = query.where(Clinica.id.in_(clinica_ids))
+    clinicas = list(conn.scalars(query))
+    perfis = dict(conn.execute(select(Perfil.nome, Perfil.id)).all())
+    especialidades = dict(conn.execute(select(TipoTratamento.clinica_id, func.min(TipoTratamento.nome)).group_by(TipoTratamento.clinica_id)).all())
+    usernames = set(conn.scalars(select(User.username).where(User.clinica_id.in_(clinicas))))
+    ids = bulk.next_ids(conn, ["users", "profissionais", "pacientes"])
+    rng = random.Random(seed)
+    agora = datetime.utcnow()
+
+    # Equipe: poucas linhas por clínica, montadas em memória para ligar profissional -> usuário
+    users, profs = [], []
+    for clinica_id in clinicas:
+        for papel, quantidade in (("ATENDENTE", atendentes), ("PROFISSIONAL", profissionais)):
+            for indice in range(1, quantidade + 1):
+                nome = username(papel, clinica_id, indice)
+                if nome in usernames:
+                    continue
+                user_id = ids["users"] + len(users)
+                users.append((user_id, nome, f"{nome}@{DOMINIO}", hashed_password, perfis.get(papel), True, clinica_id,
+                              rng.choice(NOMES), rng.choice(SOBRENOMES), agora, agora, False, False))
+                if papel == "PROFISSIONAL":
+                    profissional_id = ids["profissionais"] + len(profs)
+                    profs.append((profissional_id, user_id, especialidades.get(clinica_id, "Clínico Geral"), "CRM/SP",
+                                  f"{profissional_id:06d}", 40, Decimal("0.00")))
+
+    existentes = dict(conn.execute(
+        select(Paciente.clinica_id, func.count()).where(Paciente.email.like(f"%@{DOMINIO}")).group_by(Paciente.clinica_id)
+    ).all())
+
+    def gerar_pacientes() -> Iterator[tuple]:
+        paciente_id, hoje = ids["pacientes"], date.today()
+        for clinica_id in clinicas:
+            for _ in range(max(0, pacientes - existentes.get(clinica_id, 0))):
+                yield _paciente(rng, paciente_id, clinica_id, hoje)
+                paciente_id += 1
+
+    return {
+        "users": bulk.write_rows(conn, "users", USERS, users),
+        "profissionais": bulk.write_rows(conn, "profissionais", PROFISSIONAIS, profs),
+        "pacientes": bulk.write_rows(conn, "pacientes", PACIENTES, gerar_pacientes()),
+    }
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("catalogo", help="clínicas de exemplo e seus serviços")
+    equipe = comandos.add_parser("equipe", help="atendentes, profissionais e pacientes de cada clínica")
+    equipe.add_argument("--atendentes", type=int, default=1, help="atendentes por clínica")
+    equipe.add_argument("--profissionais", type=int, default=1, help="profissionais por clínica")
+    equipe.add_argument("--pacientes", type=int, default=5, help="pacientes por clínica")
+    equipe.add_argument("--clinica", type=int, action="append", dest="clinicas", help="restringe a estas clínicas (repetível)")
+    equipe.add_argument("--senha", default="seed123", help="senha de todos os usuários criados")
+    equipe.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    with engine.begin() as conn:
+        bulk.disable_statement_timeout(conn)
+        if args.comando == "catalogo":
+            totais = seed_catalogo(conn)
+        else:
+            # Um único bcrypt para todos os usuários sintéticos
+            totais = seed_equipe(conn, get_password_hash(args.senha), args.atendentes, args.profissionais, args.pacientes, args.clinicas, args.seed)
+        bulk.reset_sequences(conn, totais)
+    bulk.analyze(engine, [table for table, total in totais.items() if total])
+    for table, total in totais.items():
+        print(f"{table}: {total} registros inseridos")
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Benchmark and load-test tooling.
+
+This package generates a synthetic clinic dataset at configurable scale (`benchmarks.dataset`), drives a scripted load
+profile against a running API (`benchmarks.loadtest`) and summarizes/compares the latency percentiles of each run
+(`benchmarks.report`). `benchmarks.startup` and `benchmarks.serialization` measure worker cold start and response
+serialization. See benchmarks/README.md.
+"""
@@ -0,0 +1,264 @@
+"""
+Synthetic clinic dataset.
+
+This file generates clinics, users, profissionais, pacientes, agendamentos, atendimentos and lançamentos at a chosen
+scale and writes them with `auxiliary.bulk` (COPY on PostgreSQL). Rows are produced lazily with explicit ids, so
+millions of rows never sit in memory and foreign keys are known without reading anything back. The same seed always
+produces the same data, which keeps runs of the load test comparable between commits.
+
+    python -m benchmarks.dataset --escala grande
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from auxiliary import bulk
+
+# Todos os usuários sintéticos usam esta senha; o hash é calculado uma única vez
+SENHA = "benchmark"
+PERFIL = "BENCHMARK"
+# Principal.has_permission libera tudo com esta permissão, sem tornar o usuário superusuário (o escopo da clínica vale)
+PERMISSAO = "admin_acesso"
+
+EXPEDIENTE = (8, 18)
+
+@dataclass(frozen=True)
+class Escala:
+    clinicas: int
+    profissionais_por_clinica: int
+    atendentes_por_clinica: int
+    pacientes: int
+    agendamentos: int
+    # Primeiro dia da agenda (segunda-feira); a agenda ocupa dias úteis a partir dele
+    inicio: date = date(2025, 1, 6)
+    # Fração da agenda que já aconteceu: agendamentos passados viram atendimentos e lançamentos
+    passado: float = 0.7
+    duracao_minutos: int = 30
+    seed: int = 42
+
+ESCALAS = {
+    "pequena": Escala(clinicas=2, profissionais_por_clinica=5, atendentes_por_clinica=2, pacientes=2_000, agendamentos=20_000),
+    "media": Escala(clinicas=10, profissionais_por_clinica=10, atendentes_por_clinica=3, pacientes=50_000, agendamentos=500_000),
+    "grande": Escala(clinicas=50, profissionais_por_clinica=20, atendentes_por_clinica=5, pacientes=500_000, agendamentos=5_000_000),
+}
+
+def atendente_username(clinica: int, indice: int) -> str:
+    """Username do `indice`-ésimo atendente da `clinica`-ésima clínica (ambos a partir de 0)."""
+    return f"bench_c{clinica}_atendente{indice}"
+
+def profissional_username(clinica: int, indice: int) -> str:
+    return f"bench_c{clinica}_profissional{indice}"
+
+def _partes(total: int, n: int) -> List[int]:
+    """Divide `total` em `n` partes quase iguais."""
+    return [total // n + (1 if i < total % n else 0) for i in range(n)]
+
+def slots_por_dia(escala: Escala) -> int:
+    return (EXPEDIENTE[1] - EXPEDIENTE[0]) * 60 // escala.duracao_minutos
+
+def dias_da_agenda(escala: Escala) -> List[date]:
+    """Dias úteis necessários para caber a maior agenda por clínica."""
+    capacidade = slots_por_dia(escala) * escala.profissionais_por_clinica
+    total = -(-max(_partes(escala.agendamentos, escala.clinicas)) // capacidade)
+    dias, dia = [], escala.inicio
+    while len(dias) < total:
+        if dia.weekday() < 5:
+            dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+@dataclass(frozen=True)
+class Ids:
+    """Primeiro id livre de cada tabela; os dados gerados ocupam ids contíguos a partir dele."""
+    clinicas: int = 1
+    users: int = 1
+    profissionais: int = 1
+    pacientes: int = 1
+    agendamentos: int = 1
+    atendimentos: int = 1
+    lancamentos_financeiros: int = 1
+
+class Dataset:
+    """Geradores das linhas de cada tabela, na ordem das chaves estrangeiras."""
+
+    def __init__(self, escala: Escala, ids: Ids = Ids(), perfil_id: Optional[int] = None, hashed_password: str = ""):
+        self.escala = escala
+        self.ids = ids
+        self.perfil_id = perfil_id
+        self.hashed_password = hashed_password
+        self.pacientes_por_clinica = _partes(escala.pacientes, escala.clinicas)
+        self.agendamentos_por_clinica = _partes(escala.agendamentos, escala.clinicas)
+        self.dias = dias_da_agenda(escala)
+        self.corte = self.dias[int(len(self.dias) * escala.passado)] if self.dias else escala.inicio
+
+    def clinica_id(self, c: int) -> int:
+        return self.ids.clinicas + c
+
+    def primeiro_paciente(self, c: int) -> int:
+        return self.ids.pacientes + sum(self.pacientes_por_clinica[:c])
+
+    def profissional_id(self, c: int, p: int) -> int:
+        return self.ids.profissionais + c * self.escala.profissionais_por_clinica + p
+
+    def _user_id(self, c: int, indice: int) -> int:
+        # Por clínica: primeiro os usuários dos profissionais, depois os atendentes
+        por_clinica = self.escala.profissionais_por_clinica + self.escala.atendentes_por_clinica
+        return self.ids.users + c * por_clinica + indice
+
+    CLINICAS = ("id", "nome", "endereco", "telefone", "num_guiches", "tempo_minimo_atendimento")
+
+    def clinicas(self) -> Iterator[tuple]:
+        for c in range(self.escala.clinicas):
+            clinica_id = self.clinica_id(c)
+            # Um guichê por profissional: a agenda gerada nunca disputa guichê
+            yield (clinica_id, f"Clínica Benchmark {clinica_id}", f"Rua Sintética, {clinica_id}", "", self.escala.profissionais_por_clinica, self.escala.duracao_minutos)
+
+    USERS = ("id", "username", "email", "hashed_password", "perfil_id", "is_active", "clinica_id", "first_name", "last_name",
+             "date_joined", "last_login", "is_superuser", "is_staff")
+
+    def users(self) -> Iterator[tuple]:
+        agora = datetime.combine(self.escala.inicio, datetime.min.time())
+        for c in range(self.escala.clinicas):
+            nomes = [profissional_username(c, p) for p in range(self.escala.profissionais_por_clinica)]
+            nomes += [atendente_username(c, a) for a in range(self.escala.atendentes_por_clinica)]
+            for indice, username in enumerate(nomes):
+                yield (self._user_id(c, indice), username, f"{username}@bench.invalid", self.hashed_password, self.perfil_id, True,
+                       self.clinica_id(c), "", "", agora, agora, False, False)
+
+    PROFISSIONAIS = ("id", "user_id", "especialidade", "conselho_profissional", "numero_conselho", "carga_horaria_semanal", "comissao_percentual")
+
+    def profissionais(self) -> Iterator[tuple]:
+        for c in range(self.escala.clinicas):
+            for p in range(self.escala.profissionais_por_clinica):
+                profissional_id = self.profissional_id(c, p)
+                yield (profissional_id, self._user_id(c, p), "Clínico Geral", "CRM", f"B{profissional_id}", 50, Decimal("10.00"))
+
+    PACIENTES = ("id", "nome", "cpf", "rg", "data_nascimento", "email", "telefone", "endereco", "responsavel_legal", "clinica_id")
+
+    def pacientes(self) -> Iterator[tuple]:
+        rng = random.Random(self.escala.seed)
+        paciente_id = self.ids.pacientes
+        for c, quantidade in enumerate(self.pacientes_por_clinica):
+            for _ in range(quantidade):
+                # CPF derivado do id (prefixo 9 para não colidir com cadastros reais do ambiente)
+                cpf = f"{90_000_000_000 + paciente_id:011d}"
+                nascimento = date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 80))
+                yield (paciente_id, f"Paciente Sintético {paciente_id}", f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}", "", nascimento,
+                       f"paciente{paciente_id}@bench.invalid", "", "", "", self.clinica_id(c))
+                paciente_id += 1
+
+    AGENDAMENTOS = ("id", "paciente_id", "profissional_id", "data", "data_fim", "status", "guiche_numero", "clinica_id")
+
+    def agendamentos(self) -> Iterator[tuple]:
+        """Cada profissional atende em sequência, sem sobreposição, no seu guichê; o paciente é sorteado na clínica."""
+        duracao = timedelta(minutes=self.escala.duracao_minutos)
+        horarios = [datetime.combine(date.min, datetime.min.time()) + timedelta(hours=EXPEDIENTE[0]) + i * duracao for i in range(slots_por_dia(self.escala))]
+        agendamento_id = self.ids.agendamentos
+        for c, quantidade in enumerate(self.agendamentos_por_clinica):
+            rng = random.Random(self.escala.seed * 1_000 + c)
+            primeiro, pacientes = self.primeiro_paciente(c), self.pacientes_por_clinica[c]
+            gerados = 0
+            for dia in self.dias:
+                for horario in horarios:
+                    inicio = datetime.combine(dia, horario.time())
+                    for p in range(self.escala.profissionais_por_clinica):
+                        if gerados == quantidade:
+                            break
+                        sorteio = rng.random()
+                        if dia < self.corte:
+                            situacao = "CONCLUIDO" if sorteio < 0.85 else "CANCELADO" if sorteio < 0.95 else "AGENDADO"
+                        else:
+                            situacao = "CANCELADO" if sorteio < 0.05 else "AGENDADO"
+                        yield (agendamento_id, primeiro + rng.randrange(pacientes), self.profissional_id(c, p), inicio, inicio + duracao,
+                               situacao, p + 1, self.clinica_id(c))
+                        agendamento_id += 1
+                        gerados += 1
+
+    ATENDIMENTOS = ("id", "agendamento_id", "observacoes", "data_inicio", "data_fim", "status", "clinica_id")
+
+    def atendimentos(self) -> Iterator[tuple]:
+        # Regera a agenda (determinística) em vez de guardá-la: um atendimento por agendamento concluído
+        atendimento_id = self.ids.atendimentos
+        for agendamento in self.agendamentos():
+            if agendamento[5] == "CONCLUIDO":
+                yield (atendimento_id, agendamento[0], "", agendamento[3], agendamento[4], "FINALIZADO", agendamento[7])
+                atendimento_id += 1
+
+    LANCAMENTOS_FINANCEIROS = ("id", "tipo", "descricao", "valor", "data_vencimento", "data_pagamento", "atendimento_id", "clinica_id")
+
+    def lancamentos_financeiros(self) -> Iterator[tuple]:
+        rng = random.Random(self.escala.seed + 7)
+        lancamento_id = self.ids.lancamentos_financeiros
+        for atendimento in self.atendimentos():
+            vencimento = atendimento[3].date() + timedelta(days=30)
+            pagamento = vencimento - timedelta(days=rng.randrange(10)) if vencimento < self.corte else None
+            yield (lancamento_id, "RECEITA", "Consulta", Decimal(rng.randrange(8_000, 40_000)) / 100, vencimento, pagamento, atendimento[0], atendimento[6])
+            lancamento_id += 1
+
+    def tabelas(self) -> List[Tuple[str, Sequence[str], Callable[[], Iterator[tuple]]]]:
+        return [
+            ("clinicas", self.CLINICAS, self.clinicas),
+            ("users", self.USERS, self.users),
+            ("profissionais", self.PROFISSIONAIS, self.profissionais),
+            ("pacientes", self.PACIENTES, self.pacientes),
+            ("agendamentos", self.AGENDAMENTOS, self.agendamentos),
+            ("atendimentos", self.ATENDIMENTOS, self.atendimentos),
+            ("lancamentos_financeiros", self.LANCAMENTOS_FINANCEIROS, self.lancamentos_financeiros),
+        ]
+
+def _perfil_benchmark(conn: Connection) -> int:
+    permissao_id = conn.scalar(text("SELECT id FROM permissoes WHERE nome = :nome"), {"nome": PERMISSAO})
+    if permissao_id is None:
+        permissao_id = conn.scalar(text("INSERT INTO permissoes (nome, descricao) VALUES (:nome, 'Acesso total') RETURNING id"), {"nome": PERMISSAO})
+    perfil_id = conn.scalar(text("SELECT id FROM perfis WHERE nome = :nome"), {"nome": PERFIL})
+    if perfil_id is None:
+        perfil_id = conn.scalar(text("INSERT INTO perfis (nome) VALUES (:nome) RETURNING id"), {"nome": PERFIL})
+        conn.execute(text("INSERT INTO perfil_permissao (perfil_id, permissao_id) VALUES (:perfil, :permissao)"), {"perfil": perfil_id, "permissao": permissao_id})
+    return perfil_id
+
+def load_dataset(engine: Engine, escala: Escala, log: Callable[[str], None] = print) -> Dict[str, int]:
+    """Gera e grava o dataset em uma única transação; retorna as linhas gravadas por tabela."""
+    from app.core.security import get_password_hash
+
+    totais = {}
+    with engine.begin() as conn:
+        bulk.disable_statement_timeout(conn)
+        ids = Ids(**bulk.next_ids(conn, Ids.__dataclass_fields__))
+        dataset = Dataset(escala, ids, _perfil_benchmark(conn), get_password_hash(SENHA))
+        for table, columns, rows in dataset.tabelas():
+            inicio = time.perf_counter()
+            totais[table] = bulk.write_rows(conn, table, columns, rows())
+            log(f"{table}: {totais[table]} linhas em {time.perf_counter() - inicio:.1f}s")
+        bulk.reset_sequences(conn, totais)
+    bulk.analyze(engine, list(totais))
+    return totais
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Gera o dataset sintético de benchmark.")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequena")
+    parser.add_argument("--clinicas", type=int)
+    parser.add_argument("--pacientes", type=int)
+    parser.add_argument("--agendamentos", type=int)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    escala = ESCALAS[args.escala]
+    ajustes = {campo: getattr(args, campo) for campo in ("clinicas", "pacientes", "agendamentos", "seed") if getattr(args, campo) is not None}
+    escala = replace(escala, **ajustes)
+
+    from app.core.config import settings
+    from app.core.database import create_db_engine
+
+    inicio = time.perf_counter()
+    totais = load_dataset(create_db_engine(settings), escala)
+    print(f"{sum(totais.values())} linhas em {time.perf_counter() - inicio:.1f}s ({escala})")
+
+if __name__ == "__main__":
+    main()
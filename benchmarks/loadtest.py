@@ -0,0 +1,194 @@
+"""
+Scripted load profile.
+
+This file drives a running API with the users created by `benchmarks.dataset`: a login burst followed by a mix of
+calendar browsing, patient check-in and billing close, repeated by concurrent virtual users for a fixed duration.
+Latencies are recorded per endpoint template and written as JSON with the commit under test, ready for
+`benchmarks.report`:
+
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 --escala grande --usuarios 100 --duracao 120 \
+        --output results/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+from . import dataset, report
+
+@dataclass(frozen=True)
+class Perfil:
+    usuarios: int = 20
+    duracao: float = 60.0
+    # Pausa entre ações de um mesmo usuário virtual (segundos); 0 mede a vazão máxima
+    pausa: float = 0.0
+    # Peso de cada cenário no sorteio feito após o login
+    pesos: Dict[str, int] = field(default_factory=lambda: {"agenda": 6, "checkin": 3, "faturamento": 1})
+    paginas: int = 3
+    seed: int = 7
+
+class Recorder:
+    """Latências por endpoint (template da rota, não a URL com ids) e respostas com erro."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    async def request(self, client: httpx.AsyncClient, method: str, route: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        endpoint = f"{method} {route}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return None
+        return response
+
+class UsuarioVirtual:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, perfil: Perfil, dados: dataset.Dataset, username: str, seed: int):
+        self.client = client
+        self.recorder = recorder
+        self.perfil = perfil
+        self.dados = dados
+        self.username = username
+        self.rng = random.Random(seed)
+        self.headers: Dict[str, str] = {}
+
+    async def login(self) -> bool:
+        response = await self.recorder.request(self.client, "POST", "/api/token", "/api/token", json={"username": self.username, "password": dataset.SENHA})
+        if response is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def _get(self, route: str, url: str, **params) -> Optional[httpx.Response]:
+        return await self.recorder.request(self.client, "GET", route, url, params=params, headers=self.headers)
+
+    def _dia(self, futuro: bool) -> date:
+        dias = [d for d in self.dados.dias if (d >= self.dados.corte) == futuro] or self.dados.dias
+        return self.rng.choice(dias)
+
+    async def _agenda_do_dia(self, dia: date, paginas: int) -> List[dict]:
+        inicio = datetime.combine(dia, datetime.min.time())
+        params = {"start": inicio.isoformat(), "end": (inicio + timedelta(days=1)).isoformat(), "limit": 50}
+        itens = []
+        for _ in range(paginas):
+            response = await self._get("/api/agendamentos/", "/api/agendamentos/", **params)
+            if response is None:
+                break
+            itens += response.json()
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            params["cursor"] = cursor
+        return itens
+
+    async def agenda(self) -> None:
+        """Recepção folheando a agenda de um dia e procurando horários livres."""
+        dia = self._dia(futuro=self.rng.random() < 0.7)
+        await self._agenda_do_dia(dia, self.perfil.paginas)
+        inicio = datetime.combine(dia, datetime.min.time())
+        # Sem clinica_id: a API usa a clínica do usuário (os ids gerados dependem do que já havia no banco)
+        await self._get("/api/agendamentos/slots", "/api/agendamentos/slots", start=inicio.isoformat(), end=(inicio + timedelta(days=1)).isoformat())
+
+    async def checkin(self) -> None:
+        """Paciente chega: o agendamento é concluído e o atendimento registrado."""
+        pendentes = [a for a in await self._agenda_do_dia(self._dia(futuro=True), 1) if a["status"] == "AGENDADO"]
+        if not pendentes:
+            return
+        agendamento = self.rng.choice(pendentes)
+        concluido = await self.recorder.request(self.client, "PUT", "/api/agendamentos/{agendamento_id}", f"/api/agendamentos/{agendamento['id']}",
+                                                json={"status": "CONCLUIDO"}, headers=self.headers)
+        if concluido is not None:
+            await self.recorder.request(self.client, "POST", "/api/atendimentos/", "/api/atendimentos/",
+                                        json={"agendamento_id": agendamento["id"], "status": "FINALIZADO"}, headers=self.headers)
+
+    async def faturamento(self) -> None:
+        """Fechamento do caixa: percorre os lançamentos e confirma os pagamentos de uma página em lote."""
+        params = {"limit": 50}
+        lancamentos: List[dict] = []
+        for _ in range(self.perfil.paginas):
+            response = await self._get("/api/lancamentos-financeiros/", "/api/lancamentos-financeiros/", **params)
+            if response is None:
+                break
+            lancamentos = response.json()
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            params["cursor"] = cursor
+        if lancamentos:
+            hoje = date.today().isoformat()
+            await self.recorder.request(self.client, "PATCH", "/api/lancamentos-financeiros/batch", "/api/lancamentos-financeiros/batch",
+                                        json=[{"id": l["id"], "data_pagamento": l["data_pagamento"] or hoje} for l in lancamentos], headers=self.headers)
+
+    async def executar(self, deadline: float) -> None:
+        cenarios = list(self.perfil.pesos)
+        pesos = [self.perfil.pesos[c] for c in cenarios]
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(cenarios, pesos)[0])()
+            if self.perfil.pausa:
+                await asyncio.sleep(self.rng.expovariate(1 / self.perfil.pausa))
+
+def _usuarios(escala: dataset.Escala, quantidade: int) -> List[str]:
+    """Distribui os usuários virtuais entre os atendentes das clínicas, em rodízio."""
+    contas = [dataset.atendente_username(c, a) for a in range(escala.atendentes_por_clinica) for c in range(escala.clinicas)]
+    return [contas[i % len(contas)] for i in range(quantidade)]
+
+async def run(base_url: str, escala: dataset.Escala, perfil: Perfil) -> Recorder:
+    recorder = Recorder()
+    dados = dataset.Dataset(escala)
+    limits = httpx.Limits(max_connections=perfil.usuarios, max_keepalive_connections=perfil.usuarios)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        usuarios = [UsuarioVirtual(client, recorder, perfil, dados, username, perfil.seed + i) for i, username in enumerate(_usuarios(escala, perfil.usuarios))]
+        # Rajada de login: todos entram ao mesmo tempo, como na abertura das clínicas
+        logados = await asyncio.gather(*(u.login() for u in usuarios))
+        deadline = time.perf_counter() + perfil.duracao
+        await asyncio.gather(*(u.executar(deadline) for u, ok in zip(usuarios, logados) if ok))
+    return recorder
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Executa o perfil de carga contra uma API em execução.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--escala", choices=sorted(dataset.ESCALAS), default="pequena", help="mesma escala usada em benchmarks.dataset")
+    parser.add_argument("--usuarios", type=int, default=Perfil.usuarios)
+    parser.add_argument("--duracao", type=float, default=Perfil.duracao)
+    parser.add_argument("--pausa", type=float, default=Perfil.pausa)
+    parser.add_argument("--seed", type=int, default=Perfil.seed)
+    parser.add_argument("--output", help="arquivo JSON com o resultado (para benchmarks.report)")
+    args = parser.parse_args(argv)
+
+    escala = dataset.ESCALAS[args.escala]
+    perfil = Perfil(usuarios=args.usuarios, duracao=args.duracao, pausa=args.pausa, seed=args.seed)
+    recorder = asyncio.run(run(args.base_url, escala, perfil))
+    resultado = {
+        "commit": _commit(),
+        "escala": args.escala,
+        "perfil": asdict(perfil),
+        "executado_em": datetime.now().isoformat(timespec="seconds"),
+        "endpoints": report.summarize(recorder.latencies, recorder.errors),
+    }
+    print(report.render(resultado["endpoints"]))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark reports.
+
+This file turns the latencies recorded by `benchmarks.loadtest` into p50/p95/p99 per endpoint and compares two result
+files, so a change can be checked against the commit it came from:
+
+    python -m benchmarks.report results/base.json results/novo.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence
+
+PERCENTIS = (50, 95, 99)
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Percentil `p` (0-100) com interpolação linear entre as amostras ordenadas."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+def summarize(latencies: Dict[str, List[float]], errors: Optional[Dict[str, int]] = None) -> Dict[str, dict]:
+    """Resumo por endpoint, em milissegundos: contagem, erros, média e percentis."""
+    errors = errors or {}
+    resumo = {}
+    for endpoint in sorted(set(latencies) | set(errors)):
+        values = latencies.get(endpoint, [])
+        linha = {"count": len(values), "errors": errors.get(endpoint, 0), "mean": round(sum(values) / len(values) * 1000, 2) if values else 0.0}
+        for p in PERCENTIS:
+            linha[f"p{p}"] = round(percentile(values, p) * 1000, 2)
+        resumo[endpoint] = linha
+    return resumo
+
+def render(resumo: Dict[str, dict]) -> str:
+    """Tabela de texto com uma linha por endpoint."""
+    largura = max([len("endpoint"), *map(len, resumo)])
+    colunas = ["count", "errors", "mean", *(f"p{p}" for p in PERCENTIS)]
+    linhas = [f"{'endpoint':<{largura}}  " + "  ".join(f"{c:>9}" for c in colunas)]
+    for endpoint, linha in resumo.items():
+        linhas.append(f"{endpoint:<{largura}}  " + "  ".join(f"{linha[c]:>9}" for c in colunas))
+    return "\n".join(linhas)
+
+def compare(base: Dict[str, dict], novo: Dict[str, dict], threshold: float = 0.10, metric: str = "p95") -> List[dict]:
+    """
+    Variação de `metric` por endpoint entre dois resumos.
+
+    Um endpoint regride quando a métrica cresce mais que `threshold` (fração) ou quando passa a ter erros.
+    Endpoints presentes em apenas um dos resumos aparecem com o valor ausente como None.
+    """
+    resultado = []
+    for endpoint in sorted(set(base) | set(novo)):
+        antes = base.get(endpoint, {}).get(metric)
+        depois = novo.get(endpoint, {}).get(metric)
+        delta = (depois - antes) / antes if antes and depois is not None else None
+        novos_erros = novo.get(endpoint, {}).get("errors", 0) > base.get(endpoint, {}).get("errors", 0)
+        resultado.append({
+            "endpoint": endpoint,
+            "base": antes,
+            "novo": depois,
+            "delta": delta,
+            "regression": novos_erros or (delta is not None and delta > threshold),
+        })
+    return resultado
+
+def render_comparison(linhas: Iterable[dict], metric: str = "p95") -> str:
+    linhas = list(linhas)
+    largura = max([len("endpoint"), *(len(l["endpoint"]) for l in linhas)])
+    saida = [f"{'endpoint':<{largura}}  {'base ' + metric:>10}  {'novo ' + metric:>10}  {'delta':>8}"]
+    for l in linhas:
+        delta = f"{l['delta']:+.1%}" if l["delta"] is not None else "-"
+        fmt = lambda v: f"{v:.2f}" if v is not None else "-"
+        saida.append(f"{l['endpoint']:<{largura}}  {fmt(l['base']):>10}  {fmt(l['novo']):>10}  {delta:>8}" + ("  REGRESSÃO" if l["regression"] else ""))
+    return "\n".join(saida)
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mostra ou compara resultados de benchmarks.loadtest.")
+    parser.add_argument("base")
+    parser.add_argument("novo", nargs="?")
+    parser.add_argument("--metric", default="p95", choices=[f"p{p}" for p in PERCENTIS] + ["mean"])
+    parser.add_argument("--threshold", type=float, default=0.10, help="aumento relativo tolerado antes de apontar regressão")
+    args = parser.parse_args(argv)
+
+    base = _load(args.base)
+    if args.novo is None:
+        print(f"commit {base.get('commit')} | {base.get('escala')}")
+        print(render(base["endpoints"]))
+        return 0
+    novo = _load(args.novo)
+    print(f"base {base.get('commit')} -> novo {novo.get('commit')}")
+    linhas = compare(base["endpoints"], novo["endpoints"], args.threshold, args.metric)
+    print(render_comparison(linhas, args.metric))
+    return 1 if any(l["regression"] for l in linhas) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
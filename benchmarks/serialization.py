@@ -0,0 +1,91 @@
+"""
+Response serialization micro-benchmark.
+
+This file times what FastAPI does with a list endpoint's result: validating 1,000 ORM rows against the response
+model (`serialize_response`) and rendering the body. The "antes" variant uses the former setup, a schema with the
+v1-style `class Config: orm_mode = True` rendered by the stdlib-based `JSONResponse`. The "depois" variant uses the
+current schema (`ConfigDict(from_attributes=True)`) rendered by `FastJSONResponse`. No database is involved:
+
+    python -m benchmarks.serialization --linhas 1000 --repeticoes 50
+"""
+import argparse
+import asyncio
+import time
+import warnings
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app import models, schemas
+from app.core.responses import FastJSONResponse
+
+from . import report
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+
+    class AgendamentoOrmMode(schemas.AgendamentoInDBBase):
+        class Config:
+            orm_mode = True
+
+    class ProntuarioOrmMode(schemas.ProntuarioInDBBase):
+        class Config:
+            orm_mode = True
+
+TEXTO = "Paciente relata dor lombar há três semanas, sem irradiação; nega febre. " * 4
+
+def agendamentos(quantidade: int) -> List[models.Agendamento]:
+    inicio = datetime(2025, 1, 6, 8)
+    return [
+        models.Agendamento(id=i, paciente_id=i % 97 + 1, profissional_id=i % 7 + 1, data=inicio + timedelta(minutes=30 * i),
+                           data_fim=inicio + timedelta(minutes=30 * i + 30), status="AGENDADO", guiche_numero=i % 3 + 1, clinica_id=1)
+        for i in range(1, quantidade + 1)
+    ]
+
+def prontuarios(quantidade: int) -> List[models.Prontuario]:
+    textos = {coluna: TEXTO for coluna in ("queixa_principal", "historia_doenca_atual", "antecedentes_pessoais_familiares", "habitos_vida",
+                                           "exame_fisico_geral_segmentar", "hipoteses_diagnosticas", "prescricoes", "evolucao_clinica")}
+    return [
+        models.Prontuario(id=i, paciente_id=i % 97 + 1, data_criacao=datetime(2025, 1, 6, 8), editavel=True, is_finalized=False, **textos)
+        for i in range(1, quantidade + 1)
+    ]
+
+def _variante(schema, response_class, linhas) -> Callable[[], bytes]:
+    field = create_model_field(name=f"Response_{schema.__name__}", type_=List[schema], mode="serialization")
+
+    def executar() -> bytes:
+        content = asyncio.run(serialize_response(field=field, response_content=linhas))
+        return response_class(content).body
+    return executar
+
+def run(quantidade: int, repeticoes: int) -> Dict[str, List[float]]:
+    casos = {
+        "AgendamentoInDBBase": (agendamentos(quantidade), AgendamentoOrmMode, schemas.AgendamentoInDBBase),
+        "ProntuarioInDBBase": (prontuarios(quantidade), ProntuarioOrmMode, schemas.ProntuarioInDBBase),
+    }
+    latencies: Dict[str, List[float]] = {}
+    for nome, (linhas, antigo, atual) in casos.items():
+        variantes = {"antes": _variante(antigo, JSONResponse, linhas), "depois": _variante(atual, FastJSONResponse, linhas)}
+        # A troca não pode mudar o corpo da resposta
+        assert variantes["antes"]() == variantes["depois"]()
+        for variante, executar in variantes.items():
+            executar()
+            tempos = latencies[f"{nome} x{quantidade} ({variante})"] = []
+            for _ in range(repeticoes):
+                start = time.perf_counter()
+                executar()
+                tempos.append(time.perf_counter() - start)
+    return latencies
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compara a serialização de respostas antes e depois do FastJSONResponse.")
+    parser.add_argument("--linhas", type=int, default=1_000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args(argv)
+    print(report.render(report.summarize(run(args.linhas, args.repeticoes))))
+
+if __name__ == "__main__":
+    main()
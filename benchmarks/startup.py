@@ -0,0 +1,92 @@
+"""
+Worker cold-start benchmark.
+
+This file measures what a new uvicorn worker pays before and during its first requests: importing the application,
+running the lifespan startup (with and without STARTUP_WARMUP) and serving the first login attempt, which needs a
+database connection. Each run is a fresh Python process against the database in DATABASE_URL; the phases are written
+in the same format as `benchmarks.loadtest`, so `benchmarks.report` can compare them between commits:
+
+    python -m benchmarks.startup --runs 10 --output results/startup-$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from . import report
+
+async def _medir() -> Dict[str, float]:
+    """Executado no processo filho: segundos gastos em cada fase do cold start."""
+    fases = {}
+    start = time.perf_counter()
+    from app.main import app
+    fases["import"] = time.perf_counter() - start
+
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        start = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            fases["lifespan"] = time.perf_counter() - start
+            # Usuário inexistente: consulta o banco e responde 401 sem rodar o bcrypt
+            for nome in ("primeiro login", "segundo login"):
+                start = time.perf_counter()
+                await client.post("/api/token", json={"username": "startup-benchmark", "password": "x"})
+                fases[nome] = time.perf_counter() - start
+    return fases
+
+def _executar(warmup: bool) -> Dict[str, float]:
+    env = {**os.environ, "STARTUP_WARMUP": "true" if warmup else "false"}
+    start = time.perf_counter()
+    saida = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--filho"], env=env, capture_output=True, text=True, check=True)
+    fases = json.loads(saida.stdout.strip().splitlines()[-1])
+    # Do fork até a resposta do segundo login, incluindo o boot do interpretador
+    fases["processo"] = time.perf_counter() - start
+    return fases
+
+def run(runs: int) -> Dict[str, List[float]]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(runs):
+        for warmup in (False, True):
+            for fase, segundos in _executar(warmup).items():
+                latencies[f"{fase} (warmup {'on' if warmup else 'off'})"].append(segundos)
+    return latencies
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mede o cold start de um worker da API.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="arquivo JSON com o resultado (para benchmarks.report)")
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.filho:
+        print(json.dumps(asyncio.run(_medir())))
+        return
+
+    resultado = {
+        "commit": _commit(),
+        "escala": None,
+        "perfil": {"runs": args.runs},
+        "executado_em": datetime.now().isoformat(timespec="seconds"),
+        "endpoints": report.summarize(run(args.runs)),
+    }
+    print(report.render(resultado["endpoints"]))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
-import { Container, Form, Button } from 'react-bootstrap';
+import { Container, Form, Button, Alert } from 'react-bootstrap';
 import { useNavigate, useParams } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 
@@ -13,6 +13,7 @@ const AgendamentoForm = () => {
     });
     const [pacientes, setPacientes] = useState([]);
     const [profissionais, setProfissionais] = useState([]);
+    const [conflitos, setConflitos] = useState([]);
     const navigate = useNavigate();
     const { id } = useParams();
     const { user } = useAuth();
@@ -56,6 +57,10 @@ const AgendamentoForm = () => {
                 navigate('/agendamentos');
             })
             .catch(error => {
+                if (error.response && error.response.status === 409) {
+                    setConflitos(error.response.data.detail.conflitos);
+                    return;
+                }
                 console.error('Error saving agendamento:', error.response ? error.response.data : error);
             });
     };
@@ -65,6 +70,18 @@ const AgendamentoForm = () => {
     return (
         <Container>
             <h1 className="my-4">{id ? 'Editar' : 'Novo'} Agendamento</h1>
+            {conflitos.length > 0 && (
+                <Alert variant="warning" onClose={() => setConflitos([])} dismissible>
+                    Horário indisponível. Conflita com:
+                    <ul className="mb-0">
+                        {conflitos.map(c => (
+                            <li key={c.id}>
+                                {new Date(c.data).toLocaleString()} - {new Date(c.data_fim).toLocaleTimeString()} ({c.motivos.join(', ')})
+                            </li>
+                        ))}
+                    </ul>
+                </Alert>
+            )}
             <Form onSubmit={handleSubmit}>
                 <Form.Group controlId="paciente">
                     <Form.Label>Paciente</Form.Label>
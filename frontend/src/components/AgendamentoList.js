@@ -1,13 +1,22 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
-import { Table, Container, Form, Button, Modal } from 'react-bootstrap';
+import { Table, Container, Form, Button, Modal, Row, Col } from 'react-bootstrap';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import { hasPermission } from '../utils/permissions';
 
+// Soma dias a uma data no formato YYYY-MM-DD
+const addDays = (isoDate, days) => {
+    const date = new Date(`${isoDate}T00:00:00Z`);
+    date.setUTCDate(date.getUTCDate() + days);
+    return date.toISOString().slice(0, 10);
+};
+
 const AgendamentoList = () => {
     const [agendamentos, setAgendamentos] = useState([]);
     const [searchTerm, setSearchTerm] = useState('');
+    const [dataInicio, setDataInicio] = useState(new Date().toISOString().slice(0, 10));
+    const [dataFim, setDataFim] = useState(addDays(new Date().toISOString().slice(0, 10), 6));
     const [showDeleteModal, setShowDeleteModal] = useState(false);
     const [selectedAgendamento, setSelectedAgendamento] = useState(null);
     const navigate = useNavigate();
@@ -15,10 +24,18 @@ const AgendamentoList = () => {
 
     useEffect(() => {
         fetchAgendamentos();
-    }, []);
+    }, [dataInicio, dataFim]);
 
     const fetchAgendamentos = () => {
-        axios.get('/api/agendamentos/')
+        // O período é filtrado no servidor; o fim é inclusivo na tela e exclusivo na API
+        // Só as colunas da tela, com os nomes de paciente e profissional na mesma resposta
+        const params = {
+            fields: 'data,status,paciente.nome,profissional.user.username',
+            include: 'paciente,profissional.user',
+        };
+        if (dataInicio) params.start = `${dataInicio}T00:00:00`;
+        if (dataFim) params.end = `${addDays(dataFim, 1)}T00:00:00`;
+        axios.get('/api/agendamentos/', { params })
             .then(response => {
                 setAgendamentos(response.data);
             })
@@ -44,7 +61,7 @@ const AgendamentoList = () => {
     };
 
     const filteredAgendamentos = agendamentos.filter(agendamento => {
-        const pacienteNome = agendamento.paciente_nome || '';
+        const pacienteNome = agendamento.paciente?.nome || '';
         return pacienteNome.toLowerCase().includes(searchTerm.toLowerCase());
     });
 
@@ -58,6 +75,16 @@ const AgendamentoList = () => {
             {canCreateAgendamentos && (
                 <Button variant="success" className="mb-3" onClick={() => navigate('/agendamentos/new')}>Novo Agendamento</Button>
             )}
+            <Row className="mb-3">
+                <Form.Group as={Col} controlId="dataInicio">
+                    <Form.Label>De</Form.Label>
+                    <Form.Control type="date" value={dataInicio} onChange={e => setDataInicio(e.target.value)} />
+                </Form.Group>
+                <Form.Group as={Col} controlId="dataFim">
+                    <Form.Label>Até</Form.Label>
+                    <Form.Control type="date" value={dataFim} onChange={e => setDataFim(e.target.value)} />
+                </Form.Group>
+            </Row>
             <Form.Group controlId="search">
                 <Form.Control
                     type="text"
@@ -79,8 +106,8 @@ const AgendamentoList = () => {
                 <tbody>
                     {filteredAgendamentos.map(agendamento => (
                         <tr key={agendamento.id}>
-                            <td>{agendamento.paciente_nome}</td>
-                            <td>{agendamento.profissional_username}</td>
+                            <td>{agendamento.paciente?.nome}</td>
+                            <td>{agendamento.profissional?.user?.username}</td>
                             <td>{new Date(agendamento.data).toLocaleString()}</td>
                             <td>{agendamento.status}</td>
                             {(canUpdateAgendamentos || canDeleteAgendamentos) && (
@@ -99,7 +126,7 @@ const AgendamentoList = () => {
                     <Modal.Title>Confirmar Exclusão</Modal.Title>
                 </Modal.Header>
                 <Modal.Body>
-                    Tem certeza que deseja excluir o agendamento de <strong>{selectedAgendamento?.paciente__nome}</strong> em <strong>{selectedAgendamento?.data ? new Date(selectedAgendamento.data).toLocaleString() : ''}</strong>?
+                    Tem certeza que deseja excluir o agendamento de <strong>{selectedAgendamento?.paciente?.nome}</strong> em <strong>{selectedAgendamento?.data ? new Date(selectedAgendamento.data).toLocaleString() : ''}</strong>?
                 </Modal.Body>
                 <Modal.Footer>
                     <Button variant="secondary" onClick={() => setShowDeleteModal(false)}>
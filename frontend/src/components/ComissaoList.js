@@ -18,7 +18,7 @@ const ComissaoList = () => {
     }, []);
 
     const fetchComissoes = () => {
-        axios.get('/api/comissoes/')
+        axios.get('/api/comissoes/', { params: { fields: 'atendimento_id,valor,paga,profissional.user.username', include: 'profissional.user' } })
             .then(response => {
                 setComissoes(response.data);
             })
@@ -44,8 +44,8 @@ const ComissaoList = () => {
     };
 
     const filteredComissoes = comissoes.filter(comissao =>
-        comissao.profissional__user__username.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        comissao.atendimento__id.toString().includes(searchTerm.toLowerCase())
+        (comissao.profissional?.user?.username || '').toLowerCase().includes(searchTerm.toLowerCase()) ||
+        comissao.atendimento_id.toString().includes(searchTerm.toLowerCase())
     );
 
     const canCreateComissoes = hasPermission(user, 'criar_comissoes');
@@ -79,8 +79,8 @@ const ComissaoList = () => {
                 <tbody>
                     {filteredComissoes.map(comissao => (
                         <tr key={comissao.id}>
-                            <td>{comissao.profissional__user__username}</td>
-                            <td>{comissao.atendimento__id}</td>
+                            <td>{comissao.profissional?.user?.username}</td>
+                            <td>{comissao.atendimento_id}</td>
                             <td>R$ {parseFloat(comissao.valor).toFixed(2)}</td>
                             <td>{comissao.paga ? 'Sim' : 'Não'}</td>
                             {(canUpdateComissoes || canDeleteComissoes) && (
@@ -99,7 +99,7 @@ const ComissaoList = () => {
                     <Modal.Title>Confirmar Exclusão</Modal.Title>
                 </Modal.Header>
                 <Modal.Body>
-                    Tem certeza que deseja excluir a comissão do atendimento <strong>{selectedComissao?.atendimento__id}</strong>?
+                    Tem certeza que deseja excluir a comissão do atendimento <strong>{selectedComissao?.atendimento_id}</strong>?
                 </Modal.Body>
                 <Modal.Footer>
                     <Button variant="secondary" onClick={() => setShowDeleteModal(false)}>
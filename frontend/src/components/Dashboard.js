@@ -11,6 +11,30 @@ import 'react-big-calendar/lib/css/react-big-calendar.css';
 // Configura o localizador para o calendário
 const localizer = momentLocalizer(moment);
 
+const DATE_PARAM_FORMAT = 'YYYY-MM-DDTHH:mm:ss';
+
+// Intervalo [start, end) exibido pelo calendário na visualização atual
+const visibleRange = (date, view) => {
+    if (view === 'month') {
+        return [moment(date).startOf('month').startOf('week'), moment(date).endOf('month').endOf('week').add(1, 'millisecond')];
+    }
+    if (view === 'agenda') {
+        return [moment(date).startOf('day'), moment(date).startOf('day').add(30, 'days')];
+    }
+    const unit = view === 'day' ? 'day' : 'week';
+    return [moment(date).startOf(unit), moment(date).endOf(unit).add(1, 'millisecond')];
+};
+
+// Segue o cursor (X-Next-Cursor) até trazer todos os agendamentos do período
+const fetchAgendamentos = async (params, cursor = null, acumulados = []) => {
+    const response = await axios.get('http://127.0.0.1:8000/api/agendamentos/', {
+        params: { ...params, limit: 500, ...(cursor ? { cursor } : {}) },
+    });
+    const agendamentos = acumulados.concat(response.data);
+    const next = response.headers['x-next-cursor'];
+    return next ? fetchAgendamentos(params, next, agendamentos) : agendamentos;
+};
+
 const Dashboard = () => {
     const { user } = useAuth();
     const navigate = useNavigate();
@@ -21,10 +45,11 @@ const Dashboard = () => {
     useEffect(() => {
         if (!user) return; // Só executa se o usuário estiver logado
 
-        // Buscar agendamentos para o calendário
-        axios.get('http://127.0.0.1:8000/api/agendamentos/')
-            .then(response => {
-                const events = response.data.map(agendamento => ({
+        // Buscar apenas os agendamentos do período visível no calendário (filtro feito no servidor)
+        const [start, end] = visibleRange(currentDate, currentView);
+        fetchAgendamentos({ start: start.format(DATE_PARAM_FORMAT), end: end.format(DATE_PARAM_FORMAT) })
+            .then(agendamentos => {
+                const events = agendamentos.map(agendamento => ({
                     title: `Agendamento: ${agendamento.paciente_nome} (${agendamento.profissional_username})`,
                     start: new Date(agendamento.data),
                     end: new Date(moment(agendamento.data).add(1, 'hour').toISOString()), // Assume 1 hora de duração
@@ -37,7 +62,7 @@ const Dashboard = () => {
                 console.error('Erro ao buscar agendamentos:', error);
             });
 
-    }, [user]);
+    }, [user, currentDate, currentView]);
 
     if (!user) {
         return (
@@ -3,6 +3,9 @@ import axios from 'axios';
 import { Table, Container, Alert } from 'react-bootstrap';
 import { useAuth } from '../context/AuthContext';
 
+// A API responde 304 (ETag) enquanto a agenda não muda, então o polling é barato
+const POLLING_INTERVAL_MS = 15000;
+
 const ProfissionalAgenda = () => {
     const [agendamentos, setAgendamentos] = useState([]);
     const [error, setError] = useState('');
@@ -11,14 +14,19 @@ const ProfissionalAgenda = () => {
     useEffect(() => {
         // Only fetch if the user is a PROFESSIONAL
         if (user && user.perfil === 'PROFISSIONAL') {
-            axios.get('http://127.0.0.1:8000/api/profissional/agenda/')
-                .then(response => {
-                    setAgendamentos(response.data);
-                })
-                .catch(error => {
-                    console.error('Error fetching professional agenda: ', error);
-                    setError('Ocorreu um erro ao carregar a agenda do profissional.');
-                });
+            const fetchAgenda = () => {
+                axios.get('http://127.0.0.1:8000/api/profissional/agenda/')
+                    .then(response => {
+                        setAgendamentos(response.data);
+                    })
+                    .catch(error => {
+                        console.error('Error fetching professional agenda: ', error);
+                        setError('Ocorreu um erro ao carregar a agenda do profissional.');
+                    });
+            };
+            fetchAgenda();
+            const interval = setInterval(fetchAgenda, POLLING_INTERVAL_MS);
+            return () => clearInterval(interval);
         } else if (user) {
             setError('Você não tem permissão para acessar esta página.');
         }
@@ -35,20 +43,22 @@ const ProfissionalAgenda = () => {
                             <th>Paciente</th>
                             <th>Data</th>
                             <th>Status</th>
+                            <th>Atendimento</th>
                         </tr>
                     </thead>
                     <tbody>
                         {agendamentos.length > 0 ? (
                             agendamentos.map(agendamento => (
                                 <tr key={agendamento.id}>
-                                    <td>{agendamento.paciente__nome}</td>
+                                    <td>{agendamento.paciente_nome}</td>
                                     <td>{new Date(agendamento.data).toLocaleString()}</td>
                                     <td>{agendamento.status}</td>
+                                    <td>{agendamento.atendimento_status || '-'}</td>
                                 </tr>
                             ))
                         ) : (
                             <tr>
-                                <td colSpan="3">Nenhum agendamento encontrado.</td>
+                                <td colSpan="4">Nenhum agendamento encontrado.</td>
                             </tr>
                         )}
                     </tbody>
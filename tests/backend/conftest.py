@@ -0,0 +1,18 @@
+import os
+
+# Os testes nunca devem abrir conexões com o Postgres configurado por padrão
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Requisição que passar do orçamento de comandos SQL falha o teste (ver app/core/profiling.py)
+os.environ.setdefault("DB_QUERY_BUDGET", "20")
+os.environ.setdefault("DB_QUERY_BUDGET_STRICT", "true")
+
+import pytest
+
+from app.core.auth import principal_cache
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    # Os testes recriam o banco a cada caso, então usuários com o mesmo username não podem vazar entre eles
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from app.api.agenda import horarios_livres, particionar_guiches
+
+MEIA_HORA = timedelta(minutes=30)
+
+def test_horarios_livres_sweep():
+    # Terça-feira; 20 horas semanais = expediente de 08:00 às 12:00
+    dia = datetime(2024, 10, 1)
+    agendamentos = [
+        (dia.replace(hour=8), dia.replace(hour=9), 1),
+        (dia.replace(hour=10), dia.replace(hour=10, minute=30), 2),
+        (dia.replace(hour=10, minute=15), dia.replace(hour=10, minute=45), None),
+    ]
+    livres = horarios_livres(agendamentos, [(1, 20)], dia, dia + timedelta(days=1), MEIA_HORA, MEIA_HORA, num_guiches=2)
+    assert [h["inicio"].strftime("%H:%M") for h in livres] == ["09:00", "09:30", "10:30", "11:00", "11:30"]
+
+    # Com mais guichês o trecho 10:15-10:30 deixa de estar lotado
+    livres = horarios_livres(agendamentos, [(1, 20)], dia, dia + timedelta(days=1), MEIA_HORA, MEIA_HORA, num_guiches=3)
+    assert [h["inicio"].strftime("%H:%M") for h in livres] == ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30"]
+
+def test_horarios_livres_window_bounds():
+    dia = datetime(2024, 10, 1)
+    # Janela começando no meio do expediente e terminando no dia seguinte antes da abertura
+    livres = horarios_livres([], [(1, 20)], dia.replace(hour=11), dia + timedelta(days=1, hours=7), MEIA_HORA, MEIA_HORA, num_guiches=1)
+    assert [h["inicio"].strftime("%H:%M") for h in livres] == ["11:00", "11:30"]
+    assert horarios_livres([], [(1, 0)], dia, dia + timedelta(days=1), MEIA_HORA, MEIA_HORA, num_guiches=1) == []
+
+def test_horarios_livres_month_of_bookings():
+    # 30 dias, 20 profissionais com agenda cheia pela manhã: todos ficam livres só à tarde
+    inicio = datetime(2024, 10, 1)
+    profissionais = [(p, 40) for p in range(20)]
+    agendamentos = sorted(
+        (inicio + timedelta(days=d, hours=8) + k * MEIA_HORA, inicio + timedelta(days=d, hours=8) + (k + 1) * MEIA_HORA, p)
+        for d in range(30) for p in range(20) for k in range(8)
+    )
+    livres = horarios_livres(agendamentos, profissionais, inicio, inicio + timedelta(days=30), MEIA_HORA, MEIA_HORA, num_guiches=40)
+    assert livres
+    assert all(h["inicio"].hour >= 12 for h in livres)
+    dias_uteis = sum(1 for d in range(30) if (inicio + timedelta(days=d)).weekday() < 5)
+    assert len(livres) == dias_uteis * 20 * 8
+
+def test_particionar_guiches():
+    dia = datetime(2024, 10, 1, 8)
+    def slot(i, inicio, minutos):
+        return (i, dia + timedelta(minutes=inicio), dia + timedelta(minutes=inicio + minutos))
+    agendamentos = [slot(1, 0, 30), slot(2, 0, 60), slot(3, 30, 30), slot(4, 30, 30), slot(5, 60, 30)]
+    alocacao, sem_guiche = particionar_guiches(agendamentos, 2)
+    # 3 e 4 disputam o guichê liberado por 1 às 08:30: o pico de 3 simultâneos excede os 2 guichês
+    assert alocacao == {1: 1, 2: 2, 3: 1, 5: 1}
+    assert sem_guiche == [4]
+
+    alocacao, sem_guiche = particionar_guiches(agendamentos, 3)
+    assert sem_guiche == []
+    # nenhum guichê com dois agendamentos ao mesmo tempo
+    for a in agendamentos:
+        for b in agendamentos:
+            if a[0] < b[0] and alocacao[a[0]] == alocacao[b[0]]:
+                assert a[2] <= b[1] or b[2] <= a[1]
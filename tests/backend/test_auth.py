@@ -4,7 +4,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.core.auth import get_current_user, get_current_active_user, has_permission
+from app.core.auth import get_current_user, get_current_active_user, get_current_principal, has_permission, principal_cache
 from app.core.security import create_access_token
 from app.core.database import Base
 from app import models
@@ -18,7 +18,7 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 @pytest.fixture(name="session")
 def session_fixture():
@@ -68,7 +68,7 @@ async def test_get_current_user(session: TestingSessionLocal, test_token: str, t
     from app.api.endpoints import get_db
     app.dependency_overrides[get_db] = override_get_db
 
-    current_user = await get_current_user(test_token, session)
+    current_user = get_current_user(test_token, session)
     assert current_user.username == test_user.username
     assert current_user.email == test_user.email
 
@@ -102,7 +102,6 @@ async def test_has_permission(session: TestingSessionLocal, test_user: models.Us
     def override_get_db():
         yield session
 
-    from fastapi import Depends
     from app.api.endpoints import get_db
     app.dependency_overrides[get_db] = override_get_db
 
@@ -138,4 +137,23 @@ async def test_has_permission(session: TestingSessionLocal, test_user: models.Us
         await permission_checker(user_sem_permissao)
     assert exc_info.value.status_code == 403
 
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_current_principal_uses_cache(session: TestingSessionLocal, test_token: str, test_user: models.User):
+    principal = await get_current_principal(test_token, session)
+    assert principal.username == test_user.username
+    assert principal.permissoes == frozenset({"admin_acesso", "ler_usuarios"})
+    assert principal_cache.stats()["misses"] == 1
+
+    # A segunda resolução vem do cache, mesmo sem acesso ao banco
+    assert await get_current_principal(test_token, None) == principal
+    assert principal_cache.stats()["hits"] == 1
+
+    principal_cache.invalidate_user(test_user.id)
+    assert principal_cache.get(test_user.username) is None
+
+    await get_current_principal(test_token, session)
+    principal_cache.invalidate_perfil(test_user.perfil_id)
+    assert principal_cache.get(test_user.username) is None
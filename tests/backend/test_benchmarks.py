@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from benchmarks import dataset, report
+
+ESCALA = dataset.Escala(clinicas=3, profissionais_por_clinica=4, atendentes_por_clinica=2, pacientes=101, agendamentos=1_000)
+
+def test_percentile_interpolates_and_summarize_reports_ms():
+    assert report.percentile([], 50) == 0.0
+    assert report.percentile([3, 1, 2, 4], 50) == 2.5
+    assert report.percentile([1, 2, 3, 4, 5], 95) == 4.8
+    resumo = report.summarize({"GET /a": [0.010, 0.020, 0.030]}, {"GET /a": 1, "POST /b": 2})
+    assert resumo["GET /a"] == {"count": 3, "errors": 1, "mean": 20.0, "p50": 20.0, "p95": 29.0, "p99": 29.8}
+    assert resumo["POST /b"]["count"] == 0 and resumo["POST /b"]["errors"] == 2
+
+def test_compare_flags_regressions_and_new_errors():
+    base = {"GET /a": {"p95": 10.0, "errors": 0}, "GET /b": {"p95": 10.0, "errors": 0}, "GET /c": {"p95": 10.0, "errors": 0}}
+    novo = {"GET /a": {"p95": 10.5, "errors": 0}, "GET /b": {"p95": 12.0, "errors": 0}, "GET /c": {"p95": 9.0, "errors": 3}, "GET /d": {"p95": 1.0, "errors": 0}}
+    linhas = {l["endpoint"]: l for l in report.compare(base, novo, threshold=0.10)}
+    assert [e for e, l in linhas.items() if l["regression"]] == ["GET /b", "GET /c"]
+    assert linhas["GET /a"]["delta"] == 0.05
+    assert linhas["GET /d"]["base"] is None and linhas["GET /d"]["delta"] is None
+
+def test_dataset_rows_are_consistent():
+    dados = dataset.Dataset(ESCALA, dataset.Ids(clinicas=10, pacientes=500))
+    clinicas = [r[0] for r in dados.clinicas()]
+    assert clinicas == [10, 11, 12]
+    pacientes = {r[0]: r[-1] for r in dados.pacientes()}
+    assert len(pacientes) == 101 and min(pacientes) == 500
+    assert len({r[2] for r in dados.pacientes()}) == 101  # CPFs únicos
+    profissionais = {r[0] for r in dados.profissionais()}
+    assert len({r[1] for r in dados.users()}) == 3 * (4 + 2)
+
+    agendamentos = list(dados.agendamentos())
+    assert len(agendamentos) == 1_000
+    ocupados = defaultdict(set)
+    for id_, paciente_id, profissional_id, inicio, fim, situacao, guiche, clinica_id in agendamentos:
+        assert pacientes[paciente_id] == clinica_id
+        assert profissional_id in profissionais
+        assert 1 <= guiche <= ESCALA.profissionais_por_clinica
+        # Sem sobreposição de profissional ou de guichê
+        assert (inicio, profissional_id) not in ocupados["profissional"]
+        assert (inicio, clinica_id, guiche) not in ocupados["guiche"]
+        ocupados["profissional"].add((inicio, profissional_id))
+        ocupados["guiche"].add((inicio, clinica_id, guiche))
+        assert (situacao == "CONCLUIDO") <= (inicio.date() < dados.corte)
+
+    atendimentos = list(dados.atendimentos())
+    assert len(atendimentos) == sum(1 for a in agendamentos if a[5] == "CONCLUIDO")
+    lancamentos = list(dados.lancamentos_financeiros())
+    assert [l[6] for l in lancamentos] == [a[0] for a in atendimentos]
+    # Mesma semente, mesmos dados
+    assert list(dataset.Dataset(ESCALA, dataset.Ids(clinicas=10, pacientes=500)).agendamentos()) == agendamentos
+
+def test_serialization_benchmark_variants_render_the_same_body():
+    from benchmarks import serialization
+
+    latencies = serialization.run(quantidade=20, repeticoes=2)
+    assert sorted(latencies) == [f"{schema} x20 ({variante})" for schema in ("AgendamentoInDBBase", "ProntuarioInDBBase") for variante in ("antes", "depois")]
+    assert all(len(tempos) == 2 for tempos in latencies.values())
@@ -1,24 +1,34 @@
+import base64
 import pytest
+import json
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
+from sqlalchemy.sql.compiler import InsertmanyvaluesSentinelOpts
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_async_db, get_async_database_url
 from app import models
+from app.api import agenda
 from app.core.security import create_access_token, get_password_hash
 from datetime import date, datetime
+from decimal import Decimal
 
-# Setup a test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Setup a test database, shared in memory between the sync and the asyncio engines
+SQLALCHEMY_DATABASE_URL = "sqlite:///file:clinicas_test?mode=memory&cache=shared&uri=true"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = create_async_engine(get_async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture(name="session")
 def session_fixture():
@@ -33,7 +43,12 @@ def client_fixture(session: TestingSessionLocal):
     def override_get_db():
         yield session
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -223,6 +238,24 @@ def test_clinica_fixture(session: TestingSessionLocal):
     session.refresh(clinica)
     return clinica
 
+# Tests for /token endpoint
+def test_login_for_access_token(client: TestClient, common_user_token: str):
+    response = client.post("/api/token", json={"username": "commonuser", "password": "commonpassword"})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+
+    response = client.post("/api/token", json={"username": "commonuser", "password": "wrongpassword"})
+    assert response.status_code == 401
+
+# Tests for /db/pool endpoint
+def test_read_db_pool_status(client: TestClient, admin_user_token: str, common_user_token: str):
+    response = client.get("/api/db/pool", headers={"Authorization": f"Bearer {admin_user_token}"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync", "async"}
+
+    response = client.get("/api/db/pool", headers={"Authorization": f"Bearer {common_user_token}"})
+    assert response.status_code == 403
+
 # Tests for /clinicas endpoints
 def test_create_clinica(client: TestClient, admin_user_token: str):
     response = client.post(
@@ -504,6 +537,28 @@ def test_update_perfil(client: TestClient, admin_user_token: str, session: Testi
     assert response.json()["nome"] == "Perfil Atualizado"
     assert any(p["nome"] == "permissao_teste" for p in response.json()["permissoes"])
 
+def test_update_perfil_invalidates_cached_permissions(client: TestClient, admin_user_token: str, common_user_token: str, session: TestingSessionLocal):
+    # Warm the permission cache for the common user (no permissions yet)
+    response = client.get("/api/clinicas/", headers={"Authorization": f"Bearer {common_user_token}"})
+    assert response.status_code == 403
+
+    perfil_comum = session.query(models.Perfil).filter(models.Perfil.nome == "COMUM").first()
+    permissao_ler_clinicas = session.query(models.Permissao).filter(models.Permissao.nome == "ler_clinicas").first()
+    response = client.put(
+        f"/api/perfis/{perfil_comum.id}",
+        headers={
+            "Authorization": f"Bearer {admin_user_token}"
+        },
+        json={
+            "nome": "COMUM",
+            "permissoes": [permissao_ler_clinicas.id]
+        }
+    )
+    assert response.status_code == 200
+
+    response = client.get("/api/clinicas/", headers={"Authorization": f"Bearer {common_user_token}"})
+    assert response.status_code == 200
+
 def test_delete_perfil(client: TestClient, admin_user_token: str, session: TestingSessionLocal):
     # Create a perfil first
     perfil_to_delete = models.Perfil(
@@ -3056,4 +3111,988 @@ def test_delete_agendamento_permission_denied(client: TestClient, admin_user_tok
         }
     )
     assert response.status_code == 403
-    assert response.json()["detail"] == "Usuário não possui permissão: excluir_agendamentos"
\ No newline at end of file
+    assert response.json()["detail"] == "Usuário não possui permissão: excluir_agendamentos"
+
+
+# Tests for /atendimentos endpoints
+def test_read_atendimentos(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente = models.Paciente(
+        nome="Paciente Atendimento Leitura",
+        cpf="999.999.999-01",
+        data_nascimento=date(1992, 3, 3),
+        email="atendimentoleitura@example.com",
+        clinica_id=test_clinica.id
+    )
+    session.add(paciente)
+    session.commit()
+    session.refresh(paciente)
+
+    agendamento = models.Agendamento(
+        paciente_id=paciente.id,
+        data=datetime(2024, 9, 3, 10, 0, 0),
+        status="CONCLUIDO"
+    )
+    session.add(agendamento)
+    session.commit()
+    session.refresh(agendamento)
+
+    atendimento = models.Atendimento(agendamento_id=agendamento.id, observacoes="Retorno")
+    session.add(atendimento)
+    session.commit()
+    session.refresh(atendimento)
+
+    response = client.get(
+        "/api/atendimentos/",
+        headers={
+            "Authorization": f"Bearer {admin_user_token}"
+        }
+    )
+    assert response.status_code == 200
+    assert [a["id"] for a in response.json()] == [atendimento.id]
+    assert response.json()[0]["observacoes"] == "Retorno"
+
+# Tests for keyset pagination
+def test_read_agendamentos_keyset_pagination(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente = models.Paciente(
+        nome="Paciente Paginacao",
+        cpf="999.999.999-02",
+        data_nascimento=date(1993, 4, 4),
+        email="paginacao@example.com",
+        clinica_id=test_clinica.id
+    )
+    session.add(paciente)
+    session.commit()
+    session.refresh(paciente)
+
+    # Dois agendamentos no mesmo horário: o id desempata a ordenação
+    datas = [datetime(2024, 9, 5, 9, 0), datetime(2024, 9, 4, 9, 0), datetime(2024, 9, 4, 9, 0), datetime(2024, 9, 6, 9, 0), datetime(2024, 9, 3, 9, 0)]
+    agendamentos = [models.Agendamento(paciente_id=paciente.id, data=d, status="AGENDADO") for d in datas]
+    session.add_all(agendamentos)
+    session.commit()
+    expected = [a.id for a in sorted(agendamentos, key=lambda a: (a.data, a.id))]
+
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    seen = []
+    response = client.get("/api/agendamentos/", params={"limit": 2}, headers=headers)
+    while True:
+        assert response.status_code == 200
+        seen.extend(a["id"] for a in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get("/api/agendamentos/", params={"limit": 2, "cursor": cursor}, headers=headers)
+    assert seen == expected
+
+    # skip/limit continua funcionando, agora com ordenação estável
+    response = client.get("/api/agendamentos/", params={"skip": 1, "limit": 2}, headers=headers)
+    assert [a["id"] for a in response.json()] == expected[1:3]
+
+def test_read_leads_keyset_pagination(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    leads = [models.Lead(nome=f"Lead Pagina {i}", email=f"leadpagina{i}@example.com", clinica_id=test_clinica.id) for i in range(3)]
+    session.add_all(leads)
+    session.commit()
+
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    first = client.get("/api/leads/", params={"limit": 2}, headers=headers)
+    assert first.status_code == 200
+    assert [l["id"] for l in first.json()] == [leads[0].id, leads[1].id]
+    second = client.get("/api/leads/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}, headers=headers)
+    assert [l["id"] for l in second.json()] == [leads[2].id]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_read_list_invalid_cursor(client: TestClient, admin_user_token: str):
+    response = client.get(
+        "/api/leads/",
+        params={"cursor": "not-a-cursor"},
+        headers={
+            "Authorization": f"Bearer {admin_user_token}"
+        }
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor inválido"
+
+@pytest.mark.parametrize("path, payload", [
+    ("/api/clinicas/", [{"a": 1}]),
+    ("/api/clinicas/", [[1]]),
+    ("/api/clinicas/", ["x"]),
+    ("/api/clinicas/", [True]),
+    ("/api/clinicas/", [1.5]),
+    ("/api/agendamentos/", ["2024-01-01T00:00:00", {"a": 1}]),
+    ("/api/agendamentos/", [None, 1]),
+])
+def test_read_list_cursor_value_types(client: TestClient, admin_user_token: str, path: str, payload: list):
+    # Cursores bem formados, mas com valores do tipo errado para as colunas da chave
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+    response = client.get(path, params={"cursor": cursor}, headers={"Authorization": f"Bearer {admin_user_token}"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor inválido"
+
+@pytest.mark.parametrize("path", ["/api/leads/", "/api/agendamentos/"])
+@pytest.mark.parametrize("limit", [0, -1, 1001])
+def test_read_list_invalid_limit(client: TestClient, admin_user_token: str, path: str, limit: int):
+    response = client.get(path, params={"limit": limit}, headers={"Authorization": f"Bearer {admin_user_token}"})
+    assert response.status_code == 422
+
+# Tests for tenant scoping via the denormalized clinica_id
+def test_read_lancamentos_financeiros_scoped_by_clinica(client: TestClient, test_clinica: models.Clinica, session: TestingSessionLocal):
+    outra_clinica = models.Clinica(nome="Outra Clinica", endereco="Rua Outra, 1")
+    session.add(outra_clinica)
+    session.commit()
+
+    perfil = models.Perfil(nome="FINANCEIRO")
+    perfil.permissoes.append(models.Permissao(nome="ler_lancamentos_financeiros"))
+    perfil.permissoes.append(models.Permissao(nome="criar_lancamentos_financeiros"))
+    session.add(perfil)
+    session.commit()
+    user = models.User(username="financeiro", email="financeiro@example.com", hashed_password="x", perfil_id=perfil.id, clinica_id=test_clinica.id)
+    session.add(user)
+    session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': user.username})}"}
+
+    session.add(models.LancamentoFinanceiro(tipo="DESPESA", descricao="Aluguel outra", valor=100, data_vencimento=date(2024, 9, 1), clinica_id=outra_clinica.id))
+    session.commit()
+
+    response = client.post(
+        "/api/lancamentos-financeiros/",
+        json={"tipo": "DESPESA", "descricao": "Aluguel", "valor": "1500.00", "data_vencimento": "2024-09-10"},
+        headers=headers
+    )
+    assert response.status_code == 201
+    assert response.json()["clinica_id"] == test_clinica.id
+
+    response = client.get("/api/lancamentos-financeiros/", headers=headers)
+    assert response.status_code == 200
+    assert [l["descricao"] for l in response.json()] == ["Aluguel"]
+
+def test_update_cannot_move_record_to_other_clinica(client: TestClient, test_clinica: models.Clinica, session: TestingSessionLocal):
+    outra_clinica = models.Clinica(nome="Outra Clinica Pais", endereco="Rua Outra, 2")
+    session.add(outra_clinica)
+    session.commit()
+
+    def cadeia(clinica_id, sufixo):
+        paciente = models.Paciente(nome=f"Paciente Pais {sufixo}", cpf=f"777.777.777-{sufixo}", data_nascimento=date(1990, 1, 1), clinica_id=clinica_id)
+        user = models.User(username=f"prof_pais_{sufixo}", email=f"prof_pais_{sufixo}@example.com", hashed_password="x", clinica_id=clinica_id)
+        session.add_all([paciente, user])
+        session.commit()
+        profissional = models.Profissional(user_id=user.id, especialidade="Geral", conselho_profissional="CRM", numero_conselho=f"P{sufixo}")
+        agendamento = models.Agendamento(paciente_id=paciente.id, data=datetime(2024, 9, 2, 10, 0))
+        session.add_all([profissional, agendamento])
+        session.commit()
+        atendimento = models.Atendimento(agendamento_id=agendamento.id)
+        session.add(atendimento)
+        session.commit()
+        comissao = models.Comissao(profissional_id=profissional.id, atendimento_id=atendimento.id, valor=Decimal("10.00"))
+        lancamento = models.LancamentoFinanceiro(tipo="RECEITA", descricao="Sessão", valor=100, data_vencimento=date(2024, 9, 2), atendimento_id=atendimento.id)
+        session.add_all([comissao, lancamento])
+        session.commit()
+        return {"paciente": paciente.id, "profissional": profissional.id, "agendamento": agendamento.id, "atendimento": atendimento.id, "comissao": comissao.id, "lancamento": lancamento.id}
+
+    minha, outra = cadeia(test_clinica.id, "01"), cadeia(outra_clinica.id, "02")
+    perfil = models.Perfil(nome="ATUALIZA_PAIS")
+    for nome in ("atualizar_agendamentos", "atualizar_atendimentos", "atualizar_comissoes", "atualizar_lancamentos_financeiros"):
+        perfil.permissoes.append(models.Permissao(nome=nome))
+    session.add(perfil)
+    session.commit()
+    user = models.User(username="atualiza_pais", email="atualiza_pais@example.com", hashed_password="x", perfil_id=perfil.id, clinica_id=test_clinica.id)
+    session.add(user)
+    session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': user.username})}"}
+
+    tentativas = [
+        (f"/api/agendamentos/{minha['agendamento']}", {"paciente_id": outra["paciente"]}, models.Agendamento, minha["agendamento"]),
+        (f"/api/agendamentos/{minha['agendamento']}", {"profissional_id": outra["profissional"]}, models.Agendamento, minha["agendamento"]),
+        (f"/api/atendimentos/{minha['atendimento']}", {"agendamento_id": outra["agendamento"]}, models.Atendimento, minha["atendimento"]),
+        (f"/api/comissoes/{minha['comissao']}", {"profissional_id": outra["profissional"], "atendimento_id": minha["atendimento"], "valor": "10.00"}, models.Comissao, minha["comissao"]),
+        (f"/api/comissoes/{minha['comissao']}", {"profissional_id": minha["profissional"], "atendimento_id": outra["atendimento"], "valor": "10.00"}, models.Comissao, minha["comissao"]),
+        (f"/api/lancamentos-financeiros/{minha['lancamento']}", {"atendimento_id": outra["atendimento"]}, models.LancamentoFinanceiro, minha["lancamento"]),
+    ]
+    for path, body, model, obj_id in tentativas:
+        response = client.put(path, json=body, headers=headers)
+        assert response.status_code == 403, path
+        session.expire_all()
+        assert session.get(model, obj_id).clinica_id == test_clinica.id
+
+    # Pai inexistente: 404; mantendo os pais atuais a atualização segue normalmente
+    assert client.put(f"/api/atendimentos/{minha['atendimento']}", json={"agendamento_id": 999999}, headers=headers).status_code == 404
+    response = client.put(f"/api/atendimentos/{minha['atendimento']}", json={"agendamento_id": minha["agendamento"], "observacoes": "ok"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["observacoes"] == "ok"
+
+def test_read_agendamentos_filters(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente = models.Paciente(nome="Paciente Filtro", cpf="999.999.999-03", data_nascimento=date(1990, 5, 5), clinica_id=test_clinica.id)
+    user_prof = models.User(username="prof_filtro", email="prof_filtro@example.com", hashed_password="x", clinica_id=test_clinica.id)
+    session.add_all([paciente, user_prof])
+    session.commit()
+    profissional = models.Profissional(user_id=user_prof.id, especialidade="Geral", conselho_profissional="CRM", numero_conselho="999")
+    session.add(profissional)
+    session.commit()
+
+    semana = models.Agendamento(paciente_id=paciente.id, profissional_id=profissional.id, data=datetime(2024, 9, 10, 9, 0), status="AGENDADO", guiche_numero=1)
+    cancelado = models.Agendamento(paciente_id=paciente.id, profissional_id=profissional.id, data=datetime(2024, 9, 11, 9, 0), status="CANCELADO", guiche_numero=2)
+    sem_profissional = models.Agendamento(paciente_id=paciente.id, data=datetime(2024, 9, 12, 9, 0), status="AGENDADO")
+    fora = models.Agendamento(paciente_id=paciente.id, profissional_id=profissional.id, data=datetime(2024, 9, 16, 9, 0), status="AGENDADO")
+    session.add_all([semana, cancelado, sem_profissional, fora])
+    session.commit()
+
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    def ids(**params):
+        response = client.get("/api/agendamentos/", params=params, headers=headers)
+        assert response.status_code == 200
+        return [a["id"] for a in response.json()]
+
+    week = {"start": "2024-09-09T00:00:00", "end": "2024-09-16T00:00:00"}
+    assert ids(**week) == [semana.id, cancelado.id, sem_profissional.id]
+    assert ids(**week, profissional_id=profissional.id) == [semana.id, cancelado.id]
+    assert ids(**week, status="CANCELADO") == [cancelado.id]
+    assert ids(**week, guiche_numero=1) == [semana.id]
+    assert ids(start="2024-09-16T00:00:00") == [fora.id]
+
+    response = client.get("/api/agendamentos/", params={"start": "2024-09-16T00:00:00", "end": "2024-09-09T00:00:00"}, headers=headers)
+    assert response.status_code == 400
+
+# Tests for agendamento conflict detection
+def _conflict_fixtures(session, test_clinica, sufixo):
+    paciente = models.Paciente(nome=f"Paciente Conflito {sufixo}", cpf=f"888.888.888-{sufixo}", data_nascimento=date(1990, 5, 5), clinica_id=test_clinica.id)
+    users = [models.User(username=f"prof_conflito_{sufixo}_{i}", email=f"prof_conflito_{sufixo}_{i}@example.com", hashed_password="x", clinica_id=test_clinica.id) for i in range(2)]
+    session.add_all([paciente, *users])
+    session.commit()
+    profissionais = [models.Profissional(user_id=u.id, especialidade="Geral", conselho_profissional="CRM", numero_conselho=f"{sufixo}{i}") for i, u in enumerate(users)]
+    session.add_all(profissionais)
+    session.commit()
+    return paciente.id, profissionais[0].id, profissionais[1].id
+
+def test_create_agendamento_conflicts(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, prof_b = _conflict_fixtures(session, test_clinica, "01")
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    def post(data, profissional_id=None, guiche_numero=None, status="AGENDADO"):
+        return client.post("/api/agendamentos/", headers=headers, json={
+            "paciente_id": paciente_id, "profissional_id": profissional_id, "data": data, "status": status, "guiche_numero": guiche_numero,
+        })
+
+    primeiro = post("2024-10-01T10:00:00", prof_a, 1)
+    assert primeiro.status_code == 201
+    # tempo_minimo_atendimento da clínica = 30 minutos
+    assert primeiro.json()["data_fim"] == "2024-10-01T10:30:00"
+
+    response = post("2024-10-01T10:15:00", prof_a)
+    assert response.status_code == 409
+    conflitos = response.json()["detail"]["conflitos"]
+    assert [(c["id"], c["motivos"]) for c in conflitos] == [(primeiro.json()["id"], ["profissional"])]
+
+    response = post("2024-10-01T09:45:00", prof_b, 1)
+    assert response.status_code == 409
+    assert response.json()["detail"]["conflitos"][0]["motivos"] == ["guiche"]
+
+    # Encostado no horário anterior, outro guichê, ou cancelado: sem conflito
+    assert post("2024-10-01T10:30:00", prof_a, 1).status_code == 201
+    assert post("2024-10-01T10:00:00", prof_b, 2).status_code == 201
+    assert post("2024-10-01T10:00:00", prof_a, 1, status="CANCELADO").status_code == 201
+    assert post("2024-10-01T10:10:00", prof_a, 1).status_code == 409
+
+def test_agendamento_near_datetime_limits(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, _ = _conflict_fixtures(session, test_clinica, "13")
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    fim_do_calendario = {"paciente_id": paciente_id, "profissional_id": prof_a, "data": "9999-12-31T23:50:00"}
+
+    response = client.post("/api/agendamentos/", headers=headers, json=fim_do_calendario)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Data fora do intervalo suportado"
+
+    response = client.post("/api/agendamentos/batch", headers=headers, json=[fim_do_calendario, {**fim_do_calendario, "data": "9999-12-31T08:00:00"}])
+    assert response.status_code == 207
+    assert [item["indice"] for item in response.json()["itens"]] == [1]
+    assert [(erro["indice"], erro["status_code"]) for erro in response.json()["erros"]] == [(0, 400)]
+
+    # Perto de datetime.min a janela de conflitos é limitada, sem estourar
+    inicio = client.post("/api/agendamentos/", headers=headers, json={**fim_do_calendario, "data": "0001-01-01T01:00:00"})
+    assert inicio.status_code == 201
+    response = client.put(f"/api/agendamentos/{inicio.json()['id']}", headers=headers, json={"data": "9999-12-31T23:45:00"})
+    assert response.status_code == 400
+
+def test_update_agendamento_conflicts(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, prof_b = _conflict_fixtures(session, test_clinica, "02")
+    ocupado = models.Agendamento(paciente_id=paciente_id, profissional_id=prof_a, data=datetime(2024, 10, 2, 14, 0), guiche_numero=1)
+    outro = models.Agendamento(paciente_id=paciente_id, profissional_id=prof_b, data=datetime(2024, 10, 2, 16, 0), data_fim=datetime(2024, 10, 2, 17, 0))
+    session.add_all([ocupado, outro])
+    session.commit()
+    ocupado_id, outro_id = ocupado.id, outro.id
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+
+    # A própria reserva não conta como conflito; a remarcação mantém a duração de 1 hora
+    response = client.put(f"/api/agendamentos/{outro_id}", headers=headers, json={"data": "2024-10-02T16:30:00"})
+    assert response.status_code == 200
+    assert response.json()["data_fim"] == "2024-10-02T17:30:00"
+
+    response = client.put(f"/api/agendamentos/{outro_id}", headers=headers, json={"data": "2024-10-02T13:30:00", "profissional_id": prof_a})
+    assert response.status_code == 409
+    assert [c["id"] for c in response.json()["detail"]["conflitos"]] == [ocupado_id]
+
+    response = client.put(f"/api/agendamentos/{outro_id}", headers=headers, json={"guiche_numero": 1, "data": "2024-10-02T14:20:00"})
+    assert response.status_code == 409
+    assert response.json()["detail"]["conflitos"][0]["motivos"] == ["guiche"]
+
+    # Nada foi gravado pelas tentativas rejeitadas
+    response = client.get(f"/api/agendamentos/{outro_id}", headers=headers)
+    assert response.json()["data"] == "2024-10-02T16:30:00"
+    assert response.json()["profissional_id"] == prof_b
+
+    assert client.put(f"/api/agendamentos/{ocupado_id}", headers=headers, json={"status": "CANCELADO"}).status_code == 200
+    response = client.put(f"/api/agendamentos/{outro_id}", headers=headers, json={"data": "2024-10-02T13:30:00", "profissional_id": prof_a})
+    assert response.status_code == 200
+
+def test_agendamento_guiche_allocation(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, prof_b = _conflict_fixtures(session, test_clinica, "04")
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    def post(data, profissional_id=None, guiche_numero=None):
+        return client.post("/api/agendamentos/", headers=headers, json={"paciente_id": paciente_id, "profissional_id": profissional_id, "data": data, "guiche_numero": guiche_numero})
+
+    # test_clinica tem 2 guichês
+    primeiro = post("2024-10-03T10:00:00", prof_a)
+    assert primeiro.json()["guiche_numero"] == 1
+    segundo = post("2024-10-03T10:15:00", prof_b)
+    assert segundo.json()["guiche_numero"] == 2
+    response = post("2024-10-03T10:20:00")
+    assert response.status_code == 409
+    assert post("2024-10-03T10:30:00").json()["guiche_numero"] == 1
+    assert post("2024-10-03T11:00:00", guiche_numero=3).status_code == 400
+
+    # Remarcação mantém o guichê se ele continuar livre, senão troca
+    response = client.put(f"/api/agendamentos/{segundo.json()['id']}", headers=headers, json={"data": "2024-10-03T12:00:00"})
+    assert response.json()["guiche_numero"] == 2
+    response = client.put(f"/api/agendamentos/{primeiro.json()['id']}", headers=headers, json={"data": "2024-10-03T12:10:00"})
+    assert response.json()["guiche_numero"] == 1
+
+def test_rebalancear_guiches(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, prof_b = _conflict_fixtures(session, test_clinica, "05")
+    def agendamento(hora, minuto, guiche, status="AGENDADO"):
+        return models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 10, 4, hora, minuto), guiche_numero=guiche, status=status)
+    # Guichês lançados à mão: dois no guichê 1 ao mesmo tempo, nenhum no 2
+    ags = [agendamento(9, 0, 1), agendamento(9, 0, 1), agendamento(9, 30, None), agendamento(9, 0, 2, status="CANCELADO"), agendamento(9, 15, 1)]
+    outro_dia = models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 10, 5, 9, 0), guiche_numero=7)
+    session.add_all([*ags, outro_dia])
+    session.commit()
+    ids = [a.id for a in ags]
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+
+    response = client.post("/api/agendamentos/guiches/rebalancear", params={"dia": "2024-10-04", "clinica_id": test_clinica.id}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    # 09:00 (x2) ocupam os 2 guichês; 09:15 excede a capacidade; 09:30 reaproveita o guichê 1
+    assert {a["id"]: a["guiche_numero"] for a in body["alocacao"]} == {ids[0]: 1, ids[1]: 2, ids[2]: 1}
+    assert body["sem_guiche"] == [ids[4]]
+    assert body["alterados"] == 3
+
+    session.expire_all()
+    assert [session.get(models.Agendamento, i).guiche_numero for i in ids] == [1, 2, 1, 2, None]
+    assert session.get(models.Agendamento, outro_dia.id).guiche_numero == 7
+
+    response = client.post("/api/agendamentos/guiches/rebalancear", params={"dia": "2024-10-04"}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.fixture(name="exclusion_trigger")
+def exclusion_trigger_fixture():
+    # Emula no SQLite a exclusion constraint de guichê do Postgres (migration 5d8e3b1f7a26), verificada linha a linha
+    with engine.begin() as conn:
+        conn.exec_driver_sql("""
+            CREATE TRIGGER ex_agendamentos_guiche_horario BEFORE UPDATE OF guiche_numero ON agendamentos
+            WHEN NEW.guiche_numero IS NOT NULL AND NEW.status <> 'CANCELADO' AND EXISTS (
+                SELECT 1 FROM agendamentos a WHERE a.id <> NEW.id AND a.clinica_id = NEW.clinica_id AND a.guiche_numero = NEW.guiche_numero
+                AND a.status <> 'CANCELADO' AND a.data < NEW.data_fim AND a.data_fim > NEW.data)
+            BEGIN SELECT RAISE(ABORT, 'ex_agendamentos_guiche_horario'); END
+        """)
+    yield
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TRIGGER ex_agendamentos_guiche_horario")
+
+def test_rebalancear_guiches_swap_under_exclusion_constraint(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal, exclusion_trigger, monkeypatch):
+    paciente_id, _, _ = _conflict_fixtures(session, test_clinica, "14")
+    # O alocador quer o primeiro no guichê 1 e o segundo no 2: uma troca entre agendamentos sobrepostos
+    primeiro = models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 10, 7, 9, 0), guiche_numero=2)
+    segundo = models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 10, 7, 9, 0), guiche_numero=1)
+    session.add_all([primeiro, segundo])
+    session.commit()
+    ids = [primeiro.id, segundo.id]
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    params = {"dia": "2024-10-07", "clinica_id": test_clinica.id}
+
+    response = client.post("/api/agendamentos/guiches/rebalancear", params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["alterados"] == 2
+    session.expire_all()
+    assert [session.get(models.Agendamento, i).guiche_numero for i in ids] == [1, 2]
+
+    # Violação que sobra (reserva concorrente) vira 409 e nada é gravado
+    monkeypatch.setattr(agenda, "particionar_guiches", lambda intervalos, num_guiches: ({ids[0]: 2, ids[1]: 2}, []))
+    monkeypatch.setattr(agenda, "_violacao_de_exclusao", lambda exc: True)
+    response = client.post("/api/agendamentos/guiches/rebalancear", params=params, headers=headers)
+    assert response.status_code == 409
+    session.expire_all()
+    assert [session.get(models.Agendamento, i).guiche_numero for i in ids] == [1, 2]
+
+def test_create_agendamentos_recorrentes(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, prof_b = _conflict_fixtures(session, test_clinica, "06")
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    serie = {"paciente_id": paciente_id, "profissional_id": prof_a, "data": "2024-11-05T15:00:00", "frequencia": "SEMANAL", "ocorrencias": 8}
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.post("/api/agendamentos/recorrentes", json=serie, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 201
+    criados = response.json()
+    assert [a["data"] for a in criados] == [f"2024-{m:02d}-{d:02d}T15:00:00" for m, d in [(11, 5), (11, 12), (11, 19), (11, 26), (12, 3), (12, 10), (12, 17), (12, 24)]]
+    assert {(a["data_fim"][11:], a["guiche_numero"], a["clinica_id"]) for a in criados} == {("15:30:00", 1, test_clinica.id)}
+    # validação dos pais, clínica, conflitos da série inteira e um único INSERT; o SQLite não consegue ordenar o
+    # RETURNING de um INSERT de várias linhas (sort_by_parameter_order) e faz um INSERT por ocorrência
+    inserts = 1 if engine.dialect.insertmanyvalues_implicit_sentinel & InsertmanyvaluesSentinelOpts.ANY_AUTOINCREMENT else len(criados)
+    assert len([s for s in statements if s.startswith("INSERT INTO agendamentos")]) == inserts
+    assert len([s for s in statements if "FROM agendamentos" in s]) == 1
+
+    # Uma ocorrência em conflito rejeita a série toda
+    quinzenal = {**serie, "data": "2024-11-05T15:15:00", "intervalo": 2, "ocorrencias": None, "ate": "2024-12-31"}
+    response = client.post("/api/agendamentos/recorrentes", json=quinzenal, headers=headers)
+    assert response.status_code == 409
+    assert [c["data"] for c in response.json()["detail"]["conflitos"]] == ["2024-11-05T15:00:00", "2024-11-19T15:00:00", "2024-12-03T15:00:00", "2024-12-17T15:00:00"]
+    response = client.post("/api/agendamentos/recorrentes", json={**quinzenal, "profissional_id": prof_b}, headers=headers)
+    assert response.status_code == 201
+    assert [a["guiche_numero"] for a in response.json()] == [2, 2, 2, 2, 2]
+    assert session.query(models.Agendamento).filter(models.Agendamento.paciente_id == paciente_id).count() == 13
+
+    assert client.post("/api/agendamentos/recorrentes", json={**serie, "ocorrencias": None}, headers=headers).status_code == 400
+    assert client.post("/api/agendamentos/recorrentes", json={**serie, "ocorrencias": 500}, headers=headers).status_code == 422
+    assert client.post("/api/agendamentos/recorrentes", json={**serie, "intervalo": 10**6}, headers=headers).status_code == 422
+    # Limitada só por `ate`, a série para de gerar datas logo depois do máximo
+    diaria = {**serie, "frequencia": "DIARIA", "ocorrencias": None, "ate": "9999-12-31"}
+    assert client.post("/api/agendamentos/recorrentes", json=diaria, headers=headers).status_code == 400
+
+    # Perto do fim do calendário: a série cabe ou é recusada com 400, nunca 500
+    fim = {**serie, "data": "9999-12-20T15:00:00", "ocorrencias": 2}
+    response = client.post("/api/agendamentos/recorrentes", json=fim, headers=headers)
+    assert response.status_code == 201
+    assert [a["data"] for a in response.json()] == ["9999-12-20T15:00:00", "9999-12-27T15:00:00"]
+    response = client.post("/api/agendamentos/recorrentes", json={**fim, "data": "9999-12-21T15:00:00", "ocorrencias": 3}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Data fora do intervalo suportado"
+    response = client.post("/api/agendamentos/recorrentes", json={**fim, "data": "9999-12-21T15:00:00", "ocorrencias": None, "ate": "9999-12-31"}, headers=headers)
+    assert [a["data"] for a in response.json()] == ["9999-12-21T15:00:00", "9999-12-28T15:00:00"]
+    response = client.post("/api/agendamentos/recorrentes", json={**fim, "data": "9999-12-31T23:50:00", "ocorrencias": 1}, headers=headers)
+    assert response.status_code == 400
+
+# Tests for /agendamentos/slots endpoint
+def test_read_horarios_livres(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, prof_b = _conflict_fixtures(session, test_clinica, "03")
+    # 10 horas semanais: expediente de 08:00 às 10:00 nos dias úteis
+    session.query(models.Profissional).filter(models.Profissional.id.in_([prof_a, prof_b])).update({"carga_horaria_semanal": 10})
+    tipo = models.TipoTratamento(clinica_id=test_clinica.id, nome="Sessão longa", tempo_minimo_atendimento=60)
+    session.add_all([
+        tipo,
+        models.Agendamento(paciente_id=paciente_id, profissional_id=prof_a, data=datetime(2024, 10, 1, 8, 30)),
+        models.Agendamento(paciente_id=paciente_id, profissional_id=prof_b, data=datetime(2024, 10, 1, 8, 0), status="CANCELADO"),
+        # os dois guichês da clínica ocupados às 09:30
+        models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 10, 1, 9, 30), guiche_numero=1),
+        models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 10, 1, 9, 30), guiche_numero=2),
+    ])
+    session.commit()
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    window = {"start": "2024-10-01T00:00:00", "end": "2024-10-02T00:00:00", "clinica_id": test_clinica.id}
+
+    response = client.get("/api/agendamentos/slots", params=window, headers=headers)
+    assert response.status_code == 200
+    livres = [(h["profissional_id"], h["inicio"][11:16]) for h in response.json()]
+    assert livres == [(prof_a, "08:00"), (prof_b, "08:00"), (prof_b, "08:30"), (prof_a, "09:00"), (prof_b, "09:00")]
+
+    response = client.get("/api/agendamentos/slots", params={**window, "tipo_tratamento_id": tipo.id, "profissional_id": [prof_a, prof_b]}, headers=headers)
+    assert [(h["profissional_id"], h["inicio"][11:16], h["fim"][11:16]) for h in response.json()] == [(prof_b, "08:00", "09:00"), (prof_b, "08:30", "09:30")]
+
+    # Sábado: fora do expediente
+    response = client.get("/api/agendamentos/slots", params={**window, "start": "2024-10-05T00:00:00", "end": "2024-10-06T00:00:00"}, headers=headers)
+    assert response.json() == []
+
+    assert client.get("/api/agendamentos/slots", params={"start": "2024-10-01T00:00:00"}, headers=headers).status_code == 400
+    assert client.get("/api/agendamentos/slots", params={**window, "end": "2024-12-01T00:00:00"}, headers=headers).status_code == 400
+    assert client.get("/api/agendamentos/slots", params={**window, "profissional_id": 9999}, headers=headers).status_code == 404
+
+    # Perto dos limites do calendário: 400 em vez de estourar o datetime
+    response = client.get("/api/agendamentos/slots", params={"start": "9999-12-30T00:00:00", "clinica_id": test_clinica.id}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Data fora do intervalo suportado"
+    for start, end in [("9999-12-30T00:00:00", "9999-12-31T12:00:00"), ("0001-01-01T00:00:00", "0001-01-02T00:00:00")]:
+        assert client.get("/api/agendamentos/slots", params={**window, "start": start, "end": end}, headers=headers).status_code == 400
+    response = client.get("/api/agendamentos/slots", params={**window, "start": "9999-12-30T00:00:00", "end": "9999-12-30T23:00:00"}, headers=headers)
+    assert [(h["profissional_id"], h["inicio"]) for h in response.json()][:2] == [(prof_a, "9999-12-30T08:00:00"), (prof_b, "9999-12-30T08:00:00")]
+
+# Tests for /profissional/agenda endpoint
+def test_read_profissional_agenda(client: TestClient, test_clinica: models.Clinica, session: TestingSessionLocal):
+    perfil = models.Perfil(nome="PROFISSIONAL_AGENDA")
+    perfil.permissoes.append(models.Permissao(nome="profissional_acesso"))
+    session.add(perfil)
+    session.commit()
+    users = [models.User(username=f"prof_agenda_{i}", email=f"prof_agenda_{i}@example.com", hashed_password="x", perfil_id=perfil.id, clinica_id=test_clinica.id) for i in range(2)]
+    paciente = models.Paciente(nome="Paciente Agenda", cpf="999.999.999-04", data_nascimento=date(1990, 6, 6), clinica_id=test_clinica.id)
+    session.add_all(users + [paciente])
+    session.commit()
+    profissionais = [models.Profissional(user_id=u.id, especialidade="Geral", conselho_profissional="CRM", numero_conselho=f"A{u.id}") for u in users]
+    session.add_all(profissionais)
+    session.commit()
+
+    atendido = models.Agendamento(paciente_id=paciente.id, profissional_id=profissionais[0].id, data=datetime(2024, 9, 10, 9, 0), status="CONCLUIDO")
+    pendente = models.Agendamento(paciente_id=paciente.id, profissional_id=profissionais[0].id, data=datetime(2024, 9, 10, 10, 0), status="AGENDADO", guiche_numero=2)
+    outro_profissional = models.Agendamento(paciente_id=paciente.id, profissional_id=profissionais[1].id, data=datetime(2024, 9, 10, 11, 0))
+    fora_do_periodo = models.Agendamento(paciente_id=paciente.id, profissional_id=profissionais[0].id, data=datetime(2024, 9, 20, 9, 0))
+    session.add_all([atendido, pendente, outro_profissional, fora_do_periodo])
+    session.commit()
+    session.add(models.Atendimento(agendamento_id=atendido.id, status="FINALIZADO"))
+    session.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': users[0].username})}"}
+    params = {"start": "2024-09-09T00:00:00", "end": "2024-09-16T00:00:00"}
+    try:
+        response = client.get("/api/profissional/agenda/", params=params, headers=headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    assert len([s for s in statements if "FROM agendamentos" in s]) == 1
+    assert response.json() == [
+        {"id": atendido.id, "data": "2024-09-10T09:00:00", "status": "CONCLUIDO", "guiche_numero": None, "paciente_id": paciente.id,
+         "paciente_nome": "Paciente Agenda", "atendimento_id": atendido.atendimento.id, "atendimento_status": "FINALIZADO"},
+        {"id": pendente.id, "data": "2024-09-10T10:00:00", "status": "AGENDADO", "guiche_numero": 2, "paciente_id": paciente.id,
+         "paciente_nome": "Paciente Agenda", "atendimento_id": None, "atendimento_status": None},
+    ]
+
+    # Período padrão que passaria do fim do calendário
+    assert client.get("/api/profissional/agenda/", params={"start": "9999-12-30T00:00:00"}, headers=headers).status_code == 400
+
+    # Polling sem mudanças é respondido com 304
+    etag = response.headers["ETag"]
+    cached = client.get("/api/profissional/agenda/", params=params, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    pendente.status = "CANCELADO"
+    session.commit()
+    changed = client.get("/api/profissional/agenda/", params=params, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_read_profissional_agenda_invalid_range(client: TestClient, admin_user_token: str):
+    response = client.get(
+        "/api/profissional/agenda/",
+        params={"start": "2024-09-01T00:00:00", "end": "2024-12-01T00:00:00"},
+        headers={"Authorization": f"Bearer {admin_user_token}"}
+    )
+    assert response.status_code == 400
+
+# Tests for /{resource}/batch endpoints
+@contextmanager
+def _statements():
+    """SQL enviado ao banco e, para cada INSERT, quantas linhas foram passadas em uma única execução."""
+    statements, inserts = [], []
+    def cursor_listener(conn, cursor, statement, *args):
+        statements.append(statement)
+    def insert_listener(conn, clause, multiparams, *args):
+        if clause.is_insert:
+            inserts.append(len(multiparams))
+    event.listen(engine, "before_cursor_execute", cursor_listener)
+    event.listen(engine, "before_execute", insert_listener)
+    try:
+        yield statements, inserts
+    finally:
+        event.remove(engine, "before_cursor_execute", cursor_listener)
+        event.remove(engine, "before_execute", insert_listener)
+
+def test_pacientes_batch(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    session.add(models.Paciente(nome="Paciente Existente", cpf="777.777.777-00", data_nascimento=date(1980, 1, 1), clinica_id=test_clinica.id))
+    session.commit()
+    pacientes = [
+        {"nome": f"Paciente Lote {i}", "cpf": f"777.777.777-{i:02d}", "data_nascimento": "1990-01-01", "clinica_id": test_clinica.id}
+        for i in range(1, 6)
+    ]
+    pacientes.append({**pacientes[0], "nome": "CPF repetido no lote"})
+    pacientes.append({**pacientes[0], "cpf": "777.777.777-00"})
+
+    with _statements() as (statements, inserts):
+        response = client.post("/api/pacientes/batch", json=pacientes, headers=headers)
+    assert response.status_code == 207
+    resultado = response.json()
+    assert [item["indice"] for item in resultado["itens"]] == [0, 1, 2, 3, 4]
+    assert resultado["itens"][0]["registro"]["id"] is not None
+    assert resultado["itens"][4]["registro"]["cpf"] == "777.777.777-05"
+    assert [(e["indice"], e["status_code"], e["detail"]) for e in resultado["erros"]] == [(5, 409, "CPF já cadastrado"), (6, 409, "CPF já cadastrado")]
+    # uma consulta IN para os CPFs e um único INSERT (o SQLite executa uma linha por vez para manter a ordem do RETURNING)
+    assert len([s for s in statements if s.startswith("SELECT pacientes.cpf")]) == 1
+    assert inserts == [len(pacientes) - 2]
+
+    ids = [item["registro"]["id"] for item in resultado["itens"]]
+    response = client.patch("/api/pacientes/batch", headers=headers, json=[
+        {"id": ids[0], "nome": "Paciente Lote 1", "telefone": "11 99999-0000"},
+        {"id": ids[1], "nome": "Paciente Lote 2", "cpf": "777.777.777-00"},
+        {"id": ids[2], "nome": "Paciente Lote 3", "cpf": "777.777.777-03"},
+        {"id": 999999, "nome": "Inexistente"},
+        {"id": ids[0], "nome": "Repetido"},
+    ])
+    assert response.status_code == 207
+    resultado = response.json()
+    # telefone não enviado recebe o default da coluna, como no cadastro individual
+    assert [(item["indice"], item["registro"]["telefone"]) for item in resultado["itens"]] == [(0, "11 99999-0000"), (2, "")]
+    assert [(e["indice"], e["status_code"]) for e in resultado["erros"]] == [(1, 409), (3, 404), (4, 400)]
+    session.expire_all()
+    assert session.get(models.Paciente, ids[0]).nome == "Paciente Lote 1"
+    assert session.get(models.Paciente, ids[1]).cpf == "777.777.777-02"
+
+    assert client.post("/api/pacientes/batch", json=[], headers=headers).status_code == 400
+
+def test_pacientes_batch_other_clinica(client: TestClient, common_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    common_user = session.query(models.User).filter(models.User.username == "commonuser").first()
+    common_user.perfil.permissoes.append(models.Permissao(nome="criar_pacientes"))
+    outra = models.Clinica(nome="Outra Clínica Lote", endereco="Rua do Lote, 1")
+    session.add(outra)
+    session.commit()
+    pacientes = [
+        {"nome": "Paciente Própria", "cpf": "777.777.778-01", "data_nascimento": "1990-01-01", "clinica_id": common_user.clinica_id},
+        {"nome": "Paciente Alheia", "cpf": "777.777.778-02", "data_nascimento": "1990-01-01", "clinica_id": outra.id},
+    ]
+    response = client.post("/api/pacientes/batch", json=pacientes, headers={"Authorization": f"Bearer {common_user_token}"})
+    assert response.status_code == 207
+    resultado = response.json()
+    assert [item["indice"] for item in resultado["itens"]] == [0]
+    assert [(e["indice"], e["status_code"]) for e in resultado["erros"]] == [(1, 403)]
+
+def test_lancamentos_financeiros_batch(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    lancamento = {"tipo": "RECEITA", "descricao": "Lote", "valor": "150.00", "data_vencimento": "2024-10-10"}
+    response = client.post("/api/lancamentos-financeiros/batch", headers=headers, json=[lancamento, {**lancamento, "atendimento_id": 999999}, {**lancamento, "tipo": "DESPESA"}])
+    assert response.status_code == 207
+    resultado = response.json()
+    assert [(item["indice"], item["registro"]["tipo"]) for item in resultado["itens"]] == [(0, "RECEITA"), (2, "DESPESA")]
+    assert [(e["indice"], e["status_code"], e["detail"]) for e in resultado["erros"]] == [(1, 404, "Atendimento not found")]
+
+    ids = [item["registro"]["id"] for item in resultado["itens"]]
+    response = client.patch("/api/lancamentos-financeiros/batch", headers=headers, json=[{"id": ids[0], "data_pagamento": "2024-10-09"}, {"id": ids[1], "atendimento_id": 999999}])
+    assert response.status_code == 207
+    resultado = response.json()
+    assert [(item["indice"], item["registro"]["data_pagamento"]) for item in resultado["itens"]] == [(0, "2024-10-09")]
+    assert [(e["indice"], e["status_code"]) for e in resultado["erros"]] == [(1, 404)]
+
+def test_leads_batch(client: TestClient, admin_user_token: str, test_clinica: models.Clinica):
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    response = client.post("/api/leads/batch", headers=headers, json=[{"nome": f"Lead Lote {i}", "clinica_id": test_clinica.id} for i in range(3)])
+    assert response.status_code == 207
+    ids = [item["registro"]["id"] for item in response.json()["itens"]]
+    assert len(ids) == 3 and response.json()["erros"] == []
+    response = client.patch("/api/leads/batch", headers=headers, json=[{"id": lead_id, "nome": "Lead Atualizado"} for lead_id in ids])
+    assert response.status_code == 207
+    assert {item["registro"]["nome"] for item in response.json()["itens"]} == {"Lead Atualizado"}
+
+def test_agendamentos_batch(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, prof_b = _conflict_fixtures(session, test_clinica, "07")
+    existente = models.Agendamento(paciente_id=paciente_id, profissional_id=prof_a, data=datetime(2024, 11, 4, 9, 0), guiche_numero=1)
+    session.add(existente)
+    session.commit()
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    def item(data, profissional_id, **kwargs):
+        return {"paciente_id": paciente_id, "profissional_id": profissional_id, "data": data, **kwargs}
+
+    with _statements() as (statements, inserts):
+        response = client.post("/api/agendamentos/batch", headers=headers, json=[
+            item("2024-11-04T09:00:00", prof_b),
+            item("2024-11-04T09:15:00", prof_a),             # conflita com o agendamento existente
+            item("2024-11-04T09:10:00", prof_b),             # conflita com o item 0
+            item("2024-11-04T09:00:00", None),               # os dois guichês já ocupados
+            item("2024-11-04T09:00:00", prof_a, status="CANCELADO"),
+            item("2024-11-04T10:00:00", 999999),
+            item("2024-11-04T10:00:00", prof_a),
+        ])
+    assert response.status_code == 207
+    resultado = response.json()
+    registros = {item["indice"]: item["registro"] for item in resultado["itens"]}
+    assert sorted(registros) == [0, 4, 6]
+    assert (registros[0]["guiche_numero"], registros[0]["data_fim"]) == (2, "2024-11-04T09:30:00")
+    assert registros[6]["guiche_numero"] == 1
+    erros = {e["indice"]: e for e in resultado["erros"]}
+    assert {i: e["status_code"] for i, e in erros.items()} == {1: 409, 2: 409, 3: 409, 5: 404}
+    assert [c["profissional_id"] for c in erros[1]["detail"]["conflitos"]] == [prof_a]
+    assert erros[2]["detail"]["message"] == "Horário indisponível: conflito com outro item do lote"
+    # pais em uma consulta IN por modelo, conflitos em uma consulta e um único INSERT
+    assert inserts == [3]
+    assert len([s for s in statements if "FROM agendamentos" in s]) == 1
+
+    # Trocar dois agendamentos de horário no mesmo lote
+    response = client.patch("/api/agendamentos/batch", headers=headers, json=[
+        {"id": registros[0]["id"], "data": "2024-11-04T10:00:00"},
+        {"id": registros[6]["id"], "data": "2024-11-04T09:00:00", "profissional_id": prof_b},
+        {"id": registros[4]["id"], "profissional_id": 999999},
+        {"id": existente.id, "profissional_id": prof_b},  # prof_b acabou de ser remarcado para 09:00
+    ])
+    assert response.status_code == 207
+    resultado = response.json()
+    assert [(item["indice"], item["registro"]["data"], item["registro"]["guiche_numero"]) for item in resultado["itens"]] == [
+        (0, "2024-11-04T10:00:00", 2), (1, "2024-11-04T09:00:00", 2),
+    ]
+    assert [(e["indice"], e["status_code"]) for e in resultado["erros"]] == [(2, 404), (3, 409)]
+    session.expire_all()
+    assert session.get(models.Agendamento, existente.id).profissional_id == prof_a
+    assert session.get(models.Agendamento, registros[4]["id"]).profissional_id == prof_a
+
+# Endpoints de escrita: o registro gravado é devolvido sem um SELECT depois do INSERT/UPDATE
+def test_write_endpoints_statement_count(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, _ = _conflict_fixtures(session, test_clinica, "08")
+    lead = models.Lead(nome="Lead Escrita", clinica_id=test_clinica.id)
+    session.add(lead)
+    session.commit()
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    # o principal fica em cache depois da primeira requisição
+    client.get("/api/users/me", headers=headers)
+
+    casos = [
+        # (método, url, payload, tabela, comandos: o INSERT; ou a leitura do registro e o UPDATE)
+        ("post", "/api/clinicas/", {"nome": "Clínica Escrita", "endereco": "Rua A, 1"}, "clinicas", 1),
+        ("post", "/api/pacientes/", {"nome": "Paciente Escrita", "cpf": "555.555.555-08", "data_nascimento": "1990-01-01", "clinica_id": test_clinica.id}, "pacientes", 1),
+        ("put", f"/api/pacientes/{paciente_id}", {"nome": "Paciente Conflito Renomeado"}, "pacientes", 2),
+        ("post", "/api/leads/", {"nome": "Lead Novo", "clinica_id": test_clinica.id}, "leads", 1),
+        ("put", f"/api/leads/{lead.id}", {"nome": "Lead Renomeado"}, "leads", 2),
+        ("post", "/api/lancamentos-financeiros/", {"tipo": "RECEITA", "descricao": "Avulso", "valor": "10.00", "data_vencimento": "2024-10-10"}, "lancamentos_financeiros", 1),
+        # pais, parâmetros da clínica e conflitos antes do INSERT
+        ("post", "/api/agendamentos/", {"paciente_id": paciente_id, "profissional_id": prof_a, "data": "2024-12-02T10:00:00"}, "agendamentos", 4),
+    ]
+    for method, url, payload, tabela, comandos in casos:
+        with _statements() as (statements, _):
+            response = getattr(client, method)(url, json=payload, headers=headers)
+        assert response.status_code in (200, 201), (url, response.text)
+        assert response.json()["id"] is not None
+        escrita = max(i for i, s in enumerate(statements) if s.startswith((f"INSERT INTO {tabela}", f"UPDATE {tabela}")))
+        assert statements[escrita + 1:] == [], (url, statements)
+        assert len(statements) == comandos, (url, statements)
+
+# Tests for /prontuarios: listagem resumida e conteúdo clínico só no detalhe
+def test_prontuarios_list_and_detail(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente = models.Paciente(nome="Paciente Prontuario", cpf="444.444.444-01", data_nascimento=date(1985, 5, 5), clinica_id=test_clinica.id)
+    tipo = models.TipoTratamento(nome="Fisioterapia Prontuario", clinica_id=test_clinica.id)
+    session.add_all([paciente, tipo])
+    session.commit()
+    prontuario = models.Prontuario(paciente_id=paciente.id, tipo_tratamento_definido_id=tipo.id, queixa_principal="Dor lombar",
+                                   evolucao_clinica="Melhora progressiva")
+    session.add(prontuario)
+    session.commit()
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    client.get("/api/users/me", headers=headers)
+
+    with _statements() as (statements, _):
+        response = client.get("/api/prontuarios/", headers=headers)
+    assert response.status_code == 200
+    item = next(p for p in response.json() if p["id"] == prontuario.id)
+    assert item == {
+        "id": prontuario.id,
+        "paciente_id": paciente.id,
+        "paciente_nome": "Paciente Prontuario",
+        "data_criacao": prontuario.data_criacao.isoformat(),
+        "tipo_tratamento_definido_id": tipo.id,
+        "tipo_tratamento_nome": "Fisioterapia Prontuario",
+        "editavel": True,
+        "is_finalized": False,
+    }
+    # Uma consulta, sem as colunas Text
+    assert len(statements) == 1
+    assert "queixa_principal" not in statements[0] and "evolucao_clinica" not in statements[0]
+
+    with _statements() as (statements, _):
+        response = client.get(f"/api/prontuarios/{prontuario.id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["queixa_principal"] == "Dor lombar"
+    assert response.json()["evolucao_clinica"] == "Melhora progressiva"
+    assert len(statements) == 1
+
+    with _statements() as (statements, _):
+        response = client.put(f"/api/prontuarios/{prontuario.id}", json={"paciente_id": paciente.id, "is_finalized": True}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["is_finalized"] is True
+    assert response.json()["queixa_principal"] == "Dor lombar"
+    # leitura do registro (com o conteúdo) e o UPDATE
+    assert len(statements) == 2
+
+def test_read_prontuarios_scoped_by_clinica(client: TestClient, test_clinica: models.Clinica, session: TestingSessionLocal):
+    outra_clinica = models.Clinica(nome="Clinica Prontuario Alheia", endereco="Rua P, 1")
+    perfil = models.Perfil(nome="PRONTUARIOS")
+    perfil.permissoes.append(models.Permissao(nome="ler_prontuarios"))
+    session.add_all([outra_clinica, perfil])
+    session.commit()
+    user = models.User(username="prontuarios", email="prontuarios@example.com", hashed_password="x", perfil_id=perfil.id, clinica_id=test_clinica.id)
+    proprio = models.Paciente(nome="Paciente Proprio", cpf="444.444.444-02", data_nascimento=date(1985, 5, 5), clinica_id=test_clinica.id)
+    alheio = models.Paciente(nome="Paciente Alheio", cpf="444.444.444-03", data_nascimento=date(1985, 5, 5), clinica_id=outra_clinica.id)
+    session.add_all([user, proprio, alheio])
+    session.commit()
+    session.add_all([models.Prontuario(paciente_id=proprio.id), models.Prontuario(paciente_id=alheio.id)])
+    session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': user.username})}"}
+
+    response = client.get("/api/prontuarios/", headers=headers)
+    assert response.status_code == 200
+    assert [p["paciente_nome"] for p in response.json()] == ["Paciente Proprio"]
+
+# Tests for fields= / include=
+# Serializar os objetos ORM sem validar gera avisos do pydantic
+@pytest.mark.filterwarnings("error")
+def test_read_agendamentos_fields_include(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, _ = _conflict_fixtures(session, test_clinica, "09")
+    primeiro = models.Agendamento(paciente_id=paciente_id, profissional_id=prof_a, data=datetime(2024, 11, 4, 9, 0), clinica_id=test_clinica.id)
+    segundo = models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 11, 4, 10, 0), clinica_id=test_clinica.id)
+    session.add_all([primeiro, segundo])
+    session.commit()
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    client.get("/api/users/me", headers=headers)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    params = {
+        "start": "2024-11-04T00:00:00", "end": "2024-11-05T00:00:00", "limit": 1,
+        "fields": "data,status,paciente.nome,profissional.especialidade,profissional.user.username",
+        "include": "paciente,profissional.user",
+    }
+    try:
+        response = client.get("/api/agendamentos/", params=params, headers=headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    assert response.json() == [{
+        "id": primeiro.id, "data": "2024-11-04T09:00:00", "status": "AGENDADO",
+        "paciente": {"id": paciente_id, "nome": "Paciente Conflito 09"},
+        "profissional": {"id": prof_a, "especialidade": "Geral", "user": {"id": primeiro.profissional.user_id, "username": "prof_conflito_09_0"}},
+    }]
+    # Relações no mesmo SELECT, só com as colunas pedidas
+    assert len(statements) == 1
+    assert "cpf" not in statements[0] and "hashed_password" not in statements[0] and "guiche_numero" not in statements[0]
+
+    # A paginação continua valendo com a seleção
+    params["cursor"] = response.headers["X-Next-Cursor"]
+    response = client.get("/api/agendamentos/", params=params, headers=headers)
+    assert response.json() == [{"id": segundo.id, "data": "2024-11-04T10:00:00", "status": "AGENDADO",
+                                "paciente": {"id": paciente_id, "nome": "Paciente Conflito 09"}, "profissional": None}]
+
+@pytest.mark.filterwarnings("error")
+def test_read_comissoes_fields_include(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, _ = _conflict_fixtures(session, test_clinica, "10")
+    agendamento = models.Agendamento(paciente_id=paciente_id, profissional_id=prof_a, data=datetime(2024, 11, 5, 9, 0), clinica_id=test_clinica.id)
+    session.add(agendamento)
+    session.commit()
+    atendimento = models.Atendimento(agendamento_id=agendamento.id, clinica_id=test_clinica.id)
+    session.add(atendimento)
+    session.commit()
+    comissao = models.Comissao(profissional_id=prof_a, atendimento_id=atendimento.id, valor=Decimal("35.50"), clinica_id=test_clinica.id)
+    session.add(comissao)
+    session.commit()
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    client.get("/api/users/me", headers=headers)
+
+    with _statements() as (statements, _):
+        response = client.get(f"/api/comissoes/{comissao.id}", params={"fields": "valor,paga,profissional.user.username", "include": "profissional.user"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {
+        "id": comissao.id, "valor": "35.50", "paga": False,
+        "profissional": {"id": prof_a, "user_id": comissao.profissional.user_id, "especialidade": "Geral", "conselho_profissional": "CRM",
+                         "numero_conselho": "100", "carga_horaria_semanal": 40, "comissao_percentual": "0.00",
+                         "user": {"id": comissao.profissional.user_id, "username": "prof_conflito_10_0"}},
+    }
+    assert len(statements) == 1
+
+    # Sem fields/include a resposta é a de sempre
+    response = client.get(f"/api/comissoes/{comissao.id}", headers=headers)
+    assert set(response.json()) == {"id", "profissional_id", "atendimento_id", "valor", "paga", "clinica_id"}
+
+def test_fields_include_invalid(client: TestClient, admin_user_token: str):
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+    casos = [
+        ({"fields": "id,senha"}, "Campo inválido: senha"),
+        ({"include": "clinica"}, "Relação inválida: clinica"),
+        ({"fields": "profissional.user.hashed_password", "include": "profissional.user"}, "Campo inválido: profissional.user.hashed_password"),
+        ({"fields": "paciente.nome"}, "Campo de relação não incluída: paciente.nome"),
+    ]
+    for params, detail in casos:
+        response = client.get("/api/comissoes/", params=params, headers=headers)
+        assert response.status_code == 400, params
+        assert response.json()["detail"] == detail
+
+# Tests for /{resource}/export
+def _export_user(session, clinica_id, *permissoes):
+    perfil = models.Perfil(nome="EXPORTACAO")
+    perfil.permissoes.extend(models.Permissao(nome=nome) for nome in permissoes)
+    session.add(perfil)
+    session.commit()
+    user = models.User(username="exportacao", email="exportacao@example.com", hashed_password="x", perfil_id=perfil.id, clinica_id=clinica_id)
+    session.add(user)
+    session.commit()
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': user.username})}"}
+
+def test_export_agendamentos_csv(client: TestClient, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, _ = _conflict_fixtures(session, test_clinica, "11")
+    outra_clinica = models.Clinica(nome="Clinica Exportacao Alheia", endereco="Rua E, 1")
+    session.add(outra_clinica)
+    session.commit()
+    agendamentos = [
+        models.Agendamento(paciente_id=paciente_id, profissional_id=prof_a, data=datetime(2024, 9, 2, 9, 0), clinica_id=test_clinica.id),
+        models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 9, 1, 8, 30), status="CANCELADO", guiche_numero=2, clinica_id=test_clinica.id),
+        # fora do período e de outra clínica
+        models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 10, 1, 8, 0), clinica_id=test_clinica.id),
+        models.Agendamento(paciente_id=paciente_id, data=datetime(2024, 9, 3, 8, 0), clinica_id=outra_clinica.id),
+    ]
+    session.add_all(agendamentos)
+    session.commit()
+    headers = _export_user(session, test_clinica.id, "ler_agendamentos")
+
+    response = client.get("/api/agendamentos/export", params={"start": "2024-09-01T00:00:00", "end": "2024-10-01T00:00:00"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"] == f'attachment; filename="agendamentos-clinica-{test_clinica.id}-20240901.csv"'
+    assert response.text.splitlines() == [
+        "id,paciente_id,profissional_id,data,status,guiche_numero,data_fim,clinica_id",
+        f"{agendamentos[1].id},{paciente_id},,2024-09-01T08:30:00,CANCELADO,2,2024-09-01T09:00:00,{test_clinica.id}",
+        f"{agendamentos[0].id},{paciente_id},{prof_a},2024-09-02T09:00:00,AGENDADO,,2024-09-02T09:30:00,{test_clinica.id}",
+    ]
+
+    # Outra clínica, intervalo invertido
+    assert client.get("/api/agendamentos/export", params={"clinica_id": outra_clinica.id}, headers=headers).status_code == 403
+    response = client.get("/api/agendamentos/export", params={"start": "2024-10-01T00:00:00", "end": "2024-09-01T00:00:00"}, headers=headers)
+    assert response.status_code == 400
+
+def test_export_comissoes_and_lancamentos_ndjson(client: TestClient, admin_user_token: str, test_clinica: models.Clinica, session: TestingSessionLocal):
+    paciente_id, prof_a, _ = _conflict_fixtures(session, test_clinica, "12")
+    agendamentos = [models.Agendamento(paciente_id=paciente_id, profissional_id=prof_a, data=datetime(2024, 9, d, 9, 0), clinica_id=test_clinica.id) for d in (2, 30)]
+    session.add_all(agendamentos)
+    session.commit()
+    atendimentos = [models.Atendimento(agendamento_id=a.id, data_inicio=a.data, clinica_id=test_clinica.id) for a in agendamentos]
+    session.add_all(atendimentos)
+    session.commit()
+    comissoes = [models.Comissao(profissional_id=prof_a, atendimento_id=a.id, valor=Decimal("12.50"), clinica_id=test_clinica.id) for a in atendimentos]
+    session.add_all(comissoes)
+    session.add(models.LancamentoFinanceiro(tipo="RECEITA", descricao="Consulta", valor=Decimal("150.00"), data_vencimento=date(2024, 9, 10), clinica_id=test_clinica.id))
+    session.commit()
+    headers = {"Authorization": f"Bearer {admin_user_token}"}
+
+    # Superusuário escolhe a clínica
+    assert client.get("/api/comissoes/export", headers=headers).status_code == 400
+
+    params = {"formato": "ndjson", "clinica_id": test_clinica.id, "start": "2024-09-01T00:00:00", "end": "2024-09-15T00:00:00"}
+    response = client.get("/api/comissoes/export", params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"profissional_id": prof_a, "atendimento_id": atendimentos[0].id, "valor": "12.50", "paga": False, "id": comissoes[0].id, "clinica_id": test_clinica.id},
+    ]
+
+    params = {"formato": "ndjson", "clinica_id": test_clinica.id, "start": "2024-09-01", "end": "2024-10-01"}
+    response = client.get("/api/lancamentos-financeiros/export", params=params, headers=headers)
+    assert [json.loads(line)["valor"] for line in response.text.splitlines()] == ["150.00"]
+
+def test_export_writers_stream_batches():
+    from app.api import exports
+
+    batches = iter([[(1, None, True)], [(2, datetime(2024, 9, 1, 8, 0), False)]])
+    assert list(exports._csv(["id", "data", "paga"], batches)) == ["id,data,paga\n1,,true\n", "2,2024-09-01T08:00:00,false\n"]
+    assert list(exports._csv(["id"], iter([]))) == ["id\n"]
+    assert list(exports._ndjson(["id", "valor"], iter([[(1, Decimal("1.50")), (2, None)]]))) == [b'{"id":1,"valor":"1.50"}\n{"id":2,"valor":null}\n']
@@ -1,9 +1,48 @@
+import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+from sqlalchemy import inspect
+
+from app.core import database
+from app.core.config import Settings
+from app.core.security import password_hashing_pool
+from app.main import app, create_app
 
 client = TestClient(app)
 
 def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
-    assert response.json() == {"message": "Welcome to FastAPI!"}
\ No newline at end of file
+    assert response.json() == {"message": "Welcome to FastAPI!"}
+
+@pytest.fixture
+def restore_engines():
+    # O lifespan troca as engines globais; os demais testes continuam com as originais
+    saved = database.engine, database.async_engine, database._engine_settings
+    yield
+    database.engine, database.async_engine, database._engine_settings = saved
+    database.SessionLocal.configure(bind=database.engine)
+    database.AsyncSessionLocal.configure(bind=database.async_engine)
+
+def test_lifespan_binds_engines_without_creating_schema(tmp_path, restore_engines):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    with TestClient(create_app(Settings(database_url=url))) as lifespan_client:
+        assert str(database.engine.url) == url
+        assert database.SessionLocal.kw["bind"] is database.engine
+        assert str(database.async_engine.url) == url.replace("sqlite://", "sqlite+aiosqlite://")
+        assert lifespan_client.app.state.startup["warmup"] is False
+        assert lifespan_client.get("/").status_code == 200
+    # Schema é responsabilidade do Alembic
+    assert inspect(database.engine).get_table_names() == []
+
+def test_lifespan_warm_up_opens_connections_and_loads_caches(tmp_path, restore_engines):
+    completed = password_hashing_pool.stats()["completed"]
+    warm_app = create_app(Settings(database_url=f"sqlite:///{tmp_path / 'app.db'}", startup_warmup=True))
+    with TestClient(warm_app):
+        startup = warm_app.state.startup
+        # SQLite em arquivo usa QueuePool: o pool inteiro (pool_size) fica aberto
+        size = database.engine.pool.size()
+        assert startup["connections"] == {"sync": size, "async": database.async_engine.sync_engine.pool.size()}
+        assert startup["caches_ms"] >= 0 and startup["startup_ms"] >= startup["pools_ms"]
+        assert warm_app.openapi_schema is not None
+        assert database.engine.pool.checkedin() == size
+    assert password_hashing_pool.stats()["completed"] == completed + 1
@@ -0,0 +1,76 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Histogram, LoopHistogram, MetricsMiddleware, PrometheusText, RequestMetrics
+from app.main import app
+
+def _app(metrics: RequestMetrics) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.post("/itens/{item_id}")
+    def update_item(item_id: int, payload: dict):
+        return {"id": item_id, **payload}
+
+    return app
+
+def test_middleware_observes_route_template_sizes_and_status():
+    metrics = RequestMetrics()
+    client = TestClient(_app(metrics))
+    for item_id in (1, 2):
+        assert client.post(f"/itens/{item_id}", json={"nome": "x"}).status_code == 200
+    assert client.post("/itens/abc", json={}).status_code == 422
+    assert client.get("/inexistente").status_code == 404
+
+    assert metrics.responses == {
+        ("POST", "/itens/{item_id}", 200): 2,
+        ("POST", "/itens/{item_id}", 422): 1,
+        ("GET", "<unmatched>", 404): 1,
+    }
+    assert metrics.latency[("POST", "/itens/{item_id}")].snapshot()["count"] == 3
+    assert metrics.request_size[("POST", "/itens/{item_id}")].snapshot()["sum"] == 2 * len(b'{"nome":"x"}') + len(b"{}")
+    assert metrics.response_size[("POST", "/itens/{item_id}")].snapshot()["sum"] > 0
+    assert metrics.in_progress == 0
+
+def test_loop_histogram_matches_histogram():
+    locked, loop = Histogram(buckets=(1, 5)), LoopHistogram(buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        locked.observe(value)
+        loop.observe(value)
+    assert loop.snapshot() == locked.snapshot() == {"buckets": [(1, 2), (5, 3)], "count": 4, "sum": 14.5}
+
+def test_prometheus_text_format():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(2.0)
+    text = PrometheusText()
+    text.counter("requests_total", "Requisições.", [({"route": '/a"b'}, 3)])
+    text.gauge("in_progress", "Em andamento.", [(None, 0)])
+    text.histogram("latency_seconds", "Latência.", [({"route": "/a"}, histogram.snapshot())])
+    assert text.render().splitlines() == [
+        "# HELP requests_total Requisições.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 3',
+        "# HELP in_progress Em andamento.",
+        "# TYPE in_progress gauge",
+        "in_progress 0",
+        "# HELP latency_seconds Latência.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 1',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 2',
+        'latency_seconds_sum{route="/a"} 2.05',
+        'latency_seconds_count{route="/a"} 2',
+    ]
+
+def test_metrics_endpoint():
+    client = TestClient(app)
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/",le="+Inf"}' in body
+    for name in ("http_response_size_bytes", "auth_principal_cache_hit_ratio", "password_hash_queue_depth", "db_pool_wait_seconds"):
+        assert f"# TYPE {name} " in body
@@ -0,0 +1,36 @@
+"""
+Runs the Alembic chain against an empty SQLite database: `alembic upgrade head` must build the schema declared in
+app/models.py, and `alembic downgrade base` must undo it.
+"""
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+
+from app.core.database import Base
+
+SCRIPT_LOCATION = Path(__file__).resolve().parents[2] / "app" / "alembic"
+
+def _config(url: str) -> Config:
+    # Sem alembic.ini: o script_location dele é um caminho local de Windows
+    config = Config()
+    config.set_main_option("script_location", str(SCRIPT_LOCATION))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+def test_upgrade_head_creates_schema_on_empty_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    config = _config(url)
+    engine = create_engine(url)
+
+    command.upgrade(config, "head")
+    assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+
+    command.downgrade(config, "base")
+    assert set(inspect(engine).get_table_names()) <= {"alembic_version"}
+    engine.dispose()
@@ -0,0 +1,88 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.core.database import Base
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+
+def _cadeia(session):
+    clinica_a = models.Clinica(nome="Clinica A", endereco="Rua A")
+    clinica_b = models.Clinica(nome="Clinica B", endereco="Rua B")
+    session.add_all([clinica_a, clinica_b])
+    session.flush()
+    user = models.User(username="prof", email="prof@example.com", hashed_password="x", clinica_id=clinica_a.id)
+    paciente = models.Paciente(nome="Paciente", cpf="000.000.000-00", data_nascimento=date(1990, 1, 1), clinica_id=clinica_a.id)
+    session.add_all([user, paciente])
+    session.flush()
+    profissional = models.Profissional(user_id=user.id, especialidade="Geral", conselho_profissional="CRM", numero_conselho="1")
+    agendamento = models.Agendamento(paciente_id=paciente.id, data=datetime(2024, 9, 2, 10, 0))
+    session.add_all([profissional, agendamento])
+    session.flush()
+    atendimento = models.Atendimento(agendamento_id=agendamento.id)
+    session.add(atendimento)
+    session.flush()
+    lancamento = models.LancamentoFinanceiro(tipo="RECEITA", descricao="Consulta", valor=Decimal("100.00"), data_vencimento=date(2024, 9, 2), atendimento_id=atendimento.id)
+    comissao = models.Comissao(profissional_id=profissional.id, atendimento_id=atendimento.id, valor=Decimal("10.00"))
+    session.add_all([lancamento, comissao])
+    session.commit()
+    return clinica_a, clinica_b, user, paciente, agendamento, atendimento, lancamento, comissao
+
+def test_clinica_id_filled_on_insert(session):
+    clinica_a, _, _, _, agendamento, atendimento, lancamento, comissao = _cadeia(session)
+    assert agendamento.clinica_id == clinica_a.id
+    assert atendimento.clinica_id == clinica_a.id
+    assert lancamento.clinica_id == clinica_a.id
+    assert comissao.clinica_id == clinica_a.id
+
+def test_clinica_id_propagates_on_parent_change(session):
+    _, clinica_b, user, paciente, agendamento, atendimento, lancamento, comissao = _cadeia(session)
+
+    paciente.clinica_id = clinica_b.id
+    user.clinica_id = clinica_b.id
+    session.commit()
+    session.expire_all()
+
+    assert agendamento.clinica_id == clinica_b.id
+    assert atendimento.clinica_id == clinica_b.id
+    assert lancamento.clinica_id == clinica_b.id
+    assert comissao.clinica_id == clinica_b.id
+
+def test_clinica_id_follows_new_parent(session):
+    _, clinica_b, _, _, agendamento, _, _, _ = _cadeia(session)
+    outro = models.Paciente(nome="Outro", cpf="111.111.111-11", data_nascimento=date(1990, 1, 1), clinica_id=clinica_b.id)
+    session.add(outro)
+    session.flush()
+
+    agendamento.paciente_id = outro.id
+    session.commit()
+    session.expire_all()
+
+    assert agendamento.clinica_id == clinica_b.id
+    assert agendamento.atendimento.clinica_id == clinica_b.id
+
+def test_agendamento_data_fim_from_clinica(session):
+    clinica_a, _, _, paciente, agendamento, *_ = _cadeia(session)
+    # Clínica criada sem tempo_minimo_atendimento explícito usa o padrão de 30 minutos
+    assert agendamento.data_fim == datetime(2024, 9, 2, 10, 30)
+
+    clinica_a.tempo_minimo_atendimento = 45
+    longo = models.Agendamento(paciente_id=paciente.id, data=datetime(2024, 9, 3, 8, 0))
+    session.add(longo)
+    session.commit()
+    assert longo.data_fim == datetime(2024, 9, 3, 8, 45)
+
+    # Remarcação mantém a duração reservada
+    longo.data = datetime(2024, 9, 4, 9, 0)
+    session.commit()
+    assert longo.data_fim == datetime(2024, 9, 4, 9, 45)
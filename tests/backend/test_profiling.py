@@ -0,0 +1,76 @@
+import json
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.profiling import QueryBudgetExceeded, QueryStatsMiddleware, fingerprint, instrument_queries, query_budget
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+async_engine = create_async_engine("sqlite+aiosqlite://")
+
+def _app(**kwargs):
+    instrument_queries()
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, **kwargs)
+
+    @app.get("/itens")
+    def itens(n: int = 1):
+        with engine.connect() as conn:
+            # um SELECT por item, como um relacionamento carregado sob demanda
+            return [conn.execute(text("SELECT :i"), {"i": i}).scalar() for i in range(n)]
+
+    @app.get("/async")
+    async def itens_async():
+        async with async_engine.connect() as conn:
+            return (await conn.execute(text("SELECT 1"))).scalar()
+
+    @app.get("/orcamento", dependencies=[Depends(query_budget(2))])
+    def orcamento(n: int = 1):
+        return itens(n)
+
+    return app
+
+def test_fingerprint_ignores_parameters():
+    assert fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?)") == fingerprint("SELECT *\nFROM t WHERE id IN (?)")
+    assert fingerprint("SELECT * FROM t WHERE nome = 'a' AND n = 10") == "SELECT * FROM t WHERE nome = ? AND n = ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%(a)s, %(b)s)") == "INSERT INTO t (a, b) VALUES (?)"
+
+def test_server_timing_header():
+    client = TestClient(_app())
+    response = client.get("/itens", params={"n": 3})
+    assert response.json() == [0, 1, 2]
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert response.headers["server-timing"].endswith('desc="3 queries"')
+    # comandos da engine asyncio (executados em greenlet) contam para a mesma requisição
+    assert client.get("/async").headers["server-timing"].endswith('desc="1 queries"')
+
+def test_repeated_statements_are_logged(caplog):
+    client = TestClient(_app(repeat_threshold=3))
+    with caplog.at_level(logging.DEBUG, logger="app.db.queries"):
+        client.get("/itens", params={"n": 2})
+        client.get("/itens", params={"n": 5})
+    registros = [json.loads(r.getMessage()) for r in caplog.records]
+    assert [(r["queries"], r["status"], r["path"]) for r in registros] == [(2, 200, "/itens"), (5, 200, "/itens")]
+    assert [r.levelno for r in caplog.records] == [logging.DEBUG, logging.WARNING]
+    assert registros[0]["repeated"] == []
+    assert registros[1]["repeated"] == [{"fingerprint": "SELECT ?", "count": 5}]
+
+def test_query_budget(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.db.queries"):
+        response = TestClient(_app(budget=3)).get("/itens", params={"n": 4})
+    assert response.status_code == 200
+    assert json.loads(caplog.records[-1].getMessage())["budget"] == 3
+
+    client = TestClient(_app(budget=3, strict=True))
+    assert client.get("/itens", params={"n": 3}).status_code == 200
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/itens", params={"n": 4})
+    # orçamento da rota substitui o padrão
+    assert client.get("/orcamento", params={"n": 2}).status_code == 200
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/orcamento", params={"n": 3})
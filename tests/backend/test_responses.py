@@ -0,0 +1,20 @@
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from fastapi.routing import APIRoute
+
+from app.core.responses import FastJSONResponse, dumps
+from app.main import app
+
+def test_dumps_matches_pydantic_json_mode():
+    payload = {"valor": Decimal("10.50"), "data": date(2025, 1, 6), "inicio": datetime(2025, 1, 6, 8, 30), "hora": time(9),
+               "nome": "Conceição", "vazio": None, "nan": float("nan"), "id": uuid.UUID(int=1)}
+    assert json.loads(dumps(payload)) == {"valor": "10.50", "data": "2025-01-06", "inicio": "2025-01-06T08:30:00", "hora": "09:00:00",
+                                          "nome": "Conceição", "vazio": None, "nan": None, "id": "00000000-0000-0000-0000-000000000001"}
+    assert dumps([1, "ç"]) == '[1,"ç"]'.encode()
+
+def test_api_routes_default_to_fast_json_response():
+    api_routes = [route for route in app.routes if isinstance(route, APIRoute) and route.path.startswith("/api/")]
+    assert api_routes and all(route.response_class is FastJSONResponse for route in api_routes)
@@ -1,4 +1,6 @@
-from app.core.security import verify_password, get_password_hash, create_access_token, decode_access_token
+import asyncio
+import pytest
+from app.core.security import verify_password, verify_password_async, get_password_hash, create_access_token, decode_access_token, password_hashing_pool
 from datetime import timedelta
 
 def test_password_hashing():
@@ -24,4 +26,16 @@ def test_create_access_token_with_expiration():
 def test_decode_invalid_token():
     invalid_token = "invalid.token.string"
     decoded_data = decode_access_token(invalid_token)
-    assert decoded_data is None
\ No newline at end of file
+    assert decoded_data is None
+
+
+@pytest.mark.asyncio
+async def test_verify_password_async_uses_bounded_pool():
+    hashed_password = get_password_hash("testpassword")
+    completed_before = password_hashing_pool.stats()["completed"]
+    results = await asyncio.gather(*(verify_password_async(pwd, hashed_password) for pwd in ["testpassword", "wrongpassword"] * 3))
+    assert results == [True, False] * 3
+    stats = password_hashing_pool.stats()
+    assert stats["completed"] - completed_before == 6
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
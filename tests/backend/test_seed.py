@@ -0,0 +1,86 @@
+import csv
+import io
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.core.database import Base
+from auxiliary import bulk, seed
+from benchmarks import dataset
+
+@pytest.fixture
+def engine():
+    # Banco próprio: o seed grava ids explícitos e não deve disputar com o banco compartilhado dos outros testes
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.Perfil.__table__.insert(), [{"nome": "ATENDENTE"}, {"nome": "PROFISSIONAL"}])
+    yield engine
+    engine.dispose()
+
+def _count(conn, model, *where):
+    return conn.scalar(select(func.count()).select_from(model).where(*where))
+
+def test_csv_stream_serves_blocks_and_null_marker():
+    rows = [(i, f"nome, {i}", None if i % 2 else "x") for i in range(1_234)]
+    stream = bulk.CsvStream(rows, lote=100)
+    texto, bloco = "", stream.read(97)
+    while bloco:
+        texto += bloco
+        bloco = stream.read(97)
+    assert stream.count == len(rows)
+    lidos = list(csv.reader(io.StringIO(texto)))
+    assert lidos[1] == ["1", "nome, 1", bulk.NULL]
+    assert lidos[2] == ["2", "nome, 2", "x"]
+    assert len(lidos) == len(rows)
+
+def test_write_rows_falls_back_to_batched_executemany(engine):
+    statements = []
+    with engine.begin() as conn:
+        conn.execute(models.Clinica.__table__.insert(), {"id": 1, "nome": "A", "endereco": "Rua A"})
+        event.listen(conn, "before_cursor_execute", lambda *args: statements.append(args[5]))
+        linhas = ((i, f"Serviço {i}", 1, "", 30) for i in range(1, 2_501))
+        total = bulk.write_rows(conn, "tipos_tratamento", ("id", "nome", "clinica_id", "descricao", "tempo_minimo_atendimento"), linhas, batch_size=1_000)
+        assert statements == [True, True, True]  # um executemany por lote
+        assert bulk.next_ids(conn, ["tipos_tratamento", "pacientes"]) == {"tipos_tratamento": 2_501, "pacientes": 1}
+    assert total == 2_500
+
+def test_seed_catalogo_is_idempotent(engine):
+    with engine.begin() as conn:
+        assert seed.seed_catalogo(conn) == {"clinicas": len(seed.CATALOGO), "tipos_tratamento": sum(len(c[5]) for c in seed.CATALOGO)}
+        odonto = conn.scalar(select(models.Clinica.id).where(models.Clinica.nome == "Clínica Odontológica"))
+        conn.execute(models.TipoTratamento.__table__.delete().where(models.TipoTratamento.nome == "Cirurgia oral"))
+    with engine.begin() as conn:
+        assert seed.seed_catalogo(conn) == {"clinicas": 0, "tipos_tratamento": 1}
+        assert _count(conn, models.TipoTratamento, models.TipoTratamento.clinica_id == odonto) == len(seed.CATALOGO[0][5])
+
+def test_seed_equipe_shares_hash_and_completes_missing_rows(engine):
+    with engine.begin() as conn:
+        seed.seed_catalogo(conn)
+        clinicas = list(conn.scalars(select(models.Clinica.id).order_by(models.Clinica.id).limit(2)))
+        assert seed.seed_equipe(conn, "hash", atendentes=2, profissionais=1, pacientes=3, clinica_ids=clinicas) == {"users": 6, "profissionais": 2, "pacientes": 6}
+    with engine.begin() as conn:
+        assert seed.seed_equipe(conn, "hash", atendentes=2, profissionais=1, pacientes=5, clinica_ids=clinicas) == {"users": 0, "profissionais": 0, "pacientes": 4}
+        users = conn.execute(select(models.User.username, models.User.hashed_password, models.User.clinica_id, models.Perfil.nome).join(models.Perfil)).all()
+        assert {u.hashed_password for u in users} == {"hash"}
+        assert {(u.username, u.nome) for u in users if u.clinica_id == clinicas[0]} == {
+            (f"atendente_{clinicas[0]}", "ATENDENTE"), (f"atendente_{clinicas[0]}_2", "ATENDENTE"), (f"prof_{clinicas[0]}", "PROFISSIONAL"),
+        }
+        profissional = conn.execute(select(models.User.clinica_id).join(models.Profissional, models.Profissional.user_id == models.User.id)
+                                    .where(models.User.username == f"prof_{clinicas[1]}")).scalar_one()
+        assert profissional == clinicas[1]
+        assert _count(conn, models.Paciente, models.Paciente.clinica_id == clinicas[0]) == 5
+        assert len(set(conn.scalars(select(models.Paciente.cpf)))) == 10
+
+def test_load_dataset_without_copy(engine, monkeypatch):
+    hashes = []
+    monkeypatch.setattr("app.core.security.get_password_hash", lambda senha: hashes.append(senha) or "hash")
+    escala = dataset.Escala(clinicas=2, profissionais_por_clinica=2, atendentes_por_clinica=1, pacientes=20, agendamentos=200)
+    totais = dataset.load_dataset(engine, escala, log=lambda mensagem: None)
+    assert hashes == [dataset.SENHA]
+    assert totais["clinicas"] == 2 and totais["users"] == 6 and totais["pacientes"] == 20 and totais["agendamentos"] == 200
+    with engine.connect() as conn:
+        assert _count(conn, models.Atendimento) == totais["atendimentos"] == _count(conn, models.Agendamento, models.Agendamento.status == "CONCLUIDO")
+        assert _count(conn, models.LancamentoFinanceiro) == totais["lancamentos_financeiros"]
@@ -0,0 +1,91 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.api.tenancy import check_parents, get_owned_or_404
+from app.core.cache import Principal
+from app.core.database import Base
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+
+@pytest.fixture(name="statements")
+def statements_fixture(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+def _principal(clinica_id, is_superuser=False):
+    return Principal(id=1, username="u", is_active=True, is_superuser=is_superuser, clinica_id=clinica_id, perfil_id=None, permissoes=frozenset())
+
+@pytest.fixture(name="dados")
+def dados_fixture(session):
+    clinica = models.Clinica(nome="Clinica", endereco="Rua")
+    session.add(clinica)
+    session.flush()
+    user = models.User(username="prof", email="prof@example.com", hashed_password="x", clinica_id=clinica.id)
+    paciente = models.Paciente(nome="Paciente", cpf="000.000.000-00", data_nascimento=date(1990, 1, 1), clinica_id=clinica.id)
+    session.add_all([user, paciente])
+    session.flush()
+    profissional = models.Profissional(user_id=user.id, especialidade="Geral", conselho_profissional="CRM", numero_conselho="1")
+    agendamento = models.Agendamento(paciente_id=paciente.id, data=datetime(2024, 9, 2, 10, 0))
+    session.add_all([profissional, agendamento])
+    session.flush()
+    atendimento = models.Atendimento(agendamento_id=agendamento.id)
+    session.add(atendimento)
+    session.flush()
+    comissao = models.Comissao(profissional_id=profissional.id, atendimento_id=atendimento.id, valor=Decimal("10.00"))
+    session.add(comissao)
+    session.commit()
+    return clinica.id, profissional.id, atendimento.id, comissao.id
+
+def test_get_owned_or_404_uses_one_query(session, dados, statements):
+    clinica, profissional, _, comissao = dados
+    session.expire_all()
+    statements.clear()
+
+    assert get_owned_or_404(session, models.Comissao, comissao, _principal(clinica), "nf", "fb").id == comissao
+    assert get_owned_or_404(session, models.Profissional, profissional, _principal(clinica), "nf", "fb").id == profissional
+    assert len(statements) == 2
+
+def test_get_owned_or_404_errors(session, dados):
+    clinica, profissional, _, _ = dados
+    with pytest.raises(HTTPException) as exc:
+        get_owned_or_404(session, models.Profissional, profissional + 100, _principal(clinica), "nf", "fb")
+    assert exc.value.status_code == 404
+    with pytest.raises(HTTPException) as exc:
+        get_owned_or_404(session, models.Profissional, profissional, _principal(clinica + 1), "nf", "fb")
+    assert (exc.value.status_code, exc.value.detail) == (403, "fb")
+    assert get_owned_or_404(session, models.Profissional, profissional, _principal(None, is_superuser=True), "nf", "fb") is not None
+
+def test_check_parents_single_query(session, dados, statements):
+    clinica, profissional, atendimento, _ = dados
+    statements.clear()
+    clinicas = check_parents(
+        session, _principal(clinica),
+        (models.Profissional, profissional, "prof nf", "prof fb"),
+        (models.Atendimento, atendimento, "at nf", "at fb"),
+    )
+    assert clinicas == [clinica, clinica]
+    assert len(statements) == 1
+
+    with pytest.raises(HTTPException) as exc:
+        check_parents(session, _principal(clinica), (models.Profissional, profissional, "prof nf", "prof fb"), (models.Atendimento, 999, "at nf", "at fb"))
+    assert (exc.value.status_code, exc.value.detail) == (404, "at nf")
+    with pytest.raises(HTTPException) as exc:
+        check_parents(session, _principal(clinica + 1), (models.Profissional, 999, "prof nf", "prof fb"), (models.Atendimento, atendimento, "at nf", "at fb"))
+    assert (exc.value.status_code, exc.value.detail) == (404, "prof nf")